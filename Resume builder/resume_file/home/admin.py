@@ -1,57 +1,127 @@
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import Q
+from django.utils.text import smart_split, unescape_string_literal
 from .models import *
+from . import exports, search, snapshots
+from .pagination import EstimatedCountPaginator
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables that grow to millions of rows
+
+    Counts come from EstimatedCountPaginator, and the second, unfiltered
+    COUNT(*) behind "N total" and the per-filter facet counts are skipped.
+    Only cheap filters belong in list_filter: choices and booleans need no
+    query, while date hierarchies and free-valued fields scan the table for
+    their distinct values, and date ranges over unindexed columns scan it on
+    every filtered load.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+
+class DeferredSnapshotsAdmin(admin.ModelAdmin):
+    """Deletes rebuild the affected resume snapshots once, not once per deleted row"""
+
+    def delete_model(self, request, obj):
+        with transaction.atomic(), snapshots.deferred():
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic(), snapshots.deferred():
+            super().delete_queryset(request, queryset)
+
+
+class SectionAdmin(DeferredSnapshotsAdmin, LargeTableAdmin):
+    list_select_related = ('resume',)
+    autocomplete_fields = ('resume',)
+
+    def get_search_results(self, request, queryset, search_term):
+        """Rows where every word starts one of the row's ``search_fields`` or matches its resume's name
+
+        Each word's conditions are indexed on SQLite: the prefix LIKEs by the
+        NOCASE indexes of migration 0008, the resume name by the full-text
+        index, so the OR of them is a multi-index lookup rather than a scan.
+        """
+        backend = search.get_backend()
+        for bit in smart_split(search_term):
+            if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+                bit = unescape_string_literal(bit)
+            resumes = backend.search(Resume.objects.all(), bit, columns=('name',))
+            condition = Q(resume__in=resumes.values('pk'))
+            for field in self.search_fields:
+                condition |= Q(**{f'{field}__istartswith': bit})
+            queryset = queryset.filter(condition)
+        return queryset, False
+
 
 @admin.register(Resume)
-class ResumeAdmin(admin.ModelAdmin):
+class ResumeAdmin(DeferredSnapshotsAdmin, LargeTableAdmin):
     list_display = ('name', 'title', 'user', 'template', 'created_at', 'updated_at', 'is_public', 'views_count', 'downloads_count')
-    list_filter = ('template', 'is_public', 'created_at', 'updated_at')
+    list_filter = ('template', 'is_public')
+    list_select_related = ('user',)
+    autocomplete_fields = ('user',)
     search_fields = ('name', 'title', 'about', 'email')
     readonly_fields = ('views_count', 'downloads_count', 'created_at', 'updated_at')
     list_editable = ('is_public',)
-    date_hierarchy = 'created_at'
+    actions = ['export_pdfs']
+
+    def get_search_results(self, request, queryset, search_term):
+        """Full-text search, which the section admins' resume autocomplete uses too"""
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if '@' in search_term:
+            return queryset.filter(email__iexact=search_term), False
+        # The changelist applies its own ordering, so skip the relevance rank
+        matches = search.get_backend().search(Resume.objects.all(), search_term)
+        return queryset.filter(pk__in=matches.values('pk')), False
+
+    @admin.action(description='Download selected resumes as a ZIP of PDFs')
+    def export_pdfs(self, request, queryset):
+        return exports.zip_response(request, queryset)
 
 @admin.register(Skill)
-class SkillAdmin(admin.ModelAdmin):
+class SkillAdmin(SectionAdmin):
     list_display = ('name', 'resume', 'proficiency')
     list_filter = ('proficiency',)
-    search_fields = ('name', 'resume__name')
+    search_fields = ('name',)
 
 @admin.register(Education)
-class EducationAdmin(admin.ModelAdmin):
+class EducationAdmin(SectionAdmin):
     list_display = ('degree', 'institution', 'year', 'resume')
-    list_filter = ('year',)
-    search_fields = ('degree', 'institution', 'resume__name')
+    search_fields = ('degree', 'institution')
 
 @admin.register(Language)
-class LanguageAdmin(admin.ModelAdmin):
+class LanguageAdmin(SectionAdmin):
     list_display = ('name', 'proficiency', 'resume')
     list_filter = ('proficiency',)
-    search_fields = ('name', 'resume__name')
+    search_fields = ('name',)
 
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(SectionAdmin):
     list_display = ('title', 'duration', 'resume')
-    search_fields = ('title', 'description', 'resume__name')
+    search_fields = ('title',)
 
 @admin.register(WorkExperience)
-class WorkExperienceAdmin(admin.ModelAdmin):
+class WorkExperienceAdmin(SectionAdmin):
     list_display = ('position', 'company', 'duration', 'current', 'resume')
     list_filter = ('current',)
-    search_fields = ('position', 'company', 'resume__name')
+    search_fields = ('position', 'company')
 
 @admin.register(Certification)
-class CertificationAdmin(admin.ModelAdmin):
+class CertificationAdmin(SectionAdmin):
     list_display = ('name', 'issuer', 'date_obtained', 'expiry_date', 'resume')
-    list_filter = ('date_obtained', 'expiry_date')
-    search_fields = ('name', 'issuer', 'resume__name')
+    search_fields = ('name', 'issuer')
 
 @admin.register(Achievement)
-class AchievementAdmin(admin.ModelAdmin):
+class AchievementAdmin(SectionAdmin):
     list_display = ('title', 'date', 'resume')
-    list_filter = ('date',)
-    search_fields = ('title', 'description', 'resume__name')
+    search_fields = ('title',)
 
 @admin.register(Reference)
-class ReferenceAdmin(admin.ModelAdmin):
+class ReferenceAdmin(SectionAdmin):
     list_display = ('name', 'position', 'company', 'resume')
-    search_fields = ('name', 'position', 'company', 'resume__name')
+    search_fields = ('name', 'position', 'company')
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class HomeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'home'
+
+    def ready(self):
+        from . import html_cache, pagination, search, signals, snapshots, sqlite, stats  # noqa: F401 (registers receivers)
+        signals.connect_signals()
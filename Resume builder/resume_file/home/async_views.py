@@ -0,0 +1,121 @@
+"""
+Async versions of the read-heavy views, routed by ``resume_file.asgi_urls``.
+
+Under ASGI these wait on the database and cache without holding a thread,
+run the page query and cached count of a listing concurrently, and render
+PDFs on the bounded ``render_pool``. WSGI serves the sync views in
+``home.views`` instead, since Django would run each async view in an event
+loop of its own there. Template rendering runs context processors that may
+load the session user, so it goes through ``sync_to_async``.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import render
+
+from . import counters, delivery, html_cache, jobs, pdf_cache, render_pool, snapshots, stats
+from .models import Resume
+from .pagination import KeysetPaginator, RECENT, acached_count
+from .routing import reading_replica, replica_reads
+from .utils import open_resume_pdf
+from .views import _page, _page_response, _renders_async, _search, pdf_job_response
+
+
+@replica_reads
+async def home(request):
+    """Landing page with featured resumes and app overview"""
+    return await sync_to_async(render)(request, 'home.html', await stats.aget_home_stats())
+
+
+@login_required
+async def dashboard(request):
+    """User dashboard showing their resumes"""
+    user_resumes = Resume.objects.filter(user=await request.auser())
+    page, total, downloads = await asyncio.gather(
+        KeysetPaginator(user_resumes, 12, ordering=RECENT).apage(request.GET.get('cursor')),
+        acached_count(user_resumes),
+        counters.atotal(user_resumes, 'downloads_count'),
+    )
+    page.object_list = counters.apply_pending(page.object_list)
+    context = {
+        'resumes': page,
+        'total_resumes': total,
+        'total_downloads': downloads,
+    }
+    return await sync_to_async(render)(request, 'dashboard.html', context)
+
+
+async def _aget_document_or_404(resume_id):
+    try:
+        return await snapshots.aget_document(resume_id)
+    except Resume.DoesNotExist:
+        raise Http404('No Resume matches the given query.')
+
+
+@replica_reads
+async def view_resume(request, resume_id):
+    """View a specific resume"""
+    page, generation = await html_cache.aget_page(resume_id)
+    if page is None:
+        document, version = await _aget_document_or_404(resume_id)
+        page = await sync_to_async(_page)(request, document, version)
+        # A replica may lag behind the primary; only pages read from the primary are shared
+        if not reading_replica():
+            await html_cache.aset_page(resume_id, generation, **page)
+
+    # Increment view count (revalidated views count too)
+    await counters.aincrement(resume_id, 'views_count')
+    return _page_response(request, page)
+
+
+@replica_reads
+async def download_pdf(request, resume_id):
+    """Download resume as PDF"""
+    document, version = await _aget_document_or_404(resume_id)
+    resume = document.resume
+
+    # Increment download count
+    await counters.aincrement(resume.pk, 'downloads_count')
+
+    fingerprint = pdf_cache.resume_fingerprint(resume, document.sections)
+    cached = await sync_to_async(pdf_cache.open_pdf)(resume.pk, fingerprint)
+    if cached is not None:
+        return delivery.file_response(request, cached)
+
+    if _renders_async(request):
+        try:
+            job = await sync_to_async(jobs.enqueue)(resume)
+        except jobs.QueueFull as exc:
+            return JsonResponse({'success': False, 'error': str(exc)}, status=503)
+        await jobs.aremember(request.session, job)
+        return pdf_job_response(request, job)
+
+    try:
+        pdf = await render_pool.run(open_resume_pdf, document)
+    except render_pool.PoolFull as exc:
+        return JsonResponse({'success': False, 'error': str(exc)}, status=503)
+    if pdf is None:
+        return HttpResponse('We had some errors while generating the PDF')
+    return delivery.file_response(request, pdf)
+
+
+@replica_reads
+async def search_resumes(request):
+    """Search public resumes"""
+    query = request.GET.get('q', '')
+    # Choosing the backend may probe the database once
+    resumes, ordering = await sync_to_async(_search)(query)
+    page_obj, total = await asyncio.gather(
+        KeysetPaginator(resumes, 12, ordering=ordering).apage(request.GET.get('cursor')),
+        acached_count(resumes),
+    )
+    page_obj.object_list = counters.apply_pending(page_obj.object_list)
+
+    context = {
+        'resumes': page_obj,
+        'query': query,
+        'total_count': total,
+    }
+    return await sync_to_async(render)(request, 'search_resumes.html', context)
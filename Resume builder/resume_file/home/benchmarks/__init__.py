@@ -0,0 +1,65 @@
+"""
+Shared helpers for the benchmark management commands.
+
+Benchmarks never touch the configured database: ``benchmark_database``
+creates a throwaway copy of the schema the same way the test runner does
+and points the default connection at it for the duration of the run.
+"""
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.db import connections
+
+from home import sqlite
+
+
+@contextmanager
+def benchmark_database(path=None, alias='default'):
+    """Point ``alias`` at a freshly migrated scratch database and drop it afterwards
+
+    SQLite databases are created as files (not in memory) so that threads
+    and worker processes started by a benchmark share the same data.
+    """
+    connection = connections[alias]
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    tmpdir = None
+    if connection.vendor == 'sqlite' and path is None:
+        tmpdir = tempfile.mkdtemp(prefix='resume-bench-')
+        path = os.path.join(tmpdir, 'benchmark.sqlite3')
+    if path is not None:
+        test_settings['NAME'] = path
+    try:
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        yield connection
+    finally:
+        # The SQLite writer thread holds a connection to the scratch database
+        sqlite.writer.stop()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = old_test_name
+        if tmpdir is not None:
+            for name in os.listdir(tmpdir):
+                os.unlink(os.path.join(tmpdir, name))
+            os.rmdir(tmpdir)
+
+
+def time_call(func, repeat=5, warmup=1):
+    """Run ``func`` and return timing statistics in milliseconds"""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'min_ms': round(samples[0], 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'max_ms': round(samples[-1], 3),
+        'repeat': repeat,
+    }
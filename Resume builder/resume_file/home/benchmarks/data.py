@@ -0,0 +1,134 @@
+"""
+Deterministic synthetic data for benchmarks.
+
+``generate`` creates users and resumes with realistic section sizes using
+``bulk_create``, so hundreds of thousands of rows load in seconds. Model
+signals are not sent; call ``home.search.get_backend().rebuild()`` if a
+benchmark needs the search index.
+"""
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from home.models import (
+    Achievement, Certification, Education, Language, Project, Reference, Resume, Skill,
+    WorkExperience,
+)
+
+FIRST_NAMES = ['Ada', 'Alan', 'Grace', 'Linus', 'Margaret', 'Dennis', 'Barbara', 'Ken', 'Frances', 'Guido']
+LAST_NAMES = ['Lovelace', 'Turing', 'Hopper', 'Torvalds', 'Hamilton', 'Ritchie', 'Liskov', 'Thompson', 'Allen', 'Rossum']
+TITLES = ['Backend Engineer', 'Data Scientist', 'Product Designer', 'DevOps Engineer', 'Frontend Developer', 'QA Analyst']
+SKILLS = ['Python', 'Django', 'SQL', 'JavaScript', 'React', 'Docker', 'Kubernetes', 'Go', 'Rust', 'AWS',
+          'PostgreSQL', 'Redis', 'Figma', 'Pandas', 'TypeScript', 'Linux', 'Terraform', 'GraphQL']
+COMPANIES = ['Acme', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Stark Industries', 'Wayne Enterprises']
+INSTITUTIONS = ['MIT', 'Stanford', 'IIT Bombay', 'ETH Zurich', 'University of Toronto', 'NUS']
+LANGUAGES = ['English', 'Hindi', 'Spanish', 'German', 'French', 'Japanese']
+WORDS = ('built shipped designed scaled migrated automated led maintained improved tested deployed '
+         'service platform pipeline dashboard api cluster team product feature latency').split()
+
+# Inclusive (min, max) rows per resume for each section
+SECTION_SIZES = {
+    'skills': (5, 12),
+    'education': (1, 3),
+    'languages': (1, 3),
+    'projects': (1, 4),
+    'work_experience': (1, 5),
+    'certifications': (0, 3),
+    'achievements': (0, 3),
+    'references': (0, 2),
+}
+
+
+def _sentence(rng, words=12):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def _person(rng):
+    return f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+
+
+def _section_rows(name, resume, rng):
+    low, high = SECTION_SIZES[name]
+    count = rng.randint(low, high)
+    if name == 'skills':
+        return [Skill(resume=resume, name=skill, proficiency=rng.choice(['beginner', 'intermediate', 'advanced', 'expert']))
+                for skill in rng.sample(SKILLS, count)]
+    if name == 'education':
+        return [Education(resume=resume, degree=rng.choice(['BSc', 'MSc', 'BTech', 'PhD']),
+                          institution=rng.choice(INSTITUTIONS), year=str(rng.randint(1995, 2024)),
+                          gpa=f'{rng.uniform(2.5, 4.0):.1f}') for _ in range(count)]
+    if name == 'languages':
+        return [Language(resume=resume, name=language, proficiency=rng.choice(['basic', 'intermediate', 'advanced', 'native']))
+                for language in rng.sample(LANGUAGES, count)]
+    if name == 'projects':
+        return [Project(resume=resume, title=f'{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}',
+                        duration=f'{rng.randint(1, 18)} months', description=_sentence(rng, 25),
+                        technologies=', '.join(rng.sample(SKILLS, 3))) for _ in range(count)]
+    if name == 'work_experience':
+        return [WorkExperience(resume=resume, company=rng.choice(COMPANIES), position=rng.choice(TITLES),
+                               duration=f'{rng.randint(1, 6)} years', description=_sentence(rng, 40),
+                               current=i == 0) for i in range(count)]
+    if name == 'certifications':
+        return [Certification(resume=resume, name=f'{rng.choice(SKILLS)} Certified', issuer=rng.choice(COMPANIES),
+                              date_obtained=date(2015, 1, 1) + timedelta(days=rng.randint(0, 3000)))
+                for _ in range(count)]
+    if name == 'achievements':
+        return [Achievement(resume=resume, title=_sentence(rng, 4), description=_sentence(rng, 15))
+                for _ in range(count)]
+    return [Reference(resume=resume, name=_person(rng), position=rng.choice(TITLES), company=rng.choice(COMPANIES),
+                      email=f'ref{rng.randint(1, 10**6)}@example.com') for _ in range(count)]
+
+
+def generate(users=100, resumes=1000, sections=tuple(SECTION_SIZES), public_ratio=0.6,
+             batch_size=2000, seed=0, progress=None):
+    """Create ``users`` users and ``resumes`` resumes spread across them
+
+    ``sections`` names the sections to fill (all by default). Returns the
+    number of section rows created.
+    """
+    rng = random.Random(seed)
+    existing = User.objects.count()
+    User.objects.bulk_create([
+        User(username=f'bench{existing + i}', email=f'bench{existing + i}@example.com')
+        for i in range(users)
+    ], batch_size=batch_size)
+    user_ids = list(User.objects.order_by('-pk').values_list('pk', flat=True)[:users])
+
+    now = timezone.now()
+    section_rows = 0
+    for start in range(0, resumes, batch_size):
+        with transaction.atomic():
+            batch = [
+                Resume(
+                    user_id=rng.choice(user_ids) if user_ids else None,
+                    title=rng.choice(TITLES),
+                    template=rng.choice(['modern', 'classic', 'creative', 'minimal']),
+                    name=_person(rng),
+                    about=_sentence(rng, 30),
+                    email=f'user{start + i}@example.com',
+                    phone=f'+1 555 {rng.randint(1000000, 9999999)}',
+                    is_public=rng.random() < public_ratio,
+                    views_count=int(rng.paretovariate(1.2) * 10),
+                    downloads_count=rng.randint(0, 50),
+                    created_at=now - timedelta(minutes=rng.randint(0, 10**6)),
+                )
+                for i in range(min(batch_size, resumes - start))
+            ]
+            Resume.objects.bulk_create(batch)
+            if not batch[0].pk:
+                # Backends that cannot return ids from bulk inserts
+                batch = list(Resume.objects.order_by('-pk')[:len(batch)])
+            by_model = {}
+            for resume in batch:
+                for name in sections:
+                    for row in _section_rows(name, resume, rng):
+                        by_model.setdefault(type(row), []).append(row)
+            for model, rows in by_model.items():
+                model.objects.bulk_create(rows, batch_size=batch_size)
+                section_rows += len(rows)
+        if progress:
+            progress(min(start + batch_size, resumes), resumes)
+    return section_rows
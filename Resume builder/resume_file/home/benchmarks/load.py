@@ -0,0 +1,281 @@
+"""
+Concurrent load generation for ``manage.py loadtest``.
+
+A pool of client threads replays a weighted mix of ``home``,
+``search_resumes``, ``view_resume``, ``download_pdf`` and ``create_resume``
+requests, either in-process through the Django test client or over HTTP
+against a running server, and records per-endpoint latencies and errors.
+``AsgiInProcessClient`` instead runs every client as a coroutine on one
+event loop through Django's ASGI handler, so WSGI-style (a thread per
+request) and ASGI serving can be compared on the same data. In-process
+runs also count SQLite "database is locked" errors seen by any query,
+including ones a view handled itself.
+"""
+import asyncio
+import math
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from contextlib import nullcontext
+from http.cookiejar import CookieJar
+
+from django.conf import settings
+from django.db import OperationalError, connection, connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+
+from home.benchmarks.data import COMPANIES, FIRST_NAMES, LAST_NAMES, SKILLS, TITLES
+
+DEFAULT_MIX = {'home': 20, 'search': 25, 'view': 40, 'download': 10, 'create': 5}
+SEARCH_QUERIES = ('python', 'django', 'backend engineer', 'data', 'react developer', 'kube')
+
+
+def parse_mix(text):
+    """Parse ``"home=20,view=40"`` into endpoint weights"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f'Unknown endpoint "{name}"; choose from {", ".join(DEFAULT_MIX)}')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(samples, p):
+    """Nearest-rank percentile of sorted ``samples``"""
+    if not samples:
+        return None
+    return samples[max(0, math.ceil(p / 100 * len(samples)) - 1)]
+
+
+class InProcessClient:
+    """Sends requests through the Django test client in this process"""
+
+    is_async = False
+
+    def __init__(self):
+        host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+        self.client = Client(HTTP_HOST=host, raise_request_exception=False)
+
+    def request(self, method, path, data=None):
+        if method == 'POST':
+            return self.client.post(path, data).status_code
+        return self.client.get(path, data).status_code
+
+
+class AsgiInProcessClient:
+    """Sends requests through Django's ASGI handler on the running event loop
+
+    The async test client always sends ``Host: testserver``, which has to be
+    in ``ALLOWED_HOSTS``.
+    """
+
+    is_async = True
+
+    def __init__(self):
+        self.client = AsyncClient(raise_request_exception=False)
+
+    async def request(self, method, path, data=None):
+        if method == 'POST':
+            return (await self.client.post(path, data)).status_code
+        return (await self.client.get(path, data)).status_code
+
+
+class HttpClient:
+    """Sends requests to a running server, keeping cookies and the CSRF token"""
+
+    is_async = False
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.cookies = CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+
+    def _csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == settings.CSRF_COOKIE_NAME:
+                return cookie.value
+        return None
+
+    def request(self, method, path, data=None):
+        url = self.base_url + path
+        body = None
+        if method == 'POST':
+            if self._csrf_token() is None:
+                # Any page using {% csrf_token %} sets the cookie
+                self.request('GET', path)
+            data = {**data, 'csrfmiddlewaretoken': self._csrf_token() or ''}
+            body = urllib.parse.urlencode(data, doseq=True).encode()
+        elif data:
+            url += '?' + urllib.parse.urlencode(data)
+        try:
+            with self.opener.open(urllib.request.Request(url, body, method=method), timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as exc:
+            return exc.code
+        except (urllib.error.URLError, OSError):
+            return None
+
+
+def _create_payload(rng):
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    skills = rng.sample(SKILLS, 5)
+    return {
+        'title': rng.choice(TITLES),
+        'template': rng.choice(['modern', 'classic', 'creative', 'minimal']),
+        'name': f'{first} {last}',
+        'email': f'{first}.{last}{rng.randint(1, 10**6)}@example.com'.lower(),
+        'about': 'Load test resume',
+        'skills[]': skills,
+        'skill_proficiencies[]': ['advanced'] * len(skills),
+        'companies[]': [rng.choice(COMPANIES)],
+        'positions[]': [rng.choice(TITLES)],
+        'work_durations[]': ['2 years'],
+        'work_descriptions[]': ['Built and shipped things.'],
+    }
+
+
+def _next_request(name, rng, resume_ids):
+    if name == 'home':
+        return 'GET', '/', None
+    if name == 'search':
+        return 'GET', '/search/', {'q': rng.choice(SEARCH_QUERIES)}
+    if name == 'view':
+        return 'GET', f'/resume/{rng.choice(resume_ids)}/', None
+    if name == 'download':
+        return 'GET', f'/resume/{rng.choice(resume_ids)}/download/', None
+    return 'POST', '/create/', _create_payload(rng)
+
+
+class LoadTest:
+    def __init__(self, make_client, resume_ids, mix=None, clients=8, duration=30, requests=None,
+                 seed=0, count_locks=True):
+        self.make_client = make_client
+        self.resume_ids = resume_ids
+        self.mix = mix or DEFAULT_MIX
+        self.clients = clients
+        self.duration = duration
+        self.requests = requests
+        self.seed = seed
+        self.count_locks = count_locks
+        self.is_async = getattr(make_client, 'is_async', False)
+        self.lock = threading.Lock()
+        self.latencies = {name: [] for name in self.mix}
+        self.errors = dict.fromkeys(self.mix, 0)
+        self.sqlite_locks = 0
+        self.sent = 0
+
+    def _claim(self, deadline):
+        with self.lock:
+            if self.requests is not None:
+                if self.sent >= self.requests:
+                    return False
+            elif time.monotonic() >= deadline:
+                return False
+            self.sent += 1
+            return True
+
+    def _count_locks(self, execute, sql, params, many, context):
+        try:
+            return execute(sql, params, many, context)
+        except OperationalError as exc:
+            if 'locked' in str(exc):
+                with self.lock:
+                    self.sqlite_locks += 1
+            raise
+
+    def _record(self, name, elapsed, status):
+        with self.lock:
+            self.latencies[name].append(elapsed)
+            if status is None or status >= 400:
+                self.errors[name] += 1
+
+    def _worker(self, index, deadline):
+        rng = random.Random(self.seed * 1000 + index)
+        names, weights = list(self.mix), list(self.mix.values())
+        client = self.make_client()
+        try:
+            with connection.execute_wrapper(self._count_locks) if self.count_locks else nullcontext():
+                while self._claim(deadline):
+                    name = rng.choices(names, weights)[0]
+                    method, path, data = _next_request(name, rng, self.resume_ids)
+                    start = time.perf_counter()
+                    try:
+                        status = client.request(method, path, data)
+                    except Exception:
+                        status = None
+                    self._record(name, time.perf_counter() - start, status)
+        finally:
+            connections.close_all()
+
+    async def _async_worker(self, index, deadline):
+        rng = random.Random(self.seed * 1000 + index)
+        names, weights = list(self.mix), list(self.mix.values())
+        client = self.make_client()
+        while self._claim(deadline):
+            name = rng.choices(names, weights)[0]
+            method, path, data = _next_request(name, rng, self.resume_ids)
+            start = time.perf_counter()
+            try:
+                status = await client.request(method, path, data)
+            except Exception:
+                status = None
+            self._record(name, time.perf_counter() - start, status)
+
+    def _install_lock_counter(self, sender, connection, **kwargs):
+        # First in the list, so execute_wrapper() blocks never pop it
+        connection.execute_wrappers.insert(0, self._count_locks)
+
+    async def _run_async(self, deadline):
+        # ASGI runs each request's queries on its own thread, so count locks
+        # on every connection opened during the run
+        if self.count_locks:
+            connection_created.connect(self._install_lock_counter)
+        try:
+            await asyncio.gather(*(self._async_worker(i, deadline) for i in range(self.clients)))
+        finally:
+            connection_created.disconnect(self._install_lock_counter)
+
+    def run(self):
+        """Run the load and return the report dict"""
+        start = time.monotonic()
+        deadline = start + self.duration
+        if self.is_async:
+            asyncio.run(self._run_async(deadline))
+        else:
+            threads = [threading.Thread(target=self._worker, args=(i, deadline), daemon=True)
+                       for i in range(self.clients)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return self.report(time.monotonic() - start)
+
+    def report(self, elapsed):
+        endpoints = {}
+        for name, samples in self.latencies.items():
+            samples = sorted(samples)
+            endpoints[name] = {
+                'requests': len(samples),
+                'errors': self.errors[name],
+                'error_rate': self.errors[name] / len(samples) if samples else 0.0,
+                **{f'p{p}_ms': round(percentile(samples, p) * 1000, 3) if samples else None
+                   for p in (50, 95, 99)},
+            }
+        total = sum(len(samples) for samples in self.latencies.values())
+        return {
+            'interface': 'asgi' if self.is_async else 'wsgi',
+            'clients': self.clients,
+            'elapsed_s': round(elapsed, 3),
+            'requests': total,
+            'throughput_rps': round(total / elapsed, 2) if elapsed else 0.0,
+            'sqlite_locks': self.sqlite_locks if self.count_locks else None,
+            'endpoints': endpoints,
+        }
+
@@ -0,0 +1,127 @@
+"""
+Microbenchmarks for the render and data-loading hot paths.
+
+``run`` seeds a scratch database with ``generate`` and times PDF rendering
+for every resume template, ``view_resume`` HTML rendering, the snapshot
+read done by ``download_pdf``, ``create_resume`` ingestion and
+``search_resumes`` at each requested dataset size. Views are called
+directly with a ``RequestFactory`` request and the HTML cache disabled so
+every sample does the full work. A benchmark that raises is reported with
+an ``error`` entry instead of timings. ``compare`` checks a run against a
+stored baseline.
+"""
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.http import QueryDict
+from django.test import RequestFactory, override_settings
+
+from home import counters, ingest, search, snapshots
+from home.benchmarks import benchmark_database, time_call
+from home.benchmarks.data import generate
+from home.documents import ResumeDocument
+from home.models import Resume
+from home.utils import render_to_pdf
+from home.views import search_resumes, view_resume
+
+TEMPLATES = ('modern', 'classic', 'creative', 'minimal')
+SEARCH_QUERIES = ('python', 'backend engineer', 'djan')
+
+
+def _request(path, data=None):
+    request = RequestFactory().get(path, data)
+    request.user = AnonymousUser()
+    return request
+
+
+def _form_payload(resume):
+    """The create form POST data that would recreate ``resume``"""
+    post = QueryDict(mutable=True)
+    for name in ingest.RESUME_FIELDS:
+        post[name] = str(getattr(resume, name) or '')
+    for section, form_fields in ingest.SECTION_FORM_FIELDS.items():
+        for row in getattr(resume, section).all():
+            for field, list_name in form_fields.items():
+                value = getattr(row, field)
+                post.appendlist(list_name, '' if value is None else str(value))
+    return post
+
+
+def fixed_benchmarks():
+    """Benchmarks whose cost does not depend on the number of stored resumes"""
+    benchmarks = {}
+    for template in TEMPLATES:
+        resume = Resume.objects.filter(template=template).with_sections().first()
+        if resume is None:
+            continue
+        document = ResumeDocument.from_resume(resume)
+        benchmarks[f'render_to_pdf[{template}]'] = (
+            lambda document=document: render_to_pdf(document.template_name, document.context(picture='print'))
+        )
+
+    resume = Resume.objects.filter(is_public=True).with_sections().first()
+    benchmarks['view_resume'] = lambda: async_to_sync(view_resume)(_request(f'/resume/{resume.pk}/'), resume.pk)
+    benchmarks['download_pdf_sections'] = lambda: snapshots.get_document(resume.pk)
+
+    post = _form_payload(resume)
+    benchmarks['create_resume_ingest'] = lambda: ingest.write_resume(ingest.parse_form(post))
+    return benchmarks
+
+
+def search_benchmarks(size):
+    return {
+        f'search_resumes[{query!r}, {size}]': (
+            lambda query=query: async_to_sync(search_resumes)(_request('/search/', {'q': query}))
+        )
+        for query in SEARCH_QUERIES
+    }
+
+
+def run(sizes=(1_000, 10_000), repeat=5, progress=None):
+    """Seed growing datasets and return ``{benchmark name: time_call() stats}``"""
+    results = {}
+    with benchmark_database(), override_settings(RESUME_HTML_CACHE={'ENABLED': False}):
+        search.reset_backend()
+        try:
+            loaded = 0
+            for size in sorted(sizes):
+                generate(users=max(1, size // 20), resumes=size - loaded, seed=size)
+                loaded = size
+                search.get_backend().rebuild()
+                # generate() sends no signals, so its resumes have no snapshots yet
+                snapshots.rebuild(Resume.objects.filter(snapshot__isnull=True).values_list('pk', flat=True))
+                benchmarks = search_benchmarks(size)
+                if not results:
+                    benchmarks.update(fixed_benchmarks())
+                for name, func in benchmarks.items():
+                    if progress:
+                        progress(name)
+                    try:
+                        results[name] = time_call(func, repeat=repeat)
+                    except Exception as exc:
+                        results[name] = {'error': f'{type(exc).__name__}: {exc}'.splitlines()[0]}
+            # Buffered view counts belong to the scratch database
+            counters.flush()
+        finally:
+            search.reset_backend()
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return ``(name, baseline ms, current ms, change)`` for medians slower by more than ``threshold``
+
+    A benchmark that fails now but had timings in the baseline is reported
+    with a current time and change of None.
+    """
+    regressions = []
+    for name, stats in results.items():
+        before = baseline.get(name, {}).get('median_ms')
+        if not before:
+            continue
+        if 'error' in stats:
+            regressions.append((name, before, None, None))
+            continue
+        after = stats['median_ms']
+        change = after / before - 1
+        if change > threshold:
+            regressions.append((name, before, after, change))
+    return regressions
@@ -0,0 +1,172 @@
+"""Buffered view and download counters, flushed with ``F()`` updates"""
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F, Sum
+
+from . import sqlite
+from .models import Resume
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('views_count', 'downloads_count')
+
+DEFAULTS = {
+    'FLUSH_INTERVAL': 5.0,
+    'MAX_BUFFERED': 1000,
+}
+
+# Resume ids per UPDATE; keeps bound parameters under SQLite's limit
+BATCH_SIZE = 500
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'RESUME_COUNTERS', {})}
+
+
+class CounterBuffer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.deltas = {}
+        self.buffered = 0
+        self.last_flush = time.monotonic()
+        self.timer = None
+
+    def add(self, resume_id, field, amount=1):
+        """Buffer an increment; returns True when a flush is due"""
+        config = get_config()
+        with self.lock:
+            counts = self.deltas.setdefault(resume_id, dict.fromkeys(FIELDS, 0))
+            counts[field] += amount
+            self.buffered += amount
+            due = (self.buffered >= config['MAX_BUFFERED']
+                   or time.monotonic() - self.last_flush >= config['FLUSH_INTERVAL'])
+            # Threads do not survive fork, so a child arms its own timer
+            if not due and (self.timer is None or not self.timer.is_alive()):
+                # Otherwise the last hits before a quiet spell wait for the next one
+                self.timer = threading.Timer(config['FLUSH_INTERVAL'], self._flush_idle)
+                self.timer.daemon = True
+                self.timer.start()
+            return due
+
+    def increment(self, resume_id, field, amount=1):
+        if self.add(resume_id, field, amount):
+            self.flush()
+
+    def pending(self, resume_id):
+        with self.lock:
+            return dict(self.deltas.get(resume_id) or dict.fromkeys(FIELDS, 0))
+
+    def pending_field(self, field):
+        """Unflushed increments of ``field`` by resume id"""
+        with self.lock:
+            return {resume_id: counts[field] for resume_id, counts in self.deltas.items() if counts[field]}
+
+    def flush(self, inline=False):
+        """Write all buffered increments, from this thread if ``inline``; returns the number of resumes updated"""
+        with self.lock:
+            deltas, self.deltas = self.deltas, {}
+            self.buffered = 0
+            self.last_flush = time.monotonic()
+            timer, self.timer = self.timer, None
+        if timer is not None:
+            timer.cancel()
+        if not deltas:
+            return 0
+
+        groups = defaultdict(list)
+        for resume_id, counts in deltas.items():
+            groups[tuple(counts[field] for field in FIELDS)].append(resume_id)
+        try:
+            if inline:
+                with transaction.atomic():
+                    _write_groups(groups)
+            else:
+                sqlite.write(_write_groups, groups)
+        except DatabaseError:
+            logger.exception('Could not flush resume counters; keeping them buffered')
+            self._restore(deltas)
+            return 0
+        return len(deltas)
+
+    def _flush_idle(self):
+        try:
+            self.flush()
+        finally:
+            # The timer thread's own connection, if the write ran inline
+            connections.close_all()
+
+    def _restore(self, deltas):
+        with self.lock:
+            for resume_id, counts in deltas.items():
+                pending = self.deltas.setdefault(resume_id, dict.fromkeys(FIELDS, 0))
+                for field, n in counts.items():
+                    pending[field] += n
+                    self.buffered += n
+
+
+def _write_groups(groups):
+    for amounts, ids in groups.items():
+        changes = {field: F(field) + n for field, n in zip(FIELDS, amounts) if n}
+        for start in range(0, len(ids), BATCH_SIZE):
+            Resume.objects.filter(pk__in=ids[start:start + BATCH_SIZE]).update(**changes)
+
+
+buffer = CounterBuffer()
+
+
+def increment(resume_id, field, amount=1):
+    buffer.increment(resume_id, field, amount)
+
+
+async def aincrement(resume_id, field, amount=1):
+    """``increment`` for async views; a due flush runs off the event loop"""
+    if buffer.add(resume_id, field, amount):
+        await sync_to_async(buffer.flush)()
+
+
+def flush():
+    return buffer.flush()
+
+
+def apply_pending(resumes):
+    """Return ``resumes`` as a list with this process's unflushed increments added"""
+    resumes = list(resumes)
+    for resume in resumes:
+        for field, n in buffer.pending(resume.pk).items():
+            if n:
+                setattr(resume, field, getattr(resume, field) + n)
+    return resumes
+
+
+def total(resumes, field):
+    """Sum of ``field`` over the ``resumes`` queryset, with this process's unflushed increments"""
+    stored = resumes.aggregate(total=Sum(field))['total'] or 0
+    pending = buffer.pending_field(field)
+    if not pending:
+        return stored
+    return stored + sum(pending[pk] for pk in resumes.filter(pk__in=pending).values_list('pk', flat=True))
+
+
+async def atotal(resumes, field):
+    stored = (await resumes.aaggregate(total=Sum(field)))['total'] or 0
+    pending = buffer.pending_field(field)
+    if not pending:
+        return stored
+    return stored + sum([pending[pk] async for pk in resumes.filter(pk__in=pending).values_list('pk', flat=True)])
+
+
+def _flush_at_exit():
+    try:
+        buffer.flush(inline=True)
+    except Exception:
+        logger.exception('Could not flush resume counters at exit')
+
+
+atexit.register(_flush_at_exit)
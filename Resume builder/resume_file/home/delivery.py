@@ -0,0 +1,181 @@
+"""
+Streaming delivery of PDF files.
+
+``file_response`` serves an open PDF file without reading it into memory:
+a ``FileResponse`` with ``Content-Length`` and single-range ``Range``
+support, or, when ``SENDFILE`` is configured and the file lives on disk, an
+empty response carrying ``X-Sendfile`` (Apache, lighttpd) or
+``X-Accel-Redirect`` (nginx) so the web server sends the bytes itself.
+Under ASGI, Django reads a synchronous streaming body into a list before
+sending any of it, so there the file is handed over as an ``AsyncIterator``
+that reads one block at a time through ``sync_to_async``.
+For ``x-accel-redirect`` each served directory needs an internal nginx
+location in ``ACCEL_LOCATIONS``, e.g.::
+
+    RESUME_PDF_DELIVERY = {
+        'SENDFILE': 'x-accel-redirect',
+        'ACCEL_LOCATIONS': {BASE_DIR / 'cache': '/_protected/cache/'},
+    }
+"""
+import os
+import re
+from functools import partial
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+DEFAULTS = {
+    'SENDFILE': None,
+    'ACCEL_LOCATIONS': {},
+    # Rendered PDFs stay in memory up to this size before spilling to disk
+    'SPOOL_MAX_MEMORY': 1024 * 1024,
+}
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'RESUME_PDF_DELIVERY', {})}
+
+
+def parse_range(header, size):
+    """Return ``(start, end)`` for a single satisfiable byte range, None to
+    serve the whole file, or False if the range cannot be satisfied"""
+    match = _RANGE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        # Malformed and multi-range requests get the whole file
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start > end or start >= size:
+            return False
+    else:
+        length = int(last)
+        if not length or not size:
+            return False
+        start, end = max(0, size - length), size - 1
+    return start, end
+
+
+class _RangeFile:
+    """Read at most ``length`` bytes of ``file`` from its current position"""
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+class AsyncIterator:
+    """Async iterator taking each item of a blocking iterator through ``sync_to_async``
+
+    ``close`` (by default the iterator's own) runs when the response is closed.
+    """
+
+    _done = object()
+
+    def __init__(self, iterator, close=None):
+        self.iterator = iterator
+        self._close = close or getattr(iterator, 'close', None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        item = await sync_to_async(next)(self.iterator, self._done)
+        if item is self._done:
+            raise StopAsyncIteration
+        return item
+
+    def close(self):
+        if self._close is not None:
+            self._close()
+
+
+def streaming_content(request, iterator):
+    """``iterator`` as the body of a streaming response to ``request``, async under ASGI"""
+    return AsyncIterator(iterator) if isinstance(request, ASGIRequest) else iterator
+
+
+def _size(file):
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    file.seek(0)
+    return size
+
+
+def _sendfile(file, filename, config):
+    path = getattr(file, 'name', None)
+    if not config['SENDFILE'] or not isinstance(path, str) or not os.path.isfile(path):
+        return None
+    path = Path(path).resolve()
+    if config['SENDFILE'] == 'x-sendfile':
+        header, value = 'X-Sendfile', str(path)
+    else:
+        for directory, location in config['ACCEL_LOCATIONS'].items():
+            directory = Path(directory).resolve()
+            if path.is_relative_to(directory):
+                header = 'X-Accel-Redirect'
+                value = location.rstrip('/') + '/' + path.relative_to(directory).as_posix()
+                break
+        else:
+            return None
+    file.close()
+    response = HttpResponse(content_type='application/pdf')
+    response[header] = value
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def file_response(request, file, filename='resume.pdf'):
+    """Serve an open binary PDF file; the response takes ownership of ``file``"""
+    config = get_config()
+    response = _sendfile(file, filename, config)
+    if response is not None:
+        return response
+
+    size = _size(file)
+    byte_range = None
+    # Without validators an If-Range can never match, so it means "whole file"
+    if 'HTTP_RANGE' in request.META and 'HTTP_IF_RANGE' not in request.META:
+        byte_range = parse_range(request.META['HTTP_RANGE'], size)
+    if byte_range is False:
+        file.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        start, end, status = 0, size - 1, 200
+    else:
+        start, end = byte_range
+        status = 206
+        file.seek(start)
+        file = _RangeFile(file, end - start + 1)
+    if isinstance(request, ASGIRequest):
+        chunks = AsyncIterator(iter(partial(file.read, FileResponse.block_size), b''), file.close)
+        response = StreamingHttpResponse(chunks, content_type='application/pdf', status=status)
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+    else:
+        response = FileResponse(file, as_attachment=True, filename=filename, content_type='application/pdf',
+                                status=status)
+    response['Content-Length'] = end - start + 1
+    if byte_range is not None:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,151 @@
+"""
+Batched loading of resumes together with all of their sections.
+
+``Resume.objects.with_sections()`` loads every section row for the fetched
+resumes in one extra query on SQLite: a ``UNION ALL`` over the eight
+section tables with each column cast to text and converted back through
+its model field. That round trip relies on SQLite's text forms, so it is
+only used while every section column is of a type in ``UNION_TYPES``;
+other backends, and sections with other column types, run one ORM query
+per section table instead. Rows are attached the same way ``prefetch_related`` would
+attach them, so ``resume.skills.all()`` and friends no longer hit the
+database.
+"""
+from dataclasses import dataclass
+
+from django.db import connections
+
+from .models import RESUME_SECTIONS
+
+# Resumes per section query; keeps bound parameters under SQLite's limit
+BATCH_SIZE = 100
+
+# Field types whose SQLite text form converts back through to_python unchanged
+UNION_TYPES = {'CharField', 'TextField', 'DateField', 'BooleanField'}
+
+
+def _section_fields(model):
+    return [f for f in model._meta.concrete_fields if f.name not in ('id', 'resume')]
+
+
+def _union_safe():
+    return all(
+        field.get_internal_type() in UNION_TYPES
+        for model in RESUME_SECTIONS.values() for field in _section_fields(model)
+    )
+
+
+def _sections_sql(connection, resume_count):
+    qn = connection.ops.quote_name
+    width = max(len(_section_fields(model)) for model in RESUME_SECTIONS.values())
+    placeholders = ', '.join(['%s'] * resume_count)
+    selects = []
+    for index, model in enumerate(RESUME_SECTIONS.values()):
+        fields = _section_fields(model)
+        columns = [f'CAST({qn(f.column)} AS TEXT)' for f in fields]
+        columns += ['NULL'] * (width - len(fields))
+        selects.append(
+            f'SELECT {index} AS section, {qn("id")}, {qn("resume_id")}, {", ".join(columns)} '
+            f'FROM {qn(model._meta.db_table)} WHERE {qn("resume_id")} IN ({placeholders})'
+        )
+    return ' UNION ALL '.join(selects) + ' ORDER BY 1, 2'
+
+
+def attach_sections(resumes, using=None):
+    """Load section rows for ``resumes`` (one query per batch) and cache them on each
+
+    Rows come from the database the resumes were loaded from unless ``using`` says otherwise.
+    """
+    resumes = [r for r in resumes if r.pk is not None]
+    if using is None:
+        using = (resumes[0]._state.db if resumes else None) or 'default'
+    for start in range(0, len(resumes), BATCH_SIZE):
+        _attach_batch(resumes[start:start + BATCH_SIZE], using)
+
+
+def _attach_batch(resumes, using):
+    by_id = {r.pk: r for r in resumes}
+    names = list(RESUME_SECTIONS)
+    rows = {(pk, name): [] for pk in by_id for name in names}
+
+    load = _load_union if connections[using].vendor == 'sqlite' and _union_safe() else _load_per_table
+    for name, instance in load(by_id, using):
+        # Point back at the loaded resume so instance.resume needs no query
+        instance.resume = by_id[instance.resume_id]
+        rows[(instance.resume_id, name)].append(instance)
+
+    for pk, resume in by_id.items():
+        cache_sections(resume, {name: rows[(pk, name)] for name in names})
+
+
+def _load_union(by_id, using):
+    """Yield ``(section name, row)`` for the resumes in ``by_id`` from one query"""
+    names = list(RESUME_SECTIONS)
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute(_sections_sql(connection, len(by_id)), list(by_id) * len(names))
+        records = cursor.fetchall()
+
+    for section, pk, resume_id, *raw in records:
+        name = names[section]
+        model = RESUME_SECTIONS[name]
+        fields = _section_fields(model)
+        values = [pk, resume_id] + [
+            None if value is None else field.to_python(value)
+            for field, value in zip(fields, raw)
+        ]
+        yield name, model.from_db(using, ['id', 'resume_id'] + [f.attname for f in fields], values)
+
+
+def _load_per_table(by_id, using):
+    for name, model in RESUME_SECTIONS.items():
+        for instance in model._default_manager.using(using).filter(resume_id__in=by_id).order_by('pk'):
+            yield name, instance
+
+
+def cache_sections(resume, sections):
+    """Make ``resume.<section>.all()`` return the given rows without a query"""
+    cache = resume.__dict__.setdefault('_prefetched_objects_cache', {})
+    for name, rows in sections.items():
+        queryset = getattr(resume, name).all()
+        queryset._result_cache = list(rows)
+        queryset._prefetch_done = True
+        cache[name] = queryset
+
+
+@dataclass(frozen=True)
+class ResumeDocument:
+    """A resume and its section rows, as consumed by templates and the PDF renderer"""
+
+    resume: object
+    skills: tuple
+    education: tuple
+    languages: tuple
+    projects: tuple
+    work_experience: tuple
+    certifications: tuple
+    achievements: tuple
+    references: tuple
+
+    @classmethod
+    def from_resume(cls, resume):
+        """Build a document; cheap when the resume came from ``with_sections()``"""
+        return cls(resume=resume, **{
+            name: tuple(getattr(resume, name).all()) for name in RESUME_SECTIONS
+        })
+
+    @property
+    def template_name(self):
+        return f'resume_templates/{self.resume.template}.html'
+
+    @property
+    def sections(self):
+        return {name: getattr(self, name) for name in RESUME_SECTIONS}
+
+    def context(self, picture='display'):
+        """Template context; PDF renders pass ``picture='print'``"""
+        return {
+            'resume': self.resume,
+            'profile_picture_url': self.resume.profile_picture_url(picture),
+            **self.sections,
+        }
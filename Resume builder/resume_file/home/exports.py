@@ -0,0 +1,184 @@
+"""
+Bulk PDF export as a streamed ZIP archive.
+
+``zip_response`` renders the selected resumes in a pool of ``CONCURRENCY``
+spawned worker processes and writes each PDF into the archive as soon as it is
+ready, so the response starts immediately and never holds more than
+``CONCURRENCY * 2`` PDFs in memory. Under ASGI the archive is handed to the
+server through ``delivery.AsyncIterator``, as Django would otherwise read a
+synchronous body into a list before sending any of it. Renders go through the regular PDF
+cache. At most ``MAX_EXPORTS`` exports run at once per server process;
+further requests get a 503. Resumes that fail to render are listed in
+``errors.txt`` at the end of the archive.
+"""
+import concurrent.futures
+import threading
+import zipfile
+
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.text import slugify
+
+from . import delivery
+from .workers import process_pool
+
+DEFAULTS = {
+    'CONCURRENCY': 2,
+    'MAX_EXPORTS': 2,
+}
+
+_slots_lock = threading.Lock()
+_active_exports = 0
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'RESUME_PDF_EXPORT', {})}
+
+
+class _ZipStream:
+    """Write-only file object handing on whatever ZipFile wrote since the last drain"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def _render(resume_id):
+    """Render one resume in a worker process; returns PDF bytes or None"""
+    from .models import Resume
+    from .snapshots import get_document
+    from .utils import render_resume_pdf
+
+    try:
+        document, version = get_document(resume_id)
+    except Resume.DoesNotExist:
+        return None
+    return render_resume_pdf(document)
+
+
+def filename(resume_id, name):
+    return f'{slugify(name) or "resume"}-{resume_id}.pdf'
+
+
+def _zip_info(name):
+    info = zipfile.ZipInfo(name, date_time=timezone.localtime().timetuple()[:6])
+    # PDFs are already compressed
+    info.compress_type = zipfile.ZIP_STORED
+    return info
+
+
+def _render_safely(resume_id):
+    try:
+        data = _render(resume_id)
+    except Exception as exc:
+        return None, f'{type(exc).__name__}: {exc}'
+    return data, 'We had some errors while generating the PDF'
+
+
+def _pooled_results(resumes, concurrency):
+    """Yield ``(id, name, pdf or None, error)`` as the worker processes finish them"""
+    executor = process_pool(concurrency)
+    try:
+        pending = {}
+        remaining = iter(resumes)
+        while True:
+            while len(pending) < concurrency * 2:
+                resume = next(remaining, None)
+                if resume is None:
+                    break
+                pending[executor.submit(_render_safely, resume[0])] = resume
+            if not pending:
+                return
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                resume_id, name = pending.pop(future)
+                try:
+                    data, error = future.result()
+                except Exception as exc:
+                    # The worker process died
+                    data, error = None, f'{type(exc).__name__}: {exc}'
+                yield resume_id, name, data, error
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def stream_archive(resumes, concurrency):
+    """Yield a ZIP of ``(id, name)`` pairs rendered as PDFs, in completion order
+
+    ``concurrency`` 0 renders in this process instead of a pool.
+    """
+    if concurrency:
+        results = _pooled_results(resumes, concurrency)
+    else:
+        results = ((resume_id, name, *_render_safely(resume_id)) for resume_id, name in resumes)
+    stream = _ZipStream()
+    errors = []
+    try:
+        with zipfile.ZipFile(stream, 'w') as archive:
+            for resume_id, name, data, error in results:
+                if data is None:
+                    errors.append(f'{filename(resume_id, name)}: {error}')
+                    continue
+                archive.writestr(_zip_info(filename(resume_id, name)), data)
+                yield stream.drain()
+            if errors:
+                archive.writestr(_zip_info('errors.txt'), '\n'.join(errors) + '\n')
+        yield stream.drain()
+    finally:
+        # Also reached when the client disconnects mid-download
+        results.close()
+
+
+class _ExportSlot:
+    """Iterator over the archive that frees its export slot when the response is closed"""
+
+    def __init__(self, generator):
+        self.generator = generator
+        self.released = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.generator)
+
+    def close(self):
+        global _active_exports
+        self.generator.close()
+        with _slots_lock:
+            if not self.released:
+                self.released = True
+                _active_exports -= 1
+
+
+def zip_response(request, queryset, archive_name='resumes.zip'):
+    """Stream the resumes in ``queryset`` as a ZIP of PDFs"""
+    global _active_exports
+    config = get_config()
+    with _slots_lock:
+        if _active_exports >= config['MAX_EXPORTS']:
+            return JsonResponse({'success': False, 'error': 'Too many exports are running; try again shortly'},
+                                status=503)
+        _active_exports += 1
+    try:
+        resumes = list(queryset.order_by('pk').values_list('pk', 'name'))
+    except BaseException:
+        with _slots_lock:
+            _active_exports -= 1
+        raise
+    content = _ExportSlot(stream_archive(resumes, config['CONCURRENCY']))
+    response = StreamingHttpResponse(delivery.streaming_content(request, content), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{archive_name}"'
+    return response
@@ -0,0 +1,120 @@
+"""
+Rendered HTML cache for ``view_resume``.
+
+Resume templates depend only on the resume and its sections, so the
+rendered page is kept in a Django cache together with its ETag (the
+resume fingerprint) and Last-Modified time. With more than one server
+process, point ``CACHE_ALIAS`` at a shared backend so every process sees
+the invalidation.
+
+Each resume also has a generation token, which ``get_page`` returns with
+the entry and ``set_page`` stores into it; an entry only counts while its
+token is still current. When a change commits the token is replaced, so
+a render that loaded the resume before the commit and stores its page
+after it writes an entry nobody accepts, instead of serving the old page
+for ``TIMEOUT`` seconds.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.dispatch import receiver
+
+from .signals import resume_changed
+
+DEFAULTS = {
+    'ENABLED': True,
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 60 * 60,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'RESUME_HTML_CACHE', {})}
+
+
+def _key(resume_id):
+    return f'resume-html:{resume_id}'
+
+
+def _generation_key(resume_id):
+    return f'resume-html-generation:{resume_id}'
+
+
+def _current(resume_id, found):
+    """``(entry, generation)`` from a ``get_many`` of the page and generation keys"""
+    entry, generation = found.get(_key(resume_id)), found.get(_generation_key(resume_id))
+    if entry is not None and entry.get('generation') != generation:
+        entry = None
+    return entry, generation
+
+
+def get_page(resume_id):
+    """Return ``(entry, generation)``: the cached ``{'body', 'etag', 'last_modified',
+    'is_public'}`` entry or None, and the token to store a new entry with"""
+    config = get_config()
+    if not config['ENABLED']:
+        return None, None
+    cache = caches[config['CACHE_ALIAS']]
+    entry, generation = _current(resume_id, cache.get_many([_key(resume_id), _generation_key(resume_id)]))
+    if generation is None:
+        generation = uuid.uuid4().hex
+        if not cache.add(_generation_key(resume_id), generation, None):
+            generation = cache.get(_generation_key(resume_id))
+    return entry, generation
+
+
+async def aget_page(resume_id):
+    config = get_config()
+    if not config['ENABLED']:
+        return None, None
+    cache = caches[config['CACHE_ALIAS']]
+    found = await cache.aget_many([_key(resume_id), _generation_key(resume_id)])
+    entry, generation = _current(resume_id, found)
+    if generation is None:
+        generation = uuid.uuid4().hex
+        if not await cache.aadd(_generation_key(resume_id), generation, None):
+            generation = await cache.aget(_generation_key(resume_id))
+    return entry, generation
+
+
+def _entry(body, etag, last_modified, is_public, generation):
+    return {
+        'body': body,
+        'etag': etag,
+        'last_modified': last_modified,
+        'is_public': is_public,
+        'generation': generation,
+    }
+
+
+def set_page(resume_id, generation, body, etag, last_modified, is_public):
+    """Store a page rendered after ``get_page`` returned ``generation``"""
+    config = get_config()
+    if not config['ENABLED'] or generation is None:
+        return
+    entry = _entry(body, etag, last_modified, is_public, generation)
+    caches[config['CACHE_ALIAS']].set(_key(resume_id), entry, config['TIMEOUT'])
+
+
+async def aset_page(resume_id, generation, body, etag, last_modified, is_public):
+    config = get_config()
+    if not config['ENABLED'] or generation is None:
+        return
+    entry = _entry(body, etag, last_modified, is_public, generation)
+    await caches[config['CACHE_ALIAS']].aset(_key(resume_id), entry, config['TIMEOUT'])
+
+
+def invalidate(resume_id):
+    config = get_config()
+    if config['ENABLED']:
+        cache = caches[config['CACHE_ALIAS']]
+        cache.set(_generation_key(resume_id), uuid.uuid4().hex, None)
+        cache.delete(_key(resume_id))
+
+
+@receiver(resume_changed, dispatch_uid='html_cache.invalidate')
+def _invalidate_on_change(sender, resume_id, **kwargs):
+    # Before the commit another request could still load and cache the old data
+    transaction.on_commit(lambda: invalidate(resume_id))
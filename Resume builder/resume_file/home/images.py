@@ -0,0 +1,103 @@
+"""
+Profile-picture processing.
+
+Uploads are decoded once, rotated according to their EXIF orientation,
+flattened to RGB and cropped square, then saved as metadata-free JPEG
+variants under ``profile_pics/<content hash>/``:
+
+* ``thumb`` for listings,
+* ``display`` for the HTML resume page (2x the 120px CSS size),
+* ``print`` for PDFs (the 120px image at 300 dpi).
+
+``Resume.profile_picture`` stores the ``print`` name; ``variant_name``
+derives the others. Identical uploads hash to the same directory and are
+stored once. Pictures uploaded before this pipeline keep their original
+file for every variant until ``manage.py process_profile_pictures`` runs.
+"""
+import hashlib
+import io
+import re
+import warnings
+from dataclasses import dataclass
+
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+UPLOAD_DIR = 'profile_pics'
+
+# Variant -> square edge in pixels; print is written last so its presence
+# means the whole set is stored
+VARIANTS = {
+    'thumb': 96,
+    'display': 240,
+    'print': 400,
+}
+JPEG_OPTIONS = {'quality': 85, 'optimize': True, 'progressive': True}
+
+_PROCESSED_NAME = re.compile(rf'^{UPLOAD_DIR}/[0-9a-f]{{32}}/print\.jpg$')
+
+
+@dataclass
+class ProcessedImage:
+    digest: str
+    variants: dict
+
+    @property
+    def name(self):
+        return f'{UPLOAD_DIR}/{self.digest}/print.jpg'
+
+
+def variant_name(name, variant):
+    """Storage name of ``variant`` for a stored profile picture ``name``"""
+    if not _PROCESSED_NAME.match(name):
+        return name
+    return f'{name.rsplit("/", 1)[0]}/{variant}.jpg'
+
+
+def _flatten(image):
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def process(upload):
+    """Decode ``upload`` and render every variant in memory
+
+    Raises ValidationError if the file is not an image Pillow can read.
+    """
+    upload.seek(0)
+    data = upload.read()
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            image = Image.open(io.BytesIO(data))
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    except (OSError, ValueError, Image.DecompressionBombWarning, Image.DecompressionBombError):
+        raise ValidationError('Profile picture: upload a valid image.')
+
+    image = _flatten(image)
+    variants = {}
+    for variant, edge in VARIANTS.items():
+        resized = ImageOps.fit(image, (edge, edge), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        # No exif/icc_profile arguments, so no metadata is written
+        resized.save(buffer, 'JPEG', **JPEG_OPTIONS)
+        variants[variant] = buffer.getvalue()
+    return ProcessedImage(hashlib.sha256(data).hexdigest()[:32], variants)
+
+
+def store(processed, storage=default_storage):
+    """Save the variants unless an identical upload already did; returns the field value"""
+    name = processed.name
+    if not storage.exists(name):
+        for variant, data in processed.variants.items():
+            target = variant_name(name, variant)
+            if not storage.exists(target):
+                storage.save(target, ContentFile(data))
+    return name
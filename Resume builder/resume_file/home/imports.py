@@ -0,0 +1,176 @@
+"""
+Bulk import of JSON Resume documents from JSON Lines.
+
+``import_lines`` reads its input one line at a time and hands chunks of
+``CHUNK_SIZE`` lines to a pool of ``WORKERS`` processes. A worker validates
+each record on its own, then writes the valid ones of the chunk together,
+one ``bulk_create`` per model in a single transaction, so one bad record
+never holds back its neighbours. At most ``WORKERS * 2`` chunks are in
+flight, which keeps memory flat however large the input is.
+
+Records that fail are handed back with their line and error, for the
+caller to set aside and re-import once fixed. A ``Checkpoint`` remembers
+which lines were committed; running again with the same checkpoint skips
+them, so an interrupted import carries on where it stopped. On Ctrl-C the
+chunks already in a worker are finished and recorded first; an import
+killed outright may repeat the chunks that were in flight.
+"""
+import concurrent.futures
+import json
+import os
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError
+
+from . import ingest, jsonresume
+from .workers import process_pool
+
+DEFAULTS = {
+    'CHUNK_SIZE': 500,
+    'WORKERS': 2,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'RESUME_BULK_IMPORT', {})}
+
+
+class Checkpoint:
+    """Line ranges already imported, saved to ``path`` after every chunk"""
+
+    def __init__(self, path):
+        self.path = path
+        # Every line up to ``done`` is finished; ``ranges`` are finished
+        # (first, last) chunks past it, waiting for earlier chunks
+        self.done = 0
+        self.ranges = []
+        if path and os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            self.done = state['done']
+            self.ranges = [tuple(r) for r in state['ranges']]
+
+    def __contains__(self, number):
+        return number <= self.done or any(first <= number <= last for first, last in self.ranges)
+
+    def add(self, first, last):
+        self.ranges = sorted([*self.ranges, (first, last)])
+        while self.ranges and self.ranges[0][0] <= self.done + 1:
+            self.done = max(self.done, self.ranges.pop(0)[1])
+        if self.path:
+            temporary = f'{self.path}.tmp'
+            with open(temporary, 'w') as f:
+                json.dump({'done': self.done, 'ranges': self.ranges}, f)
+            os.replace(temporary, self.path)
+
+
+def build_record(text, user_id=None, public=False):
+    """Validate one JSON Lines record; returns ``build_instances`` output"""
+    try:
+        document = json.loads(text)
+    except ValueError as exc:
+        raise ValidationError(f'Invalid JSON: {exc}')
+    if not isinstance(document, dict):
+        raise ValidationError('Expected a JSON object.')
+    payload, is_public = jsonresume.to_payload(document)
+    resume, sections = ingest.build_instances(ingest.parse_json(payload))
+    resume.user_id = user_id
+    resume.is_public = public or is_public
+    return resume, sections
+
+
+def import_chunk(lines, user_id=None, public=False):
+    """Import ``(number, text)`` lines; returns the number imported and ``(number, text, error)`` failures"""
+    built, failures = [], []
+    for number, text in lines:
+        if not text.strip():
+            continue
+        try:
+            built.append((number, text, build_record(text, user_id, public)))
+        except ValidationError as exc:
+            failures.append((number, text, '; '.join(exc.messages)))
+        except Exception as exc:
+            # A record the mapping did not anticipate fails on its own,
+            # not with the whole chunk
+            failures.append((number, text, f'{type(exc).__name__}: {exc}'))
+    if built:
+        try:
+            ingest.write_built([instances for number, text, instances in built])
+        except DatabaseError as exc:
+            # The chunk is written in one transaction, so none of it was saved
+            failures.extend((number, text, f'{type(exc).__name__}: {exc}') for number, text, _ in built)
+            built = []
+    return len(built), sorted(failures)
+
+
+def _chunks(lines, chunk_size, checkpoint):
+    chunk = []
+    for number, text in enumerate(lines, start=1):
+        if number in checkpoint:
+            continue
+        chunk.append((number, text.rstrip('\n')))
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _pooled(chunks, workers, user_id, public):
+    # Workers ignore Ctrl-C, so chunks they have started are committed and reported
+    executor = process_pool(workers, ignore_interrupts=True)
+    try:
+        pending = {}
+        interrupted = None
+        while True:
+            while interrupted is None and len(pending) < workers * 2:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                pending[executor.submit(import_chunk, chunk, user_id, public)] = chunk
+            if not pending:
+                break
+            try:
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            except KeyboardInterrupt as exc:
+                # Chunks already handed to a worker will be committed, so
+                # wait for them to be reported before stopping
+                interrupted = exc
+                for future in list(pending):
+                    if future.cancel():
+                        del pending[future]
+                continue
+            for future in done:
+                chunk = pending.pop(future)
+                try:
+                    imported, failures = future.result()
+                except Exception as exc:
+                    # The worker process died
+                    imported, failures = 0, [(number, text, f'{type(exc).__name__}: {exc}')
+                                             for number, text in chunk if text.strip()]
+                yield chunk, imported, failures
+        if interrupted is not None:
+            raise interrupted
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def import_lines(lines, workers=None, chunk_size=None, user_id=None, public=False, checkpoint=None):
+    """Import JSON Lines, yielding ``(first, last, imported, failures)`` per chunk as it finishes
+
+    ``workers`` 0 imports in this process instead of a pool.
+    """
+    config = get_config()
+    workers = config['WORKERS'] if workers is None else workers
+    checkpoint = checkpoint or Checkpoint(None)
+    chunks = _chunks(lines, chunk_size or config['CHUNK_SIZE'], checkpoint)
+    if workers:
+        results = _pooled(chunks, workers, user_id, public)
+    else:
+        results = ((chunk, *import_chunk(chunk, user_id, public)) for chunk in chunks)
+    for chunk, imported, failures in results:
+        first, last = chunk[0][0], chunk[-1][0]
+        yield first, last, imported, failures
+        # Only once the caller has set the failures aside
+        checkpoint.add(first, last)
@@ -0,0 +1,286 @@
+"""
+Resume ingestion shared by the create form, JSON APIs and bulk importers.
+
+Input is first normalised into ``ResumeData`` (top-level fields plus a list
+of row dicts per section), then every row is validated before anything is
+written. ``write_resumes`` saves the resumes and ``bulk_create``s each
+section inside a single transaction, through the SQLite write queue.
+"""
+from dataclasses import dataclass, field
+from functools import partial
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import images, snapshots, sqlite
+from .models import Resume, RESUME_SECTIONS
+from .signals import resume_changed
+
+RESUME_FIELDS = (
+    'title', 'template', 'name', 'about', 'age', 'email', 'phone', 'address',
+    'linkedin', 'github', 'portfolio', 'twitter',
+)
+
+# Model field -> POST list name for each section; the first field is
+# required and rows where it is blank are skipped. The edit form also posts
+# "<section>_ids[]" with the id of each row ('' for new rows).
+SECTION_FORM_FIELDS = {
+    'skills': {
+        'name': 'skills[]',
+        'proficiency': 'skill_proficiencies[]',
+    },
+    'education': {
+        'degree': 'degrees[]',
+        'institution': 'institutions[]',
+        'year': 'years[]',
+        'gpa': 'gpas[]',
+    },
+    'languages': {
+        'name': 'languages[]',
+        'proficiency': 'proficiencies[]',
+    },
+    'projects': {
+        'title': 'project_titles[]',
+        'duration': 'project_durations[]',
+        'description': 'project_descriptions[]',
+        'technologies': 'project_technologies[]',
+    },
+    'work_experience': {
+        'company': 'companies[]',
+        'position': 'positions[]',
+        'duration': 'work_durations[]',
+        'description': 'work_descriptions[]',
+    },
+    'certifications': {
+        'name': 'cert_names[]',
+        'issuer': 'cert_issuers[]',
+        'date_obtained': 'cert_dates[]',
+        'expiry_date': 'cert_expiry_dates[]',
+        'credential_id': 'cert_ids[]',
+        'credential_url': 'cert_urls[]',
+    },
+    'achievements': {
+        'title': 'achievement_titles[]',
+        'description': 'achievement_descriptions[]',
+    },
+    'references': {
+        'name': 'ref_names[]',
+        'position': 'ref_positions[]',
+        'company': 'ref_companies[]',
+        'email': 'ref_emails[]',
+        'phone': 'ref_phones[]',
+        'relationship': 'ref_relationships[]',
+    },
+}
+
+SECTION_LABELS = {
+    'skills': 'Skill',
+    'education': 'Education',
+    'languages': 'Language',
+    'projects': 'Project',
+    'work_experience': 'Work experience',
+    'certifications': 'Certification',
+    'achievements': 'Achievement',
+    'references': 'Reference',
+}
+
+
+@dataclass
+class ResumeData:
+    fields: dict
+    sections: dict = field(default_factory=dict)
+    user: object = None
+    profile_picture: object = None
+
+
+def _clean_value(value):
+    return value.strip() if isinstance(value, str) else value
+
+
+def _row_defaults(name, row):
+    """Fill the defaults the create form has always applied to blank values"""
+    if name in ('skills', 'languages') and not row.get('proficiency'):
+        row['proficiency'] = 'intermediate'
+    if name == 'certifications':
+        if not row.get('date_obtained'):
+            row['date_obtained'] = timezone.now().date()
+        if not row.get('expiry_date'):
+            row['expiry_date'] = None
+    return row
+
+
+def normalise_row(name, row):
+    """Strip the values of a section row and fill the form defaults"""
+    return _row_defaults(name, {key: _clean_value(value) for key, value in row.items()})
+
+
+def _normalise_sections(sections):
+    normalised = {}
+    for name in RESUME_SECTIONS:
+        required = next(iter(SECTION_FORM_FIELDS[name]))
+        rows = []
+        for row in sections.get(name) or ():
+            row = normalise_row(name, row)
+            if not row.get(required):
+                continue
+            rows.append(row)
+        normalised[name] = rows
+    return normalised
+
+
+def form_rows(post, name, posted_only=False):
+    """Rows of one section from the parallel ``[]`` lists of a form POST
+
+    Columns missing from the POST are blank, or with ``posted_only`` left
+    out of the rows.
+    """
+    columns = {key: post.getlist(list_name) for key, list_name in SECTION_FORM_FIELDS[name].items()
+               if list_name in post or not posted_only}
+    count = max((len(values) for values in columns.values()), default=0)
+    return [
+        {key: values[i] if i < len(values) else '' for key, values in columns.items()}
+        for i in range(count)
+    ]
+
+
+def parse_form(post, files=None, user=None):
+    """Build ResumeData from the create form's POST data and parallel ``[]`` lists"""
+    fields = {name: post.get(name, '').strip() for name in RESUME_FIELDS}
+    fields['title'] = fields['title'] or 'My Resume'
+    fields['template'] = fields['template'] or 'modern'
+
+    sections = {name: form_rows(post, name) for name in SECTION_FORM_FIELDS}
+    profile_picture = files.get('profile_picture') if files else None
+    return ResumeData(fields, _normalise_sections(sections), user, profile_picture)
+
+
+def parse_json(payload, user=None):
+    """Build ResumeData from a dict with resume fields and a list of objects per section"""
+    if not isinstance(payload, dict):
+        raise ValidationError('Expected a JSON object.')
+    fields = {name: _clean_value(payload.get(name, '')) or '' for name in RESUME_FIELDS}
+    fields['title'] = fields['title'] or 'My Resume'
+    fields['template'] = fields['template'] or 'modern'
+    sections = {}
+    for name in RESUME_SECTIONS:
+        rows = payload.get(name) or []
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValidationError(f'"{name}" must be a list of objects.')
+        allowed = section_fields(name)
+        sections[name] = [{k: v for k, v in row.items() if k in allowed} for row in rows]
+    return ResumeData(fields, _normalise_sections(sections), user)
+
+
+def _model_field_names(model):
+    return {f.name for f in model._meta.concrete_fields if f.name not in ('id', 'resume')}
+
+
+def section_fields(name):
+    """Field names a section row may set"""
+    return SECTION_FORM_FIELDS[name].keys() | _model_field_names(RESUME_SECTIONS[name])
+
+
+def build_instances(data):
+    """Validate ResumeData, returning an unsaved Resume and section instances
+
+    A processed profile picture is named on the resume but only written to
+    storage once ``write_built`` commits it, so a failed write leaves no
+    files behind.
+    """
+    errors = []
+    resume = Resume(user=data.user, **data.fields)
+    picture = None
+    if data.profile_picture is not None:
+        try:
+            picture = images.process(data.profile_picture)
+        except ValidationError as exc:
+            errors.extend(exc.messages)
+    try:
+        resume.full_clean(exclude=['user', 'profile_picture'], validate_unique=False)
+    except ValidationError as exc:
+        errors.extend(_messages(exc))
+
+    sections = {}
+    for name, model in RESUME_SECTIONS.items():
+        instances = []
+        for number, row in enumerate(data.sections.get(name, ()), start=1):
+            instance = model(**row)
+            errors.extend(validate_row(instance, f'{SECTION_LABELS[name]} #{number}'))
+            instances.append(instance)
+        sections[name] = instances
+
+    if errors:
+        raise ValidationError(errors)
+    if picture is not None:
+        resume.profile_picture = picture.name
+        resume._processed_picture = picture
+    return resume, sections
+
+
+def validate_row(instance, label):
+    """Clean a section instance in place; returns its error messages prefixed with ``label``"""
+    # Optional columns of the form are stored as '' even where the model does
+    # not declare blank=True, so only non-empty values are validated
+    blank = [f.name for f in instance._meta.concrete_fields if getattr(instance, f.attname) == '']
+    try:
+        instance.full_clean(exclude=['resume', *blank], validate_unique=False)
+    except ValidationError as exc:
+        return [f'{label}: {m}' for m in _messages(exc)]
+    return []
+
+
+def _messages(exc):
+    if hasattr(exc, 'error_dict'):
+        return [f'{name}: {message}' for name, messages in exc.message_dict.items()
+                for message in messages]
+    return exc.messages
+
+
+def write_resumes(items):
+    """Validate and save many ResumeData items; returns the saved resumes
+
+    Raises ValidationError before writing anything if any item is invalid.
+    """
+    return write_built([build_instances(data) for data in items])
+
+
+def write_built(built):
+    """Save ``(resume, sections)`` pairs returned by ``build_instances``; returns the resumes"""
+    return sqlite.write(_save_built, built)
+
+
+def _save_built(built):
+    resumes = [resume for resume, sections in built]
+    bulk = connection.features.can_return_rows_from_bulk_insert
+    if bulk:
+        Resume.objects.bulk_create(resumes)
+    else:
+        # Some backends cannot return primary keys from a bulk insert
+        for resume in resumes:
+            resume.save()
+    for name, model in RESUME_SECTIONS.items():
+        rows = []
+        for resume, sections in built:
+            for instance in sections[name]:
+                instance.resume = resume
+                rows.append(instance)
+        if rows:
+            model.objects.bulk_create(rows)
+    # bulk_create does not send post_save, so announce the new rows where
+    # post_save would have, inside the transaction; receivers such as the
+    # search index then batch their work until commit. Resumes written with
+    # save() announced themselves before their sections existed, so they
+    # are announced again as changed.
+    with snapshots.deferred():
+        for resume in resumes:
+            resume_changed.send(sender=Resume, resume_id=resume.pk, created=bulk, deleted=False)
+    for resume in resumes:
+        picture = getattr(resume, '_processed_picture', None)
+        if picture is not None:
+            transaction.on_commit(partial(images.store, picture))
+    return resumes
+
+
+def write_resume(data):
+    return write_resumes([data])[0]
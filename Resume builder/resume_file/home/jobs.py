@@ -0,0 +1,234 @@
+"""
+Background PDF rendering.
+
+Jobs live in the ``PdfRenderJob`` table, so no external broker is needed.
+``download_pdf`` enqueues them in async mode and the ``run_pdf_workers``
+command renders them in child processes, at most ``CONCURRENCY`` at a time
+and each killed after ``TIMEOUT`` seconds. Finished PDFs are written to
+``OUTPUT_DIR`` and also land in the regular PDF cache.
+
+A job's URL is not enough to fetch its PDF: ``pdf_job`` serves it to the
+session that started the job, the resume's owner and staff.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+
+from .models import PdfRenderJob, Resume
+
+DEFAULTS = {
+    'ASYNC_DOWNLOADS': False,
+    'CONCURRENCY': 2,
+    'TIMEOUT': 60,
+    'POLL_INTERVAL': 1.0,
+    'MAX_PENDING': 1000,
+    # Honour ?async=1 while ASYNC_DOWNLOADS is off; only with workers running
+    'ASYNC_OPT_IN': False,
+    'RETENTION': 24 * 60 * 60,
+    'OUTPUT_DIR': None,
+}
+
+ACTIVE_STATUSES = ('pending', 'running')
+
+# Session key listing the jobs a client started, and how many it keeps
+SESSION_KEY = 'pdf_jobs'
+SESSION_JOBS = 20
+
+
+class QueueFull(Exception):
+    pass
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'RESUME_PDF_JOBS', {})}
+
+
+def output_dir():
+    return Path(get_config()['OUTPUT_DIR'] or Path(settings.BASE_DIR) / 'cache' / 'jobs')
+
+
+def output_path(job_id):
+    return output_dir() / f'{job_id}.pdf'
+
+
+def enqueue(resume):
+    """Return the active job for a resume, creating one if there is none"""
+    while True:
+        job = PdfRenderJob.objects.filter(resume=resume, status__in=ACTIVE_STATUSES).first()
+        if job is not None:
+            return job
+        if PdfRenderJob.objects.filter(status='pending').count() >= get_config()['MAX_PENDING']:
+            raise QueueFull('Too many PDF jobs are waiting to be rendered')
+        try:
+            with transaction.atomic():
+                return PdfRenderJob.objects.create(resume=resume)
+        except IntegrityError:
+            # A concurrent request created it first; the constraint allows one
+            continue
+
+
+def _remembered(job_ids, job):
+    job_id = str(job.pk)
+    return [pk for pk in job_ids if pk != job_id][-(SESSION_JOBS - 1):] + [job_id]
+
+
+def remember(session, job):
+    """Let the client behind ``session`` poll ``job``"""
+    session[SESSION_KEY] = _remembered(session.get(SESSION_KEY, []), job)
+
+
+async def aremember(session, job):
+    await session.aset(SESSION_KEY, _remembered(await session.aget(SESSION_KEY, []), job))
+
+
+def can_poll(job, session, user):
+    """Whether the job may be served to this client: the one that started it,
+    the resume's owner or staff, not anyone the job URL reached"""
+    if str(job.pk) in session.get(SESSION_KEY, []):
+        return True
+    return user.is_authenticated and (user.is_staff or job.resume.user_id == user.pk)
+
+
+def open_output(job):
+    """Return the rendered PDF of a finished job as an open file, or None if it is gone"""
+    try:
+        return open(output_path(job.pk), 'rb')
+    except FileNotFoundError:
+        return None
+
+
+def claim_next():
+    """Atomically move the oldest pending job to running and return its id"""
+    while True:
+        job_id = (PdfRenderJob.objects.filter(status='pending')
+                  .order_by('created_at').values_list('pk', flat=True).first())
+        if job_id is None:
+            return None
+        claimed = PdfRenderJob.objects.filter(pk=job_id, status='pending').update(
+            status='running', started_at=timezone.now())
+        if claimed:
+            return job_id
+
+
+def finish(job_id, error=''):
+    PdfRenderJob.objects.filter(pk=job_id).update(
+        status='failed' if error else 'done', error=error, finished_at=timezone.now())
+
+
+def render_job(job_id):
+    """Render one claimed job; runs inside a worker process"""
+    from .snapshots import get_document
+    from .utils import open_resume_pdf
+
+    try:
+        job = PdfRenderJob.objects.get(pk=job_id)
+        document, version = get_document(job.resume_id)
+        pdf = open_resume_pdf(document)
+        if pdf is None:
+            finish(job_id, 'We had some errors while generating the PDF')
+            return
+        path = output_path(job_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        with pdf, os.fdopen(fd, 'wb') as f:
+            shutil.copyfileobj(pdf, f)
+        os.replace(tmp, path)
+        finish(job_id)
+    except (PdfRenderJob.DoesNotExist, Resume.DoesNotExist):
+        pass
+    except Exception as exc:
+        finish(job_id, f'{type(exc).__name__}: {exc}')
+    finally:
+        connections.close_all()
+
+
+def _worker_main(job_id):
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    render_job(job_id)
+
+
+def requeue_orphans(timeout):
+    """Return jobs left running past ``timeout`` by a worker that died to pending"""
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return PdfRenderJob.objects.filter(status='running', started_at__lt=cutoff).update(
+        status='pending', started_at=None)
+
+
+def prune(retention):
+    cutoff = timezone.now() - timedelta(seconds=retention)
+    for job_id in PdfRenderJob.objects.filter(
+            status__in=('done', 'failed'), finished_at__lt=cutoff).values_list('pk', flat=True):
+        output_path(job_id).unlink(missing_ok=True)
+        PdfRenderJob.objects.filter(pk=job_id).delete()
+
+
+class WorkerPool:
+    """Run claimed jobs in child processes with a concurrency cap and hard timeout"""
+
+    def __init__(self, concurrency, timeout, poll_interval, stdout=None):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.stdout = stdout
+        methods = multiprocessing.get_all_start_methods()
+        self.context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+        self.running = {}
+        self.last_prune = 0.0
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def start(self, job_id):
+        # Children must not inherit the parent's open database connections
+        connections.close_all()
+        process = self.context.Process(target=_worker_main, args=(job_id,), daemon=True)
+        process.start()
+        self.running[job_id] = (process, time.monotonic())
+        self.log(f'Started job {job_id}')
+
+    def reap(self):
+        now = time.monotonic()
+        for job_id, (process, started) in list(self.running.items()):
+            if process.is_alive():
+                if now - started < self.timeout:
+                    continue
+                process.terminate()
+                process.join()
+                finish(job_id, f'Timed out after {self.timeout} seconds')
+                self.log(f'Job {job_id} timed out')
+            else:
+                process.join()
+                if process.exitcode != 0:
+                    PdfRenderJob.objects.filter(pk=job_id, status='running').update(
+                        status='failed', error=f'Worker exited with code {process.exitcode}',
+                        finished_at=timezone.now())
+                self.log(f'Finished job {job_id}')
+            del self.running[job_id]
+
+    def run(self, once=False, retention=None):
+        requeue_orphans(self.timeout)
+        while True:
+            self.reap()
+            while len(self.running) < self.concurrency:
+                job_id = claim_next()
+                if job_id is None:
+                    break
+                self.start(job_id)
+            if once and not self.running:
+                return
+            if retention and time.monotonic() - self.last_prune > 60:
+                prune(retention)
+                self.last_prune = time.monotonic()
+            time.sleep(self.poll_interval)
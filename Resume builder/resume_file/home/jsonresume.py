@@ -0,0 +1,277 @@
+"""
+Mapping between resumes and the JSON Resume schema (https://jsonresume.org/schema).
+
+``to_payload`` turns a JSON Resume document into the flat payload
+``ingest.parse_json`` accepts; ``from_resume`` goes the other way. Standard
+keys carry everything the schema has a place for (``work`` ->
+``work_experience``, ``awards`` -> ``achievements``, ``certificates`` ->
+``certifications`` and so on). Values without one, such as a reference's
+position or a project's GitHub link, travel as extra keys on the same
+objects, and the resume's own title, template, age and visibility live
+under ``meta.resumeBuilder``, so an export imports back unchanged. Partial
+dates (``2020`` or ``2020-05``) become the first day of the period.
+"""
+import datetime
+
+from django.core.exceptions import ValidationError
+
+from .models import RESUME_SECTIONS, Resume
+
+META_KEY = 'resumeBuilder'
+
+# Resume field -> network name written on export
+PROFILE_FIELDS = {'linkedin': 'LinkedIn', 'github': 'GitHub', 'twitter': 'Twitter'}
+# Lower-cased network name -> resume field
+NETWORKS = {'linkedin': 'linkedin', 'github': 'github', 'twitter': 'twitter', 'x': 'twitter'}
+
+SKILL_LEVELS = {
+    'beginner': 'beginner', 'novice': 'beginner', 'basic': 'beginner',
+    'intermediate': 'intermediate',
+    'advanced': 'advanced',
+    'expert': 'expert', 'master': 'expert',
+}
+LANGUAGE_FLUENCY = {
+    'basic': 'basic', 'elementary': 'basic', 'beginner': 'basic',
+    'intermediate': 'intermediate', 'conversational': 'intermediate',
+    'advanced': 'advanced', 'professional': 'advanced', 'fluent': 'advanced',
+    'native': 'native', 'bilingual': 'native', 'native speaker': 'native',
+}
+
+
+def _text(value):
+    return value.strip() if isinstance(value, str) else ''
+
+
+def _clip(model, field, value):
+    """Cut ``value`` to the column length so one long string does not reject a record"""
+    max_length = model._meta.get_field(field).max_length
+    return value[:max_length] if max_length else value
+
+
+def parse_date(value):
+    """Date for a JSON Resume ``YYYY``, ``YYYY-MM`` or ``YYYY-MM-DD`` value, or None"""
+    parts = _text(value).split('-')
+    try:
+        numbers = [int(part) for part in parts[:3]]
+        return datetime.date(numbers[0], *(numbers[1:] + [1, 1])[:2])
+    except (ValueError, IndexError):
+        return None
+
+
+def _period(start, end):
+    start, end = _text(start), _text(end)
+    if not start:
+        return end
+    return f'{start} - {end or "Present"}'
+
+
+def _lines(summary, highlights):
+    lines = [_text(summary)] if _text(summary) else []
+    lines += [f'- {_text(h)}' for h in _strings(highlights, 'highlights') if _text(h)]
+    return '\n'.join(lines)
+
+
+def _object(value, name):
+    """``value`` if it is a JSON object, {} if it is missing"""
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise ValidationError(f'"{name}" must be an object.')
+    return value
+
+
+def _strings(value, name):
+    """``value`` if it is a JSON array, () if it is missing"""
+    if value is None:
+        return ()
+    if not isinstance(value, list):
+        raise ValidationError(f'"{name}" must be an array.')
+    return value
+
+
+def _objects(document, key):
+    value = document.get(key) or []
+    return [item for item in value if isinstance(item, dict)] if isinstance(value, list) else []
+
+
+def _address(location):
+    if not isinstance(location, dict):
+        return ''
+    region = ' '.join(filter(None, (_text(location.get('region')), _text(location.get('postalCode')))))
+    parts = (location.get('address'), location.get('city'), region, location.get('countryCode'))
+    return ', '.join(filter(None, (_text(part) for part in parts)))
+
+
+def to_payload(document):
+    """Flat ``ingest.parse_json`` payload for a JSON Resume document
+
+    ``is_public`` is returned separately since the create form has no such field.
+    Values of the wrong JSON type raise ValidationError.
+    """
+    basics = document.get('basics') if isinstance(document.get('basics'), dict) else {}
+    meta = _object(_object(document.get('meta'), 'meta').get(META_KEY), f'meta.{META_KEY}')
+    payload = {
+        'title': _text(meta.get('title')) or _text(basics.get('label')),
+        'template': _text(meta.get('template')),
+        'age': str(meta.get('age') or ''),
+        'name': _text(basics.get('name')),
+        'about': _text(basics.get('summary')),
+        'email': _text(basics.get('email')),
+        'phone': _clip(Resume, 'phone', _text(basics.get('phone'))),
+        'address': _address(basics.get('location')),
+        'portfolio': _text(basics.get('url')),
+    }
+    for profile in _objects(basics, 'profiles'):
+        network = NETWORKS.get(_text(profile.get('network')).lower())
+        if network and not payload.get(network):
+            payload[network] = _text(profile.get('url'))
+
+    payload['skills'] = [{
+        'name': _clip(RESUME_SECTIONS['skills'], 'name', _text(skill.get('name'))),
+        'proficiency': SKILL_LEVELS.get(_text(skill.get('level')).lower(), ''),
+    } for skill in _objects(document, 'skills')]
+    payload['languages'] = [{
+        'name': _clip(RESUME_SECTIONS['languages'], 'name', _text(language.get('language'))),
+        'proficiency': LANGUAGE_FLUENCY.get(_text(language.get('fluency')).lower(), ''),
+    } for language in _objects(document, 'languages')]
+    payload['education'] = [{
+        'institution': _text(school.get('institution')),
+        'degree': ' '.join(filter(None, (_text(school.get('studyType')), _text(school.get('area'))))),
+        'year': _text(school.get('endDate'))[:4] or _text(school.get('startDate'))[:4],
+        'gpa': _clip(RESUME_SECTIONS['education'], 'gpa', _text(school.get('score'))),
+        'description': _text(school.get('description')) or ', '.join(
+            _text(course) for course in _strings(school.get('courses'), 'courses') if _text(course)),
+    } for school in _objects(document, 'education')]
+    payload['work_experience'] = [{
+        'company': _text(job.get('name')) or _text(job.get('company')),
+        'position': _text(job.get('position')),
+        'duration': _clip(RESUME_SECTIONS['work_experience'], 'duration',
+                          _text(job.get('duration')) or _period(job.get('startDate'), job.get('endDate'))),
+        'description': _lines(job.get('summary'), job.get('highlights')),
+        'start_date': parse_date(job.get('startDate')),
+        'end_date': parse_date(job.get('endDate')),
+        'current': bool(_text(job.get('startDate'))) and not _text(job.get('endDate')),
+    } for job in _objects(document, 'work')]
+    payload['projects'] = [{
+        'title': _text(project.get('name')),
+        'duration': _clip(RESUME_SECTIONS['projects'], 'duration', _text(project.get('duration')) or _period(
+            project.get('startDate'), project.get('endDate'))),
+        'description': _lines(project.get('description'), project.get('highlights')),
+        'technologies': _clip(RESUME_SECTIONS['projects'], 'technologies', ', '.join(
+            _text(keyword) for keyword in _strings(project.get('keywords'), 'keywords') if _text(keyword))),
+        'github_link': _text(project.get('githubUrl')),
+        'live_link': _text(project.get('url')),
+    } for project in _objects(document, 'projects')]
+    payload['certifications'] = [{
+        'name': _text(certificate.get('name')),
+        'issuer': _text(certificate.get('issuer')),
+        'date_obtained': parse_date(certificate.get('date')),
+        'expiry_date': parse_date(certificate.get('expiryDate')),
+        'credential_id': _text(certificate.get('credentialId')),
+        'credential_url': _text(certificate.get('url')),
+    } for certificate in _objects(document, 'certificates')]
+    payload['achievements'] = [{
+        'title': _text(award.get('title')),
+        'description': _text(award.get('summary')) or _text(award.get('awarder')),
+        'date': parse_date(award.get('date')),
+    } for award in _objects(document, 'awards')]
+    payload['references'] = [{
+        'name': _text(reference.get('name')),
+        'position': _text(reference.get('position')),
+        'company': _text(reference.get('company')),
+        'email': _text(reference.get('email')),
+        'phone': _clip(RESUME_SECTIONS['references'], 'phone', _text(reference.get('phone'))),
+        'relationship': _clip(RESUME_SECTIONS['references'], 'relationship', _text(reference.get('reference'))),
+    } for reference in _objects(document, 'references')]
+    return payload, bool(meta.get('isPublic'))
+
+
+def _date(value):
+    return value.isoformat() if value else None
+
+
+def _compact(item):
+    return {key: value for key, value in item.items() if value not in ('', None, [])}
+
+
+def from_resume(resume):
+    """JSON Resume document for a resume loaded with ``with_sections()``"""
+    profiles = [{'network': network, 'url': getattr(resume, field)}
+                for field, network in PROFILE_FIELDS.items() if getattr(resume, field)]
+    return _compact({
+        'basics': _compact({
+            'name': resume.name,
+            'email': resume.email,
+            'phone': resume.phone,
+            'url': resume.portfolio,
+            'summary': resume.about,
+            'location': {'address': resume.address} if resume.address else None,
+            'profiles': profiles,
+        }),
+        'work': [_compact({
+            'name': job.company,
+            'position': job.position,
+            'duration': job.duration,
+            'startDate': _date(job.start_date),
+            'endDate': _date(job.end_date),
+            'summary': job.description,
+        }) for job in resume.work_experience.all()],
+        'education': [_compact({
+            'institution': school.institution,
+            'studyType': school.degree,
+            'endDate': school.year,
+            'score': school.gpa,
+            'description': school.description,
+        }) for school in resume.education.all()],
+        'skills': [_compact({'name': skill.name, 'level': skill.proficiency}) for skill in resume.skills.all()],
+        'languages': [_compact({'language': language.name, 'fluency': language.proficiency})
+                      for language in resume.languages.all()],
+        'projects': [_compact({
+            'name': project.title,
+            'duration': project.duration,
+            'description': project.description,
+            'keywords': [k.strip() for k in project.technologies.split(',') if k.strip()],
+            'url': project.live_link,
+            'githubUrl': project.github_link,
+        }) for project in resume.projects.all()],
+        'certificates': [_compact({
+            'name': certificate.name,
+            'issuer': certificate.issuer,
+            'date': _date(certificate.date_obtained),
+            'expiryDate': _date(certificate.expiry_date),
+            'credentialId': certificate.credential_id,
+            'url': certificate.credential_url,
+        }) for certificate in resume.certifications.all()],
+        'awards': [_compact({
+            'title': achievement.title,
+            'summary': achievement.description,
+            'date': _date(achievement.date),
+        }) for achievement in resume.achievements.all()],
+        'references': [_compact({
+            'name': reference.name,
+            'reference': reference.relationship,
+            'position': reference.position,
+            'company': reference.company,
+            'email': reference.email,
+            'phone': reference.phone,
+        }) for reference in resume.references.all()],
+        'meta': {META_KEY: _compact({
+            'id': resume.pk,
+            'title': resume.title,
+            'template': resume.template,
+            'age': resume.age,
+            'isPublic': resume.is_public,
+        })},
+    })
+
+
+def export_documents(resumes, batch_size=200):
+    """Yield a JSON Resume document per resume, loading ``batch_size`` resumes at a time"""
+    last = 0
+    while True:
+        batch = list(resumes.filter(pk__gt=last).order_by('pk').with_sections()[:batch_size])
+        if not batch:
+            return
+        for resume in batch:
+            yield from_resume(resume)
+        last = batch[-1].pk
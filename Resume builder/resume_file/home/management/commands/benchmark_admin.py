@@ -0,0 +1,129 @@
+import json
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from home import search
+from home.benchmarks import benchmark_database, time_call
+from home.benchmarks.data import SECTION_SIZES, generate
+from home.models import *
+
+# The changelist options before the large-table rework
+LEGACY = {
+    Resume: {
+        'list_display': ('name', 'title', 'user', 'template', 'created_at', 'updated_at', 'is_public',
+                         'views_count', 'downloads_count'),
+        'list_filter': ('template', 'is_public', 'created_at', 'updated_at'),
+        'search_fields': ('name', 'title', 'about', 'email'),
+        'list_editable': ('is_public',),
+        'date_hierarchy': 'created_at',
+    },
+    Skill: {'list_display': ('name', 'resume', 'proficiency'), 'list_filter': ('proficiency',),
+            'search_fields': ('name', 'resume__name')},
+    Education: {'list_display': ('degree', 'institution', 'year', 'resume'), 'list_filter': ('year',),
+                'search_fields': ('degree', 'institution', 'resume__name')},
+    Language: {'list_display': ('name', 'proficiency', 'resume'), 'list_filter': ('proficiency',),
+               'search_fields': ('name', 'resume__name')},
+    Project: {'list_display': ('title', 'duration', 'resume'),
+              'search_fields': ('title', 'description', 'resume__name')},
+    WorkExperience: {'list_display': ('position', 'company', 'duration', 'current', 'resume'),
+                     'list_filter': ('current',), 'search_fields': ('position', 'company', 'resume__name')},
+    Certification: {'list_display': ('name', 'issuer', 'date_obtained', 'expiry_date', 'resume'),
+                    'list_filter': ('date_obtained', 'expiry_date'),
+                    'search_fields': ('name', 'issuer', 'resume__name')},
+    Achievement: {'list_display': ('title', 'date', 'resume'), 'list_filter': ('date',),
+                  'search_fields': ('title', 'description', 'resume__name')},
+    Reference: {'list_display': ('name', 'position', 'company', 'resume'),
+                'search_fields': ('name', 'position', 'company', 'resume__name')},
+}
+
+# Changelist query strings measured for every admin
+SCENARIOS = {
+    'first_page': {},
+    'search': {'q': 'Lovelace'},
+}
+
+# Average section rows generated per resume
+ROWS_PER_RESUME = sum(low + high for low, high in SECTION_SIZES.values()) / 2
+
+
+def legacy_admin(model):
+    return type(f'Legacy{model.__name__}Admin', (admin.ModelAdmin,), LEGACY[model])(model, admin.site)
+
+
+class Command(BaseCommand):
+    help = ('Seed a scratch database with about a million section rows and compare admin '
+            'changelist latency and query counts before and after the large-table rework')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--section-rows', type=int, default=1_000_000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--output', help='Write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        resumes = max(1, round(options['section_rows'] / ROWS_PER_RESUME))
+        report = {'resumes': resumes, 'runs': {}}
+        with benchmark_database():
+            search.reset_backend()
+            try:
+                self.run(report, resumes, options['repeat'])
+            finally:
+                search.reset_backend()
+
+        self.print_summary(report)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f'Wrote {options["output"]}')
+
+    def run(self, report, resumes, repeat):
+        self.stdout.write(f'Seeding {resumes} resumes...')
+        report['section_rows'] = generate(
+            users=max(1, resumes // 20), resumes=resumes,
+            progress=lambda done, total: self.stdout.write(f'  {done}/{total}', ending='\r'))
+        self.stdout.write(f'\n{report["section_rows"]} section rows; indexing...')
+        search.get_backend().rebuild()
+        with connection.cursor() as cursor:
+            # Fills the statistics the estimated counts read
+            cursor.execute('ANALYZE')
+
+        user = User.objects.create_superuser('benchmark-admin')
+        for model in LEGACY:
+            report['runs'][model._meta.model_name] = {
+                'before': self.measure(legacy_admin(model), user, repeat),
+                'after': self.measure(admin.site._registry[model], user, repeat),
+            }
+
+    def measure(self, model_admin, user, repeat):
+        results = {}
+        for name, params in SCENARIOS.items():
+            def render():
+                # Counts are cached; measure the cold page
+                cache.clear()
+                request = RequestFactory().get('/admin/', params)
+                request.user = user
+                return model_admin.changelist_view(request).render()
+
+            # Seeding fills the query log, which the capture counts against
+            reset_queries()
+            with CaptureQueriesContext(connection) as queries:
+                render()
+            results[name] = {'queries': len(queries), **time_call(render, repeat=repeat)}
+        return results
+
+    def print_summary(self, report):
+        self.stdout.write(f'{report["section_rows"]} section rows across {report["resumes"]} resumes')
+        self.stdout.write(f'{"changelist":<28}{"before ms":>11}{"after ms":>10}{"speedup":>9}'
+                          f'{"queries":>12}')
+        for model_name, runs in report['runs'].items():
+            for scenario in SCENARIOS:
+                before, after = runs['before'][scenario], runs['after'][scenario]
+                b, a = before['median_ms'], after['median_ms']
+                speedup = f'{b / a:.1f}x' if a else '-'
+                queries = f'{before["queries"]} -> {after["queries"]}'
+                self.stdout.write(f'{model_name + " " + scenario:<28}{b:>11.1f}{a:>10.1f}{speedup:>9}{queries:>12}')
@@ -0,0 +1,81 @@
+import json
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from home.benchmarks import benchmark_database, time_call
+from home.benchmarks.data import generate
+from home.models import Resume, Skill
+from home.pagination import KeysetPaginator, POPULAR
+
+# Last migration before the hot-filter indexes were added
+BEFORE_MIGRATION = '0004_resume_fts'
+
+
+def hot_queries():
+    """The listing and lookup queries issued by home, search_resumes and dashboard"""
+    user_id = Resume.objects.exclude(user=None).values_list('user_id', flat=True).first()
+    public = Resume.objects.filter(is_public=True)
+    paginator = KeysetPaginator(public, 12, ordering=POPULAR)
+    deep = (Resume.objects.filter(is_public=True).order_by('-views_count', '-id')
+            .values_list('views_count', 'id')[5000:5001].first() or (0, 0))
+    return {
+        'featured': Resume.objects.filter(is_public=True).order_by('-views_count')[:6],
+        'search_first_page': Resume.objects.filter(is_public=True).order_by('-views_count', '-id')[:13],
+        'search_deep_keyset_page': public.filter(paginator._after(list(deep), forward=True))
+            .order_by(*POPULAR)[:13],
+        'dashboard': Resume.objects.filter(user_id=user_id).order_by('-updated_at', '-id')[:13],
+        'skill_lookup': Skill.objects.filter(name='Django').values('resume_id')[:100],
+        'resumes_with_skill': Resume.objects.filter(is_public=True, skills__name='Django')
+            .order_by(F('views_count').desc())[:12],
+    }
+
+
+class Command(BaseCommand):
+    help = ('Seed a scratch database and compare query plans and latencies of the hot '
+            'resume queries before and after the hot-filter indexes')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--resumes', type=int, default=100_000)
+        parser.add_argument('--users', type=int, default=5_000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--output', help='Write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        report = {'resumes': options['resumes'], 'users': options['users'], 'runs': {}}
+        with benchmark_database():
+            call_command('migrate', 'home', BEFORE_MIGRATION, verbosity=0)
+            self.stdout.write(f'Seeding {options["resumes"]} resumes...')
+            generate(users=options['users'], resumes=options['resumes'], sections=('skills',),
+                     progress=lambda done, total: self.stdout.write(f'  {done}/{total}', ending='\r'))
+            self.stdout.write('')
+
+            report['runs']['before'] = self.measure(options['repeat'])
+            call_command('migrate', 'home', verbosity=0)
+            report['runs']['after'] = self.measure(options['repeat'])
+
+        self.print_summary(report)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f'Wrote {options["output"]}')
+
+    def measure(self, repeat):
+        results = {}
+        for name, queryset in hot_queries().items():
+            results[name] = {
+                'plan': queryset.explain(),
+                **time_call(lambda: list(queryset.all()), repeat=repeat),
+            }
+        return results
+
+    def print_summary(self, report):
+        before, after = report['runs']['before'], report['runs']['after']
+        self.stdout.write(f'{"query":<26}{"before ms":>12}{"after ms":>12}{"speedup":>10}')
+        for name in before:
+            b, a = before[name]['median_ms'], after[name]['median_ms']
+            speedup = f'{b / a:.1f}x' if a else '-'
+            self.stdout.write(f'{name:<26}{b:>12.3f}{a:>12.3f}{speedup:>10}')
+        for name in after:
+            self.stdout.write(f'\n{name} plan after:\n{after[name]["plan"]}')
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from home import snapshots
+
+
+class Command(BaseCommand):
+    help = 'Compare every resume snapshot with the live tables, optionally rebuilding the ones that drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help='Rebuild missing and stale snapshots')
+
+    def handle(self, *args, **options):
+        drifted = 0
+        for resume_id, problem in snapshots.check(repair=options['repair']):
+            drifted += 1
+            self.stdout.write(f'Resume {resume_id}: {problem} snapshot')
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('All snapshots are up to date'))
+        elif options['repair']:
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {drifted} snapshots'))
+        else:
+            raise CommandError(f'{drifted} snapshots are out of date; run with --repair to rebuild them.')
@@ -0,0 +1,39 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from home.jsonresume import export_documents
+from home.models import Resume
+
+
+class Command(BaseCommand):
+    help = 'Export resumes as JSON Lines in the JSON Resume schema, one document per line'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help="Output file, or '-' for standard output")
+        parser.add_argument('--user', help='Only export resumes owned by this username')
+        parser.add_argument('--public-only', action='store_true', help='Only export public resumes')
+        parser.add_argument('--batch-size', type=int, default=200, help='Resumes loaded per query')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        resumes = Resume.objects.all()
+        if options['user']:
+            resumes = resumes.filter(user__username=options['user'])
+        if options['public_only']:
+            resumes = resumes.filter(is_public=True)
+
+        target = self.stdout if options['path'] == '-' else open(options['path'], 'w', encoding='utf-8')
+        exported = 0
+        try:
+            for document in export_documents(resumes, options['batch_size']):
+                target.write(json.dumps(document, ensure_ascii=False) + '\n')
+                exported += 1
+                if exported % 1000 == 0:
+                    # Progress goes to stderr so it never mixes with exported lines
+                    self.stderr.write(f'Exported {exported} resumes')
+        finally:
+            if target is not self.stdout:
+                target.close()
+        self.stderr.write(self.style.SUCCESS(f'Exported {exported} resumes'))
@@ -0,0 +1,71 @@
+import sys
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from home import imports
+
+
+class Command(BaseCommand):
+    help = ('Import resumes from JSON Lines in the JSON Resume schema (one document per line), '
+            'in chunks across worker processes')
+
+    def add_arguments(self, parser):
+        config = imports.get_config()
+        parser.add_argument('path', help="JSON Lines file, or '-' for standard input")
+        parser.add_argument('--workers', type=int, default=config['WORKERS'],
+                            help='Worker processes; 0 imports in this process')
+        parser.add_argument('--chunk-size', type=int, default=config['CHUNK_SIZE'],
+                            help='Records written together')
+        parser.add_argument('--user', help='Username to own the imported resumes')
+        parser.add_argument('--public', action='store_true', help='Make every imported resume public')
+        parser.add_argument('--failed', help='Write the lines that could not be imported to this file')
+        parser.add_argument('--checkpoint',
+                            help='Record imported lines here and skip the ones already recorded, '
+                                 'so an interrupted import can be run again')
+
+    def handle(self, *args, **options):
+        user_id = None
+        if options['user']:
+            try:
+                user_id = User.objects.get(username=options['user']).pk
+            except User.DoesNotExist:
+                raise CommandError(f'No user named {options["user"]}.')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+
+        source = sys.stdin if options['path'] == '-' else open(options['path'], encoding='utf-8')
+        # Appending keeps the failures of an earlier, interrupted run
+        failed = open(options['failed'], 'a', encoding='utf-8') if options['failed'] else None
+        checkpoint = imports.Checkpoint(options['checkpoint'])
+        imported = failures = 0
+        started = time.perf_counter()
+        try:
+            results = imports.import_lines(
+                source, workers=options['workers'], chunk_size=options['chunk_size'],
+                user_id=user_id, public=options['public'], checkpoint=checkpoint)
+            for first, last, count, chunk_failures in results:
+                imported += count
+                failures += len(chunk_failures)
+                for number, text, error in chunk_failures:
+                    self.stderr.write(f'Line {number}: {error}')
+                    if failed:
+                        failed.write(f'{text}\n')
+                if failed:
+                    failed.flush()
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'Lines {first}-{last}: {imported} imported, {failures} failed, '
+                                  f'{(imported + failures) / elapsed:.0f} records/s')
+        except KeyboardInterrupt:
+            hint = ' Run again with the same --checkpoint to carry on.' if options['checkpoint'] else ''
+            raise CommandError(f'Interrupted after importing {imported} resumes.{hint}')
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if failed:
+                failed.close()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} resumes in {elapsed:.1f}s ({imported / elapsed if elapsed else 0:.0f}/s), '
+            f'{failures} failed'))
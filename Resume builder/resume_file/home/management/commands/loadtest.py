@@ -0,0 +1,123 @@
+import json
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from home import counters, pdf_cache, search
+from home.benchmarks import benchmark_database
+from home.benchmarks.data import generate
+from home.benchmarks.load import (
+    DEFAULT_MIX, AsgiInProcessClient, HttpClient, InProcessClient, LoadTest, parse_mix,
+)
+from home.models import Resume
+
+
+class Command(BaseCommand):
+    help = ('Replay a concurrent mix of home, search, view, download and create requests '
+            'and report throughput, latency percentiles, errors and SQLite lock contention')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Base URL of a running server sharing this database; '
+                                          'without it the app is driven in-process on seeded scratch data')
+        parser.add_argument('--interface', choices=('wsgi', 'asgi', 'both'), default='wsgi',
+                            help='In-process runs: a thread per client (wsgi), coroutines on one event loop '
+                                 'through the ASGI handler (asgi), or both on the same data. To compare real '
+                                 'deployments, run with --url against each server instead')
+        parser.add_argument('--no-sqlite-tuning', action='store_true',
+                            help='In-process runs: use SQLite defaults and no write queue (see RESUME_SQLITE)')
+        parser.add_argument('--clients', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to run for')
+        parser.add_argument('--requests', type=int, help='Stop after this many requests instead')
+        parser.add_argument('--mix', default=','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()),
+                            help='Endpoint weights, e.g. "view=40,search=25,create=5"')
+        parser.add_argument('--resumes', type=int, default=2_000,
+                            help='Resumes to seed for in-process runs')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options['mix'])
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        if options['url']:
+            report = self.load(lambda: HttpClient(options['url']), mix, options, count_locks=False)
+            report['interface'] = options['url']
+            reports = [report]
+        else:
+            reports = self.run_in_process(mix, options)
+
+        for report in reports:
+            self.print_report(report)
+        if len(reports) == 2:
+            self.print_comparison(*reports)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(reports[0] if len(reports) == 1 else reports, f, indent=2)
+            self.stdout.write(f'Wrote {options["output"]}')
+
+    def run_in_process(self, mix, options):
+        cache_dir = tempfile.mkdtemp(prefix='resume-loadtest-pdf-')
+        # Keep PDFs of scratch resumes out of the real cache
+        overrides = {'RESUME_PDF_CACHE': {'LOCATION': cache_dir}}
+        if options['no_sqlite_tuning']:
+            overrides['RESUME_SQLITE'] = {'ENABLED': False}
+        if options['interface'] != 'wsgi':
+            overrides['ALLOWED_HOSTS'] = [*settings.ALLOWED_HOSTS, 'testserver']
+        with benchmark_database(), override_settings(**overrides):
+            pdf_cache.reset_store()
+            search.reset_backend()
+            try:
+                self.stdout.write(f'Seeding {options["resumes"]} resumes...')
+                generate(users=max(1, options['resumes'] // 20), resumes=options['resumes'], seed=options['seed'])
+                search.get_backend().rebuild()
+                interfaces = ('wsgi', 'asgi') if options['interface'] == 'both' else (options['interface'],)
+                clients = {'wsgi': InProcessClient, 'asgi': AsgiInProcessClient}
+                # ASGI serves the async views, as asgi.py arranges; WSGI keeps the configured URLconf
+                urlconfs = {'wsgi': settings.ROOT_URLCONF, 'asgi': 'resume_file.asgi_urls'}
+                reports = []
+                for name in interfaces:
+                    with override_settings(ROOT_URLCONF=urlconfs[name]):
+                        reports.append(self.load(clients[name], mix, options, count_locks=True))
+                return reports
+            finally:
+                counters.flush()
+                pdf_cache.reset_store()
+                search.reset_backend()
+                shutil.rmtree(cache_dir, ignore_errors=True)
+
+    def load(self, make_client, mix, options, count_locks):
+        resume_ids = list(Resume.objects.filter(is_public=True).values_list('pk', flat=True)[:10_000])
+        if not resume_ids and ({'view', 'download'} & mix.keys()):
+            raise CommandError('No public resumes to view or download.')
+        limit = f'{options["requests"]} requests' if options['requests'] else f'{options["duration"]:g}s'
+        self.stdout.write(f'Running {options["clients"]} clients for {limit}...')
+        return LoadTest(
+            make_client, resume_ids, mix=mix, clients=options['clients'], duration=options['duration'],
+            requests=options['requests'], seed=options['seed'], count_locks=count_locks,
+        ).run()
+
+    def print_report(self, report):
+        self.stdout.write(f'\n[{report["interface"]}] {report["requests"]} requests in {report["elapsed_s"]}s '
+                          f'({report["throughput_rps"]} req/s) from {report["clients"]} clients')
+        if report['sqlite_locks'] is not None:
+            self.stdout.write(f'SQLite "database is locked" errors: {report["sqlite_locks"]}')
+        self.stdout.write(f'\n{"endpoint":<10}{"requests":>10}{"errors":>8}{"error %":>9}'
+                          f'{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}')
+        for name, stats in report['endpoints'].items():
+            latencies = ''.join(f'{stats[key]:>10.1f}' if stats[key] is not None else f'{"-":>10}'
+                                for key in ('p50_ms', 'p95_ms', 'p99_ms'))
+            self.stdout.write(f'{name:<10}{stats["requests"]:>10}{stats["errors"]:>8}'
+                              f'{stats["error_rate"]:>9.1%}{latencies}')
+
+    def print_comparison(self, before, after):
+        change = (after['throughput_rps'] / before['throughput_rps'] - 1) if before['throughput_rps'] else 0.0
+        self.stdout.write(f'\n{after["interface"]} vs {before["interface"]}: throughput {change:+.1%}')
+        for name, stats in after['endpoints'].items():
+            old, new = before['endpoints'][name]['p95_ms'], stats['p95_ms']
+            if old and new:
+                self.stdout.write(f'{name:<10} p95 {old:>10.1f} -> {new:>10.1f} ms')
@@ -0,0 +1,29 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+
+from home import images
+from home.models import Resume
+
+
+class Command(BaseCommand):
+    help = 'Generate size variants for profile pictures uploaded before the image pipeline'
+
+    def handle(self, *args, **options):
+        processed = failed = 0
+        resumes = Resume.objects.exclude(profile_picture='').exclude(profile_picture=None)
+        for resume in resumes.iterator():
+            name = resume.profile_picture.name
+            if images.variant_name(name, 'thumb') != name:
+                continue
+            try:
+                with resume.profile_picture.open('rb') as f:
+                    resume.profile_picture = images.store(images.process(f))
+            except (OSError, ValidationError) as exc:
+                failed += 1
+                self.stderr.write(f'Resume {resume.pk}: could not process {name}: {exc}')
+                continue
+            # save() announces the change, and the new updated_at changes the
+            # fingerprint behind page ETags, so cached copies are rebuilt
+            resume.save(update_fields=['profile_picture', 'updated_at'])
+            processed += 1
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} pictures, {failed} failed'))
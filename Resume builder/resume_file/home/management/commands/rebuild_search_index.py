@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from home.search import get_backend, reset_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the resume full-text search index from scratch'
+
+    def handle(self, *args, **options):
+        # Choose again, in case the index was created since the backend was chosen
+        reset_backend()
+        backend = get_backend()
+        count = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {count} resumes with {type(backend).__name__}'))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from home.stats import FEATURED, TOTAL_RESUMES, TOTAL_USERS, reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recompute the cached landing-page totals and featured resumes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep running and refresh every INTERVAL seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            values = reconcile()
+            self.stdout.write(
+                f'{len(values[FEATURED])} featured, '
+                f'{values[TOTAL_RESUMES]} resumes, {values[TOTAL_USERS]} users'
+            )
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
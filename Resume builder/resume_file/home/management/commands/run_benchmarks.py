@@ -0,0 +1,56 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from home.benchmarks import suite
+
+
+class Command(BaseCommand):
+    help = ('Time the PDF, view, section-loading, ingestion and search hot paths on '
+            'synthetic data, optionally failing on regressions against a baseline')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000],
+                            help='Dataset sizes (resumes) to run the search benchmarks at')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--output', help='Write the JSON results to this file')
+        parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Allowed median slowdown before a benchmark counts as a '
+                                 'regression (0.2 = 20%%)')
+
+    def handle(self, *args, **options):
+        results = suite.run(options['sizes'], options['repeat'],
+                            progress=lambda name: self.stdout.write(f'  {name}'))
+        report = {'sizes': sorted(options['sizes']), 'repeat': options['repeat'], 'results': results}
+
+        baseline = {}
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)['results']
+
+        self.stdout.write(f'\n{"benchmark":<44}{"median ms":>12}{"baseline":>12}{"change":>9}')
+        for name, stats in results.items():
+            if 'error' in stats:
+                self.stdout.write(f'{name:<44}  {stats["error"]}')
+                continue
+            line = f'{name:<44}{stats["median_ms"]:>12.3f}'
+            if baseline.get(name, {}).get('median_ms'):
+                before = baseline[name]['median_ms']
+                line += f'{before:>12.3f}{stats["median_ms"] / before - 1:>+9.0%}'
+            self.stdout.write(line)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f'Wrote {options["output"]}')
+
+        regressions = suite.compare(results, baseline, options['threshold'])
+        if regressions:
+            for name, before, after, change in regressions:
+                if after is None:
+                    self.stderr.write(f'{name}: {before:.3f} ms -> failed')
+                else:
+                    self.stderr.write(f'{name}: {before:.3f} ms -> {after:.3f} ms ({change:+.0%})')
+            raise CommandError(f'{len(regressions)} benchmark(s) regressed by more than '
+                               f'{options["threshold"]:.0%}')
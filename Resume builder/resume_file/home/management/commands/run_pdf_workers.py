@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from home.jobs import WorkerPool, get_config
+
+
+class Command(BaseCommand):
+    help = 'Render queued PDF download jobs in a local pool of worker processes'
+
+    def add_arguments(self, parser):
+        config = get_config()
+        parser.add_argument('--concurrency', type=int, default=config['CONCURRENCY'],
+                            help='Maximum number of jobs rendered at once')
+        parser.add_argument('--timeout', type=float, default=config['TIMEOUT'],
+                            help='Seconds before a running job is killed and marked failed')
+        parser.add_argument('--poll-interval', type=float, default=config['POLL_INTERVAL'],
+                            help='Seconds to wait between queue polls')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is drained instead of polling forever')
+
+    def handle(self, *args, **options):
+        pool = WorkerPool(
+            concurrency=max(1, options['concurrency']),
+            timeout=options['timeout'],
+            poll_interval=options['poll_interval'],
+            stdout=self.stdout,
+        )
+        try:
+            pool.run(once=options['once'], retention=get_config()['RETENTION'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping PDF workers')
@@ -0,0 +1,44 @@
+import sqlite3
+import time
+from contextlib import closing
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from home.routing import get_config
+
+
+def _path(settings_dict):
+    name = str(settings_dict['NAME'])
+    # Replicas are usually opened read-only through a "file:...?mode=ro" URI
+    return urlsplit(name).path if name.startswith('file:') else name
+
+
+class Command(BaseCommand):
+    help = ('Copy the primary SQLite database into each SQLite replica in RESUME_DATABASE_ROUTING, '
+            'simulating replication for local testing')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep running and copy every INTERVAL seconds')
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        replicas = get_config()['REPLICAS']
+        if primary.vendor != 'sqlite':
+            raise CommandError('The primary database is not SQLite; use your database\'s own replication.')
+        if not replicas:
+            raise CommandError('RESUME_DATABASE_ROUTING has no REPLICAS.')
+        while True:
+            for alias in replicas:
+                replica = connections[alias]
+                if replica.vendor != 'sqlite':
+                    raise CommandError(f'Replica {alias} is not SQLite.')
+                with closing(sqlite3.connect(_path(primary.settings_dict))) as source, \
+                        closing(sqlite3.connect(_path(replica.settings_dict))) as target:
+                    source.backup(target)
+                self.stdout.write(f'Copied {DEFAULT_DB_ALIAS} to {alias}')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
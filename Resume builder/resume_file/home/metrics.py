@@ -0,0 +1,293 @@
+"""
+Low-overhead per-request performance instrumentation.
+
+``MetricsMiddleware`` records, for each view, the wall time, SQL query
+count and time, template render time and PDF render time/size into
+in-process histograms. They are exposed in the Prometheus text format by
+the ``metrics`` view and, when ``SERVER_TIMING`` is on, summarised in a
+``Server-Timing`` response header. Histograms are per process; scrape
+every worker (or aggregate) when running several.
+
+The scrape endpoint answers requests carrying ``TOKEN`` as a bearer token,
+or coming from ``ALLOWED_IPS``. Behind a reverse proxy the peer address is
+the proxy's, so list it in ``TRUSTED_PROXIES``: the client is then taken
+from ``X-Forwarded-For``, and a forwarded request from any other peer is
+never matched against ``ALLOWED_IPS``.
+
+Other code reports timings with ``timer(name)`` and ``observe(name,
+value)``; outside a request they are recorded under ``view="-"``.
+"""
+import contextvars
+import hmac
+import threading
+from bisect import bisect_left
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates, Template
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SERVER_TIMING': False,
+    'ALLOWED_IPS': ('127.0.0.1', '::1'),
+    'TRUSTED_PROXIES': (),
+    'TOKEN': None,
+}
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 5_000_000)
+
+# name -> (help, buckets)
+METRICS = {
+    'request_duration_seconds': ('Wall time spent handling a request', TIME_BUCKETS),
+    'sql_queries': ('SQL queries issued per request', COUNT_BUCKETS),
+    'sql_duration_seconds': ('Time spent in SQL per request', TIME_BUCKETS),
+    'template_render_seconds': ('Time spent rendering templates per request', TIME_BUCKETS),
+    'pdf_render_seconds': ('Time spent rendering PDFs per request', TIME_BUCKETS),
+    'pdf_size_bytes': ('Size of rendered PDFs', SIZE_BUCKETS),
+}
+PREFIX = 'resume_'
+
+# Server-Timing entry name for each per-request total
+SERVER_TIMING = {
+    'sql_duration_seconds': 'db',
+    'template_render_seconds': 'tpl',
+    'pdf_render_seconds': 'pdf',
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'RESUME_METRICS', {})}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.requests = {}
+
+    def observe(self, name, view, value):
+        with self.lock:
+            histogram = self.histograms.get((name, view))
+            if histogram is None:
+                histogram = self.histograms[(name, view)] = Histogram(METRICS[name][1])
+            histogram.observe(value)
+
+    def count_request(self, view, status):
+        with self.lock:
+            self.requests[(view, status)] = self.requests.get((view, status), 0) + 1
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            lines.append(f'# HELP {PREFIX}requests_total Requests handled, by view and status')
+            lines.append(f'# TYPE {PREFIX}requests_total counter')
+            for (view, status), value in sorted(self.requests.items()):
+                lines.append(f'{PREFIX}requests_total{{view="{view}",status="{status}"}} {value}')
+            for name, (help_text, buckets) in METRICS.items():
+                lines.append(f'# HELP {PREFIX}{name} {help_text}')
+                lines.append(f'# TYPE {PREFIX}{name} histogram')
+                for (metric, view), histogram in sorted(self.histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip((*buckets, '+Inf'), histogram.counts):
+                        cumulative += count
+                        lines.append(f'{PREFIX}{name}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{PREFIX}{name}_sum{{view="{view}"}} {histogram.sum}')
+                    lines.append(f'{PREFIX}{name}_count{{view="{view}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+_current = contextvars.ContextVar('resume_request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Per-request totals, recorded under the view name once the response is ready"""
+
+    def __init__(self):
+        self.totals = dict.fromkeys(('sql_queries', *SERVER_TIMING), 0)
+        self.samples = []
+
+    def add(self, name, value):
+        if name in self.totals:
+            self.totals[name] += value
+        else:
+            self.samples.append((name, value))
+
+
+def observe(name, value):
+    """Record ``value`` for the current request (or directly, outside one)"""
+    metrics = _current.get()
+    if metrics is None:
+        registry.observe(name, '-', value)
+    else:
+        metrics.add(name, value)
+
+
+@contextmanager
+def timer(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Django template backend that reports top-level render time"""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return InstrumentedTemplate(template.template, self)
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timer('template_render_seconds'):
+            return super().render(context, request)
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if metrics is not None:
+            metrics.add('sql_duration_seconds', time.perf_counter() - start)
+            metrics.add('sql_queries', 1)
+
+
+def _install_sql_wrapper(connection):
+    # First in the list, so execute_wrapper() blocks, which pop the last
+    # entry, never remove it
+    if _sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _sql_wrapper)
+
+
+@receiver(connection_created, dispatch_uid='metrics.install_sql_wrapper')
+def _connection_created(sender, connection, **kwargs):
+    # Async views run their queries on per-request threads whose connections
+    # open after the middleware runs; the wrapper finds the request's
+    # collector through the context variable
+    _install_sql_wrapper(connection)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        config = get_config()
+        if not config['ENABLED']:
+            return self.get_response(request)
+
+        for connection in connections.all(initialized_only=True):
+            _install_sql_wrapper(connection)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._record(request, response, metrics, time.perf_counter() - start, config)
+
+    async def __acall__(self, request):
+        config = get_config()
+        if not config['ENABLED']:
+            return await self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._record(request, response, metrics, time.perf_counter() - start, config)
+
+    def _record(self, request, response, metrics, elapsed, config):
+        match = request.resolver_match
+        view = (match.url_name or match.view_name) if match else 'unmatched'
+        registry.count_request(view, response.status_code)
+        registry.observe('request_duration_seconds', view, elapsed)
+        for name, value in (*metrics.totals.items(), *metrics.samples):
+            registry.observe(name, view, value)
+
+        if config['SERVER_TIMING']:
+            entries = [f'{SERVER_TIMING[name]};dur={metrics.totals[name] * 1000:.1f}'
+                       for name in SERVER_TIMING if metrics.totals[name]]
+            entries.append(f'total;dur={elapsed * 1000:.1f};desc="{int(metrics.totals["sql_queries"])} queries"')
+            response['Server-Timing'] = ', '.join(entries)
+        return response
+
+
+def client_ip(request, trusted_proxies):
+    """The address of the client, or None when a proxy we do not trust forwarded the request"""
+    address = request.META.get('REMOTE_ADDR')
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if not forwarded:
+        return address
+    if address not in trusted_proxies:
+        return None
+    # Proxies append the peer they saw, so the rightmost untrusted entry is
+    # the first one a client could not have written itself
+    for address in reversed([part.strip() for part in forwarded.split(',')]):
+        if address not in trusted_proxies:
+            return address
+    return None
+
+
+def _allowed(request, config):
+    token = config['TOKEN']
+    if token:
+        scheme, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+        if scheme.lower() == 'bearer' and hmac.compare_digest(credentials.encode(), token.encode()):
+            return True
+    allowed = config['ALLOWED_IPS']
+    if allowed is None:
+        return True
+    address = client_ip(request, config['TRUSTED_PROXIES'])
+    return address is not None and address in allowed
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint"""
+    if not _allowed(request, get_config()):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,60 @@
+from django.db import migrations
+
+# Frozen copies of home.search's index layout as of this migration, so
+# later changes to the live module do not alter what it creates
+FTS_TABLE = 'home_resume_fts'
+FTS_COLUMNS = ('name', 'title', 'about', 'skills', 'projects', 'work', 'certifications')
+
+
+def fts_row(resume):
+    def join(rows, *fields):
+        return ' '.join(str(getattr(row, f)) for row in rows for f in fields if getattr(row, f))
+
+    return (
+        resume.name,
+        resume.title,
+        resume.about,
+        join(resume.skills.all(), 'name'),
+        join(resume.projects.all(), 'title', 'technologies'),
+        join(resume.work_experience.all(), 'position', 'company'),
+        join(resume.certifications.all(), 'name', 'issuer'),
+    )
+
+
+def create_fts_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        if 'ENABLE_FTS5' not in {row[0] for row in cursor.fetchall()}:
+            return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"{', '.join(FTS_COLUMNS)}, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+
+    Resume = apps.get_model('home', 'Resume')
+    resumes = Resume.objects.prefetch_related('skills', 'projects', 'work_experience', 'certifications')
+    placeholders = ', '.join(['%s'] * (len(FTS_COLUMNS) + 1))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) VALUES ({placeholders})",
+            [[resume.pk, *fts_row(resume)] for resume in resumes.iterator(chunk_size=500)],
+        )
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0003_pdfrenderjob'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:15
+
+import datetime
+import hashlib
+import json
+
+import django.db.models.deletion
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import migrations, models
+
+# Frozen copies of home.snapshots.build and home.pdf_cache.resume_fingerprint
+# as of this migration, so later changes to them do not alter what it writes
+SECTIONS = {
+    'skills': 'Skill',
+    'education': 'Education',
+    'languages': 'Language',
+    'projects': 'Project',
+    'work_experience': 'WorkExperience',
+    'certifications': 'Certification',
+    'achievements': 'Achievement',
+    'references': 'Reference',
+}
+EXCLUDED_FIELDS = ('views_count', 'downloads_count')
+UNRENDERED_FIELDS = ('id',) + EXCLUDED_FIELDS
+
+
+def _values(instance, exclude=()):
+    values = {}
+    for field in instance._meta.concrete_fields:
+        if field.name not in exclude:
+            value = field.get_prep_value(field.value_from_object(instance))
+            values[field.attname] = value.isoformat() if isinstance(value, datetime.datetime) else value
+    return values
+
+
+def _fingerprint(resume, sections):
+    payload = {
+        'resume': {field.attname: field.get_prep_value(field.value_from_object(resume))
+                   for field in resume._meta.concrete_fields if field.name not in UNRENDERED_FIELDS},
+        'sections': {
+            name: [[getattr(row, field.attname) for field in row._meta.concrete_fields
+                    if field.name not in ('id', 'resume')] for row in sections[name]]
+            for name in SECTIONS
+        },
+    }
+    encoded = json.dumps(payload, cls=DjangoJSONEncoder, sort_keys=True)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def build(resume, sections):
+    document = {
+        'resume': _values(resume, EXCLUDED_FIELDS),
+        'sections': {name: [_values(row) for row in sections[name]] for name in SECTIONS},
+    }
+    document = json.loads(json.dumps(document, cls=DjangoJSONEncoder))
+    return document, _fingerprint(resume, sections)[:32]
+
+
+def build_snapshots(apps, schema_editor):
+    Resume = apps.get_model('home', 'Resume')
+    ResumeSnapshot = apps.get_model('home', 'ResumeSnapshot')
+    prefetches = [
+        models.Prefetch(name, queryset=apps.get_model('home', model_name).objects.order_by('pk'))
+        for name, model_name in SECTIONS.items()
+    ]
+    snapshots = []
+    for resume in Resume.objects.order_by('pk').prefetch_related(*prefetches).iterator(chunk_size=500):
+        document, version = build(resume, {name: list(getattr(resume, name).all()) for name in SECTIONS})
+        snapshots.append(ResumeSnapshot(resume=resume, document=document, version=version))
+        if len(snapshots) == 500:
+            ResumeSnapshot.objects.bulk_create(snapshots)
+            snapshots = []
+    ResumeSnapshot.objects.bulk_create(snapshots)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0005_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumeSnapshot',
+            fields=[
+                ('resume', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='snapshot', serialize=False, to='home.resume')),
+                ('document', models.JSONField()),
+                ('version', models.CharField(max_length=32)),
+                ('built_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(build_snapshots, migrations.RunPython.noop),
+    ]
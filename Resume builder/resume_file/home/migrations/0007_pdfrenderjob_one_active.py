@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:51
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fail_duplicate_jobs(apps, schema_editor):
+    # Concurrent downloads could queue a resume twice; keep its oldest active job
+    PdfRenderJob = apps.get_model('home', 'PdfRenderJob')
+    active = PdfRenderJob.objects.filter(status__in=['pending', 'running']).order_by('resume_id', 'created_at')
+    seen = set()
+    duplicates = []
+    for job_id, resume_id in active.values_list('pk', 'resume_id'):
+        if resume_id in seen:
+            duplicates.append(job_id)
+        seen.add(resume_id)
+    PdfRenderJob.objects.filter(pk__in=duplicates).update(
+        status='failed', error='Superseded by another job for the same resume', finished_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0006_resume_snapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_duplicate_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='pdfrenderjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'running'])), fields=('resume',), name='pdfjob_one_active_per_resume'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations
+
+# Frozen copy of the columns the section admins prefix-search, as of this
+# migration. SQLite only uses an index for a case-insensitive LIKE 'term%'
+# when the index collates NOCASE.
+SEARCH_COLUMNS = {
+    'home_skill': ('name',),
+    'home_education': ('degree', 'institution'),
+    'home_language': ('name',),
+    'home_project': ('title',),
+    'home_workexperience': ('position', 'company'),
+    'home_certification': ('name', 'issuer'),
+    'home_achievement': ('title',),
+    'home_reference': ('name', 'position', 'company'),
+}
+
+
+def index_name(table, column):
+    return f'{table[len("home_"):]}_{column}_nocase_idx'
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table, columns in SEARCH_COLUMNS.items():
+        for column in columns:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {index_name(table, column)} ON {table} ({column} COLLATE NOCASE)'
+            )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table, columns in SEARCH_COLUMNS.items():
+        for column in columns:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {index_name(table, column)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0007_pdfrenderjob_one_active'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -1,6 +1,30 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
+import uuid
+
+class ResumeQuerySet(models.QuerySet):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._with_sections = False
+    
+    def _clone(self):
+        clone = super()._clone()
+        clone._with_sections = self._with_sections
+        return clone
+    
+    def with_sections(self):
+        """Load every section of the fetched resumes in one extra query"""
+        clone = self._chain()
+        clone._with_sections = True
+        return clone
+    
+    def _fetch_all(self):
+        fetched = self._result_cache is None
+        super()._fetch_all()
+        if fetched and self._with_sections:
+            from .documents import attach_sections
+            attach_sections([r for r in self._result_cache if isinstance(r, Resume)], self.db)
 
 class Resume(models.Model):
     TEMPLATE_CHOICES = [
@@ -34,8 +58,33 @@ class Resume(models.Model):
     portfolio = models.URLField(blank=True)
     twitter = models.URLField(blank=True)
     
+    objects = ResumeQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            # Featured list, search browsing and its keyset pages
+            models.Index(
+                fields=['-views_count', '-id'], condition=models.Q(is_public=True),
+                name='resume_public_popular_idx',
+            ),
+            # Dashboard listing and its keyset pages
+            models.Index(fields=['user', '-updated_at', '-id'], name='resume_user_recent_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.name} - {self.title}"
+    
+    def profile_picture_url(self, variant='display'):
+        """URL of a profile picture variant ('thumb', 'display' or 'print'), or ''"""
+        if not self.profile_picture:
+            return ''
+        from .images import variant_name
+        return self.profile_picture.storage.url(variant_name(self.profile_picture.name, variant))
+    
+    @property
+    def profile_thumb_url(self):
+        """Listing-sized profile picture URL, or ''"""
+        return self.profile_picture_url('thumb')
 
 class Skill(models.Model):
     resume = models.ForeignKey(Resume, on_delete=models.CASCADE, related_name='skills')
@@ -47,6 +96,11 @@ class Skill(models.Model):
         ('expert', 'Expert'),
     ], default='intermediate')
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['name'], name='skill_name_idx'),
+        ]
+    
     def __str__(self):
         return self.name
 
@@ -131,3 +185,56 @@ class Reference(models.Model):
     
     def __str__(self):
         return f"{self.name} - {self.position} at {self.company}"
+
+class PdfRenderJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    resume = models.ForeignKey(Resume, on_delete=models.CASCADE, related_name='pdf_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    
+    class Meta:
+        indexes = [
+            # Workers claim the oldest pending job
+            models.Index(fields=['status', 'created_at'], name='pdfjob_status_created_idx'),
+        ]
+        constraints = [
+            # One waiting or running job per resume (see jobs.enqueue)
+            models.UniqueConstraint(fields=['resume'], condition=models.Q(status__in=['pending', 'running']),
+                                    name='pdfjob_one_active_per_resume'),
+        ]
+    
+    def __str__(self):
+        return f"PDF job {self.id} ({self.status})"
+
+class ResumeSnapshot(models.Model):
+    """A resume assembled with all of its sections, kept current by home.snapshots"""
+    resume = models.OneToOneField(Resume, on_delete=models.CASCADE, primary_key=True, related_name='snapshot')
+    document = models.JSONField()
+    # Content fingerprint, as sent in view_resume's ETag
+    version = models.CharField(max_length=32)
+    built_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Snapshot of resume {self.resume_id}"
+
+# Child sections of a resume, keyed by their related_name on Resume.
+RESUME_SECTIONS = {
+    'skills': Skill,
+    'education': Education,
+    'languages': Language,
+    'projects': Project,
+    'work_experience': WorkExperience,
+    'certifications': Certification,
+    'achievements': Achievement,
+    'references': Reference,
+}
@@ -0,0 +1,272 @@
+"""
+Keyset (cursor) pagination and cached counts for resume listings.
+
+Pages are selected with a ``WHERE`` on the sort key of the last row seen
+instead of an ``OFFSET``, so page 500 costs the same as page 1. Cursors
+are opaque URL-safe tokens holding that sort key. Totals come from
+``cached_count``, which keeps ``COUNT(*)`` results in the default cache
+for ``COUNT_TIMEOUT`` seconds and is invalidated when resumes change.
+
+``EstimatedCountPaginator`` serves the admin changelists: an unfiltered
+list over a table bigger than ``ESTIMATE_THRESHOLD`` rows shows the
+database's own row estimate instead of running ``COUNT(*)``. PostgreSQL
+keeps one in ``pg_class``; SQLite only once ``ANALYZE`` (or ``PRAGMA
+optimize``) has filled ``sqlite_stat1``, and falls back to a cached exact
+count until then.
+"""
+import base64
+import binascii
+import datetime
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.db.models import Q
+from django.dispatch import receiver
+from django.utils.functional import cached_property
+
+from .models import Resume
+from .signals import resume_changed
+
+COUNT_TIMEOUT = 60
+# Tables estimated to hold fewer rows than this are counted exactly
+ESTIMATE_THRESHOLD = 100_000
+GENERATION_KEY = 'resume-listing-generation'
+
+POPULAR = ('-views_count', '-id')
+RECENT = ('-updated_at', '-id')
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    """Keeps the microseconds DjangoJSONEncoder drops, so rows written within a millisecond stay apart"""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values, direction):
+    payload = json.dumps({'k': values, 'd': direction}, cls=_CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        values, direction = payload['k'], payload['d']
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise InvalidCursor(token)
+    if direction not in ('next', 'prev') or not isinstance(values, list):
+        raise InvalidCursor(token)
+    return values, direction
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """Paginate a queryset by a unique ordering such as ``('-views_count', '-id')``
+
+    The last ordering term must be unique (normally the primary key) so
+    every row has exactly one position.
+    """
+
+    def __init__(self, queryset, per_page, ordering=POPULAR):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.keys = [(term.lstrip('-'), term.startswith('-')) for term in self.ordering]
+
+    def _key_values(self, obj):
+        return [getattr(obj, name) for name, descending in self.keys]
+
+    def _parse_values(self, values):
+        if len(values) != len(self.keys):
+            raise InvalidCursor(values)
+        parsed = []
+        for (name, descending), value in zip(self.keys, values):
+            try:
+                field = self.queryset.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                # Annotations such as a search rank are plain JSON values
+                parsed.append(value)
+                continue
+            try:
+                parsed.append(None if value is None else field.to_python(value))
+            except ValidationError:
+                raise InvalidCursor(values)
+        return parsed
+
+    def _after(self, values, forward):
+        """Rows strictly after ``values`` in the ordering (or before, if not ``forward``)"""
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self.keys, values):
+            lookup = 'lt' if descending == forward else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def _query(self, cursor):
+        """Return ``(rows queryset, cursor values, forward)`` for a page"""
+        values, direction = None, 'next'
+        if cursor:
+            try:
+                values, direction = decode_cursor(cursor)
+                values = self._parse_values(values)
+            except InvalidCursor:
+                values, direction = None, 'next'
+
+        forward = direction == 'next'
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._after(values, forward))
+        if forward:
+            queryset = queryset.order_by(*self.ordering)
+        else:
+            queryset = queryset.order_by(*[
+                term[1:] if term.startswith('-') else f'-{term}' for term in self.ordering
+            ])
+        return queryset[:self.per_page + 1], values, forward
+
+    def _page(self, rows, values, forward):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or not forward:
+                next_cursor = encode_cursor(self._key_values(rows[-1]), 'next')
+            if values is not None and (forward or has_more):
+                previous_cursor = encode_cursor(self._key_values(rows[0]), 'prev')
+        return KeysetPage(rows, next_cursor, previous_cursor)
+
+    def page(self, cursor=None):
+        queryset, values, forward = self._query(cursor)
+        return self._page(list(queryset), values, forward)
+
+    async def apage(self, cursor=None):
+        queryset, values, forward = self._query(cursor)
+        return self._page([row async for row in queryset], values, forward)
+
+
+def _generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        generation = 1
+        cache.add(GENERATION_KEY, generation, None)
+    return generation
+
+
+def _count_digest(queryset):
+    sql, params = queryset.query.sql_with_params()
+    return hashlib.sha256(repr((queryset.db, sql, params)).encode('utf-8')).hexdigest()
+
+
+def cached_count(queryset, timeout=COUNT_TIMEOUT):
+    """Return ``queryset.count()``, reusing a cached value for up to ``timeout`` seconds"""
+    key = f'resume-count:{_generation()}:{_count_digest(queryset)}'
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout)
+    return count
+
+
+def estimated_count(model, using='default'):
+    """The database's estimate of a table's row count, or None if it has none"""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                           [connection.ops.quote_name(table)])
+        elif connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            # Each stat starts with the row count of the table or index
+            cursor.execute('SELECT MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 WHERE tbl = %s', [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    # PostgreSQL reports -1 for tables that were never analyzed
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that never runs an exact ``COUNT(*)`` over a whole large table"""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+        return cached_count(queryset)
+
+
+async def acached_count(queryset, timeout=COUNT_TIMEOUT):
+    generation = await cache.aget(GENERATION_KEY)
+    if generation is None:
+        generation = 1
+        await cache.aadd(GENERATION_KEY, generation, None)
+    key = f'resume-count:{generation}:{_count_digest(queryset)}'
+    count = await cache.aget(key)
+    if count is None:
+        count = await queryset.acount()
+        await cache.aset(key, count, timeout)
+    return count
+
+
+def invalidate_counts():
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 2, None)
+
+
+@receiver(resume_changed, dispatch_uid='pagination.invalidate_counts')
+def _invalidate_on_change(sender, **kwargs):
+    # Totals count resume rows, so only resume writes invalidate them; search
+    # totals affected by section edits may lag by up to COUNT_TIMEOUT
+    if sender is Resume:
+        # After the commit, or a count taken in between is cached as current
+        transaction.on_commit(invalidate_counts)
@@ -0,0 +1,193 @@
+"""Offline asset resolution and stylesheet caching for xhtml2pdf renders"""
+import contextvars
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+from xhtml2pdf.context import pisaCSSParser
+
+try:
+    from xhtml2pdf.config.resources import ResourceAccessPolicy
+except ImportError:
+    # Older xhtml2pdf releases have no resource policies; link_callback still
+    # keeps renders off the network
+    ResourceAccessPolicy = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # Remote URL -> bundled static path
+    'REMOTE': {
+        'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css': 'home/pdf/font-awesome.css',
+    },
+    'CACHE_MAX_BYTES': 32 * 1024 * 1024,
+}
+
+EMPTY = 'data:,'
+
+# Rules whose parsing has side effects on the render's context
+_CONTEXT_RULES = re.compile(r'@(font-face|page|frame)\b|--', re.IGNORECASE)
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'RESUME_PDF_ASSETS', {})}
+
+
+class AssetCache:
+    """Thread-safe LRU of stylesheet path -> parsed rulesets, bounded by ``CACHE_MAX_BYTES`` of source"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.size = 0
+
+    def stylesheet(self, path, parse):
+        """Parsed stylesheet at ``path``, calling ``parse()`` when it is missing or changed"""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return parse()
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry[0] == mtime:
+                self.entries.move_to_end(path)
+                return entry[2]
+        try:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                source = f.read()
+        except OSError:
+            return parse()
+        parsed = parse()
+        if parsed is None or _CONTEXT_RULES.search(source):
+            return parsed
+        size = len(source)
+        max_bytes = get_config()['CACHE_MAX_BYTES']
+        with self.lock:
+            old = self.entries.pop(path, None)
+            if old is not None:
+                self.size -= old[1]
+            if size <= max_bytes:
+                self.entries[path] = (mtime, size, parsed)
+                self.size += size
+                while self.size > max_bytes:
+                    self.size -= self.entries.popitem(last=False)[1][1]
+        return parsed
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+cache = AssetCache()
+
+
+def _url_path(url):
+    """``STATIC_URL``/``MEDIA_URL`` in the absolute-path form templates produce"""
+    return '/' + url.lstrip('/') if url and '://' not in url else url
+
+
+def resolve(uri):
+    """Return the local file ``uri`` refers to, or None"""
+    config = get_config()
+    if uri in config['REMOTE']:
+        return finders.find(config['REMOTE'][uri])
+    media_url = _url_path(settings.MEDIA_URL)
+    if media_url and uri.startswith(media_url):
+        try:
+            return safe_join(settings.MEDIA_ROOT, uri[len(media_url):])
+        except SuspiciousFileOperation:
+            return None
+    static_url = _url_path(settings.STATIC_URL)
+    if static_url and uri.startswith(static_url):
+        name = uri[len(static_url):]
+        found = finders.find(name)
+        if found:
+            return found
+        if settings.STATIC_ROOT:
+            try:
+                return safe_join(settings.STATIC_ROOT, name)
+            except SuspiciousFileOperation:
+                return None
+    return None
+
+
+def _resolve_file(uri):
+    path = resolve(uri.split('?', 1)[0].split('#', 1)[0])
+    return path if path and os.path.isfile(path) else None
+
+
+def link_callback(uri, rel=None):
+    """xhtml2pdf ``link_callback`` that only ever returns local file paths or ``data:`` URIs"""
+    if not uri or uri.startswith('data:'):
+        return uri
+    path = _resolve_file(uri)
+    if path is None:
+        # xhtml2pdf also passes CSS values it could not evaluate, such as
+        # gradients; only URLs are worth reporting
+        if uri.startswith(('/', 'http://', 'https://')):
+            logger.warning('PDF asset %s could not be resolved locally; left out of the render', uri)
+        return EMPTY
+    return path
+
+
+# Whether the parseExternal calls of this context may use the cache
+_caching = contextvars.ContextVar('pdf_assets_caching', default=False)
+_install_lock = threading.Lock()
+_original_parse_external = None
+
+
+def _parse_external(parser, cssResourceName):
+    return _original_parse_external(parser, cssResourceName)
+
+
+def _parse_external_cached(parser, cssResourceName):
+    """``pisaCSSParser.parseExternal`` reusing what earlier renders parsed, inside ``cached_stylesheets()``"""
+    path = None
+    if _caching.get() and isinstance(cssResourceName, str):
+        path = _resolve_file(cssResourceName)
+    if path is None:
+        return _parse_external(parser, cssResourceName)
+    return cache.stylesheet(path, lambda: _parse_external(parser, cssResourceName))
+
+
+def _install():
+    global _original_parse_external
+    with _install_lock:
+        if _original_parse_external is None:
+            _original_parse_external = pisaCSSParser.parseExternal
+            pisaCSSParser.parseExternal = _parse_external_cached
+
+
+@contextmanager
+def cached_stylesheets():
+    """Let the xhtml2pdf renders in this block reuse stylesheets parsed by earlier ones"""
+    _install()
+    token = _caching.set(True)
+    try:
+        yield
+    finally:
+        _caching.reset(token)
+
+
+def asset_roots():
+    """Directories ``link_callback`` resolves into"""
+    roots = [settings.MEDIA_ROOT, settings.STATIC_ROOT]
+    for finder in finders.get_finders():
+        roots.extend(storage.location for storage in getattr(finder, 'storages', {}).values())
+    return tuple(Path(root) for root in roots if root)
+
+
+def resource_policy():
+    """Policy refusing remote fetches and local reads outside ``asset_roots()``"""
+    if ResourceAccessPolicy is None:
+        return None
+    return ResourceAccessPolicy(allow_remote=False, base_dir=None, extra_roots=asset_roots())
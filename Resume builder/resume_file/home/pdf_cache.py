@@ -0,0 +1,236 @@
+"""Content-addressed cache of rendered resume PDFs, keyed by resume id and fingerprint"""
+import hashlib
+import json
+import io
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import RESUME_SECTIONS
+
+DEFAULTS = {
+    'ENABLED': True,
+    'BACKEND': 'disk',
+    'LOCATION': None,
+    'MAX_SIZE': 256 * 1024 * 1024,
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': None,
+}
+
+
+class DiskStore:
+    """Size-bounded LRU store keeping one file per key below ``location``"""
+
+    def __init__(self, location, max_size):
+        self.location = Path(location)
+        self.max_size = max_size
+        self._evict_lock = threading.Lock()
+        # Bytes stored, as last scanned plus this process's writes; None until scanned
+        self._size = None
+
+    def path(self, key):
+        return self.location / key[:2] / key
+
+    def open(self, key):
+        path = self.path(key)
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        # Touch the entry so eviction sees it as recently used
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return f
+
+    def get(self, key):
+        f = self.open(key)
+        if f is None:
+            return None
+        with f:
+            return f.read()
+
+    def _file_size(self, path):
+        try:
+            return path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def set(self, key, data):
+        """Store ``data``, given as bytes or a binary file read from its current position"""
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if isinstance(data, bytes):
+                    f.write(data)
+                else:
+                    shutil.copyfileobj(data, f)
+                written = f.tell()
+            replaced = self._file_size(path)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        self._grow(written - replaced)
+
+    def delete(self, key):
+        path = self.path(key)
+        self._grow(-self._file_size(path))
+        path.unlink(missing_ok=True)
+
+    def _grow(self, delta):
+        with self._evict_lock:
+            if self._size is None:
+                self._size = self._scan()[1]
+            else:
+                self._size += delta
+            over = self._size > self.max_size
+        if over:
+            self.evict()
+
+    def _scan(self):
+        entries = []
+        total = 0
+        for path in self.location.glob('*/*'):
+            if path.name.startswith('.tmp-'):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        return entries, total
+
+    def evict(self):
+        """Remove least recently used entries until the store fits ``max_size``"""
+        with self._evict_lock:
+            entries, total = self._scan()
+            if total > self.max_size:
+                entries.sort()
+                for mtime, size, path in entries:
+                    path.unlink(missing_ok=True)
+                    total -= size
+                    if total <= self.max_size:
+                        break
+            self._size = total
+
+
+class DjangoCacheStore:
+    """Store entries in a Django cache; eviction is left to the backend"""
+
+    prefix = 'resume-pdf:'
+
+    def __init__(self, alias, timeout=None):
+        self.cache = caches[alias]
+        self.timeout = timeout
+
+    def get(self, key):
+        return self.cache.get(self.prefix + key)
+
+    def open(self, key):
+        data = self.get(key)
+        return None if data is None else io.BytesIO(data)
+
+    def set(self, key, data):
+        if not isinstance(data, bytes):
+            data = data.read()
+        self.cache.set(self.prefix + key, data, self.timeout)
+
+    def delete(self, key):
+        self.cache.delete(self.prefix + key)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'RESUME_PDF_CACHE', {})}
+
+
+def get_store():
+    """Return the configured store, or None when the cache is disabled"""
+    global _store
+    config = get_config()
+    if not config['ENABLED']:
+        return None
+    with _store_lock:
+        if _store is None:
+            if config['BACKEND'] == 'cache':
+                _store = DjangoCacheStore(config['CACHE_ALIAS'], config['TIMEOUT'])
+            else:
+                location = config['LOCATION'] or Path(settings.BASE_DIR) / 'cache' / 'pdf'
+                _store = DiskStore(location, config['MAX_SIZE'])
+        return _store
+
+
+def reset_store():
+    """Drop the memoised store so changed settings take effect"""
+    global _store
+    with _store_lock:
+        _store = None
+
+
+def _row_values(instance):
+    return [getattr(instance, field.attname) for field in instance._meta.concrete_fields
+            if field.name not in ('id', 'resume')]
+
+
+# Resume fields that change without changing the render
+UNRENDERED_FIELDS = ('id', 'views_count', 'downloads_count')
+
+
+def _resume_values(resume):
+    return {field.attname: field.get_prep_value(field.value_from_object(resume))
+            for field in resume._meta.concrete_fields if field.name not in UNRENDERED_FIELDS}
+
+
+def resume_fingerprint(resume, sections):
+    """Hash the fields and loaded section rows of a resume"""
+    payload = {
+        'resume': _resume_values(resume),
+        'sections': {
+            name: [_row_values(row) for row in sections.get(name, ())]
+            for name in RESUME_SECTIONS
+        },
+    }
+    encoded = json.dumps(payload, cls=DjangoJSONEncoder, sort_keys=True)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def _key(resume_id, fingerprint):
+    # Fingerprint first: the disk store shards on the leading characters
+    return f'{fingerprint}-{resume_id}'
+
+
+def get_pdf(resume_id, fingerprint):
+    """Return cached PDF bytes for a resume's ``resume_fingerprint``, or None on a miss"""
+    store = get_store()
+    if store is None:
+        return None
+    return store.get(_key(resume_id, fingerprint))
+
+
+def open_pdf(resume_id, fingerprint):
+    """Return the cached PDF for a resume's ``resume_fingerprint`` as an open binary file, or None on a miss"""
+    store = get_store()
+    if store is None:
+        return None
+    return store.open(_key(resume_id, fingerprint))
+
+
+def set_pdf(resume_id, fingerprint, data):
+    """Cache ``data`` (bytes or a binary file) as the PDF of a resume at ``fingerprint``"""
+    store = get_store()
+    if store is not None:
+        store.set(_key(resume_id, fingerprint), data)
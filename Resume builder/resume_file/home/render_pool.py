@@ -0,0 +1,78 @@
+"""
+Bounded executor for PDF renders started by async views.
+
+xhtml2pdf is synchronous and CPU-bound, so async views hand renders to a
+pool of ``WORKERS`` threads instead of blocking the event loop or taking a
+thread per request. At most ``MAX_PENDING`` renders may be queued or
+running at once; beyond that ``run`` raises ``PoolFull`` and the view
+answers 503, as it does when the background job queue is full. A render
+whose client disconnects still finishes, and fills the PDF cache.
+"""
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+DEFAULTS = {
+    'WORKERS': 2,
+    'MAX_PENDING': 8,
+}
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+
+
+class PoolFull(Exception):
+    pass
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'RESUME_PDF_RENDER_POOL', {})}
+
+
+def _get_pool():
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            config = get_config()
+            _executor = ThreadPoolExecutor(max_workers=config['WORKERS'], thread_name_prefix='pdf-render')
+            _slots = threading.BoundedSemaphore(config['MAX_PENDING'])
+        return _executor, _slots
+
+
+def _call(func, args):
+    try:
+        return func(*args)
+    finally:
+        # Pool threads outlive requests; treat each render like one
+        close_old_connections()
+
+
+def reset():
+    """Shut the pool down; the next render starts one with the current settings"""
+    global _executor, _slots
+    with _lock:
+        executor, _executor, _slots = _executor, None, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+async def run(func, *args):
+    """Await ``func(*args)`` on the render pool"""
+    executor, slots = _get_pool()
+    if not slots.acquire(blocking=False):
+        raise PoolFull('Too many PDFs are rendering; try again shortly')
+    # Keep request-scoped state such as the metrics collector
+    context = contextvars.copy_context()
+    try:
+        future = executor.submit(context.run, _call, func, args)
+    except BaseException:
+        slots.release()
+        raise
+    # The slot is held until the render ends, even if this request is cancelled
+    future.add_done_callback(lambda f: slots.release())
+    return await asyncio.wrap_future(future)
@@ -0,0 +1,170 @@
+"""
+Read-replica routing.
+
+Views decorated with ``replica_reads`` load resumes, their sections and
+snapshots from one of the ``REPLICAS`` aliases in
+``RESUME_DATABASE_ROUTING``; everything else, all writes and every other
+model (sessions, users, PDF jobs) stay on ``default``. A replica is probed
+before use; one that cannot be connected to is skipped for
+``RETRY_SECONDS`` and reads fall back to the primary.
+
+Read-your-writes: ``PrimaryPinMiddleware`` sets a cookie on the response
+to every unsafe request (a create, edit or delete), and while it lives,
+``STICKY_SECONDS``, that browser reads from the primary, so nobody sees
+their own change missing because of replication lag.
+Pages rendered from a replica may already be out of date, so
+``view_resume`` checks ``reading_replica()`` and keeps those renders out
+of the shared page cache; otherwise a lagging read cached just after an
+edit would be served to everyone, the pinned writer included. Cached PDFs
+need no such care, since they are looked up by the fingerprint of the
+document just read.
+
+To try it with two SQLite files, add a read-only replica alias and copy
+the primary into it with ``manage.py sync_sqlite_replicas``::
+
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'file:{BASE_DIR / "replica.sqlite3"}?mode=ro',
+        'OPTIONS': {'uri': True},
+        'TEST': {'MIRROR': 'default'},
+    }
+    RESUME_DATABASE_ROUTING = {'REPLICAS': ['replica']}
+"""
+import contextvars
+import functools
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.connection import ConnectionDoesNotExist
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'REPLICAS': [],
+    'STICKY_SECONDS': 15,
+    'RETRY_SECONDS': 30,
+    'PIN_COOKIE': 'resume_primary_pin',
+}
+
+UNSAFE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+_read_alias = contextvars.ContextVar('resume_read_alias', default=None)
+_down_lock = threading.Lock()
+# alias -> monotonic time until which it is skipped
+_down = {}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'RESUME_DATABASE_ROUTING', {})}
+
+
+def _replicated(model):
+    from .models import RESUME_SECTIONS, Resume, ResumeSnapshot
+    return model in (Resume, ResumeSnapshot) or model in RESUME_SECTIONS.values()
+
+
+def _available(alias, config):
+    with _down_lock:
+        if _down.get(alias, 0) > time.monotonic():
+            return False
+    try:
+        connections[alias].ensure_connection()
+    except (DatabaseError, ConnectionDoesNotExist) as exc:
+        logger.warning('Replica %s is unavailable, reading from the primary: %s', alias, exc)
+        with _down_lock:
+            _down[alias] = time.monotonic() + config['RETRY_SECONDS']
+        return False
+    return True
+
+
+def read_alias(request):
+    """The alias this request should read resumes from"""
+    config = get_config()
+    if not config['REPLICAS'] or config['PIN_COOKIE'] in request.COOKIES:
+        return DEFAULT_DB_ALIAS
+    replicas = list(config['REPLICAS'])
+    random.shuffle(replicas)
+    return next((alias for alias in replicas if _available(alias, config)), DEFAULT_DB_ALIAS)
+
+
+@contextmanager
+def reading_from(alias):
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def reading_replica():
+    """Whether resume reads in this context go to a replica"""
+    return _read_alias.get() not in (None, DEFAULT_DB_ALIAS)
+
+
+def replica_reads(view):
+    """Let a read-only view load resumes from a replica"""
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            # Probing a replica may connect to it
+            with reading_from(await sync_to_async(read_alias)(request)):
+                return await view(request, *args, **kwargs)
+    else:
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            with reading_from(read_alias(request)):
+                return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _replicated(model):
+            return _read_alias.get()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from replication
+        if db in get_config()['REPLICAS']:
+            return False
+        return None
+
+
+class PrimaryPinMiddleware:
+    """Pin a client's reads to the primary for a while after it writes"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self._pin(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._pin(request, await self.get_response(request))
+
+    def _pin(self, request, response):
+        config = get_config()
+        if config['REPLICAS'] and request.method in UNSAFE_METHODS and response.status_code < 400:
+            response.set_cookie(config['PIN_COOKIE'], '1', max_age=config['STICKY_SECONDS'],
+                                httponly=True, samesite='Lax')
+        return response
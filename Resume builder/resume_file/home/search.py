@@ -0,0 +1,215 @@
+"""
+Full-text search over resumes and their sections.
+
+``get_backend()`` returns the configured backend (``RESUME_SEARCH_BACKEND``)
+or, by default, the SQLite FTS5 index when it is available and a plain
+``icontains`` fallback otherwise. Backends share a small interface so a
+Postgres ``tsvector`` implementation can be dropped in later:
+
+* ``search(queryset, query, columns=None)`` narrows a Resume queryset to
+  matches, ordered by relevance; ``columns`` limits matching to some of
+  the ``FTS_COLUMNS``;
+* ``index(resume_ids)`` refreshes (or removes) the given resumes;
+* ``rebuild()`` reindexes everything.
+
+The index is refreshed after commit whenever ``resume_changed`` fires.
+"""
+import re
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.signals import post_migrate
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .models import Resume
+from .signals import resume_changed
+
+FTS_TABLE = 'home_resume_fts'
+
+# Indexed columns and their bm25 weights
+FTS_COLUMNS = {
+    'name': 10.0,
+    'title': 5.0,
+    'about': 1.0,
+    'skills': 4.0,
+    'projects': 2.0,
+    'work': 2.0,
+    'certifications': 2.0,
+}
+
+# FTS column -> Resume lookups searched by SimpleSearchBackend
+SIMPLE_FIELDS = {
+    'name': ('name',),
+    'title': ('title',),
+    'about': ('about',),
+    'skills': ('skills__name',),
+    'projects': ('projects__title', 'projects__technologies'),
+    'work': ('work_experience__position', 'work_experience__company'),
+    'certifications': ('certifications__name', 'certifications__issuer'),
+}
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Resumes loaded per batch when rebuilding
+BATCH_SIZE = 100
+
+
+def fts_row(resume):
+    """Return the indexed text for a resume, one value per FTS column"""
+    def join(rows, *fields):
+        return ' '.join(str(getattr(row, f)) for row in rows for f in fields if getattr(row, f))
+
+    return (
+        resume.name,
+        resume.title,
+        resume.about,
+        join(resume.skills.all(), 'name'),
+        join(resume.projects.all(), 'title', 'technologies'),
+        join(resume.work_experience.all(), 'position', 'company'),
+        join(resume.certifications.all(), 'name', 'issuer'),
+    )
+
+
+def match_expression(query, columns=None):
+    """Turn free text into an FTS5 query: every word must match as a prefix, in ``columns`` if given"""
+    tokens = TOKEN_RE.findall(query)
+    expression = ' '.join(f'"{token}"*' for token in tokens)
+    if expression and columns:
+        expression = f'{{{" ".join(columns)}}} : ({expression})'
+    return expression
+
+
+def fts_available(conn=connection):
+    if conn.vendor != 'sqlite':
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+class SQLiteFTSBackend:
+    """Ranked search backed by an FTS5 virtual table keyed by resume id"""
+
+    def search(self, queryset, query, columns=None):
+        expression = match_expression(query, columns)
+        if not expression:
+            return queryset.none()
+        weights = ', '.join(str(weight) for weight in FTS_COLUMNS.values())
+        qn = connection.ops.quote_name
+        table = qn(FTS_TABLE)
+        rank = RawSQL(
+            f'SELECT bm25({table}, {weights}) FROM {table} '
+            f'WHERE {table} MATCH %s AND rowid = {qn(Resume._meta.db_table)}.{qn("id")}',
+            [expression],
+        )
+        matches = RawSQL(f'SELECT rowid FROM {table} WHERE {table} MATCH %s', [expression])
+        # bm25 scores are negative; lower is more relevant
+        return queryset.filter(pk__in=matches).annotate(search_rank=rank).order_by('search_rank', 'pk')
+
+    def index(self, resume_ids):
+        resume_ids = list(resume_ids)
+        if not resume_ids:
+            return
+        resumes = Resume.objects.with_sections().filter(pk__in=resume_ids)
+        self._write(resume_ids, resumes)
+
+    def rebuild(self):
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {connection.ops.quote_name(FTS_TABLE)}')
+            ids = list(Resume.objects.order_by('pk').values_list('pk', flat=True))
+            for start in range(0, len(ids), BATCH_SIZE):
+                batch = ids[start:start + BATCH_SIZE]
+                self._write(batch, Resume.objects.with_sections().filter(pk__in=batch))
+        return len(ids)
+
+    def _write(self, resume_ids, resumes):
+        table = connection.ops.quote_name(FTS_TABLE)
+        columns = ', '.join(FTS_COLUMNS)
+        placeholders = ', '.join(['%s'] * (len(FTS_COLUMNS) + 1))
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {table} WHERE rowid = %s', [[pk] for pk in resume_ids])
+            cursor.executemany(
+                f'INSERT INTO {table} (rowid, {columns}) VALUES ({placeholders})',
+                [[resume.pk, *fts_row(resume)] for resume in resumes],
+            )
+
+
+class SimpleSearchBackend:
+    """Unindexed ``icontains`` search for databases without a full-text index"""
+
+    def search(self, queryset, query, columns=None):
+        condition = Q()
+        for column in columns or SIMPLE_FIELDS:
+            for lookup in SIMPLE_FIELDS[column]:
+                condition |= Q(**{f'{lookup}__icontains': query})
+        return queryset.filter(condition).distinct()
+
+    def index(self, resume_ids):
+        pass
+
+    def rebuild(self):
+        return 0
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The search backend, chosen once per process
+
+    ``reset_backend()`` makes the next call choose again; migrations and
+    ``rebuild_search_index`` call it, so a newly created index is picked up.
+    """
+    global _backend
+    backend = _backend
+    if backend is not None:
+        return backend
+    with _backend_lock:
+        if _backend is None:
+            path = getattr(settings, 'RESUME_SEARCH_BACKEND', None)
+            if path:
+                _backend = import_string(path)()
+            elif fts_available():
+                _backend = SQLiteFTSBackend()
+            else:
+                _backend = SimpleSearchBackend()
+        return _backend
+
+
+def reset_backend():
+    global _backend
+    with _backend_lock:
+        _backend = None
+
+
+@receiver(post_migrate, dispatch_uid='search.reset_backend')
+def _reset_after_migrate(sender, **kwargs):
+    reset_backend()
+
+
+_pending = threading.local()
+
+
+def _flush_pending():
+    ids, _pending.ids = getattr(_pending, 'ids', None), set()
+    if ids:
+        get_backend().index(sorted(ids))
+
+
+@receiver(resume_changed, dispatch_uid='search.index')
+def _index_on_change(sender, resume_id, **kwargs):
+    # Collect ids until the transaction commits, so a resume whose sections
+    # change many times is reindexed once: the first callback indexes every
+    # collected id and the rest find nothing left. Outside a transaction the
+    # callback runs at once. Ids collected in a transaction that rolled back
+    # are reindexed with the next commit, from the data actually stored.
+    if getattr(_pending, 'ids', None) is None:
+        _pending.ids = set()
+    _pending.ids.add(resume_id)
+    transaction.on_commit(_flush_pending)
@@ -0,0 +1,195 @@
+"""
+Batched section edits.
+
+``apply_changes`` takes any mix of creates, updates and deletes across the
+eight resume sections::
+
+    {
+        'skills': {
+            'create': [{'name': 'Go', 'proficiency': 'advanced'}],
+            'update': [{'id': 4, 'proficiency': 'expert'}],
+            'delete': [7],
+        },
+    }
+
+Every row is validated before anything is written. Each section then costs
+one ``bulk_create``, one ``bulk_update`` limited to the fields that actually
+changed and one delete. Bulk operations send no ``post_save``, so callers
+save the resume afterwards, which bumps ``updated_at`` and announces the
+change. ``serialize`` returns the rows together with ``version``, the same
+fingerprint ``view_resume`` sends as its ETag, so editors can send it back
+in ``If-Match`` for optimistic concurrency.
+"""
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+
+from . import ingest, pdf_cache, snapshots
+from .documents import ResumeDocument
+from .models import RESUME_SECTIONS
+
+OPERATIONS = ('create', 'update', 'delete')
+
+
+def version(resume):
+    """Content version of a resume loaded with ``with_sections()``"""
+    return pdf_cache.resume_fingerprint(resume, ResumeDocument.from_resume(resume).sections)[:32]
+
+
+def _row(instance):
+    row = {'id': instance.pk}
+    for field in instance._meta.concrete_fields:
+        if field.name not in ('id', 'resume'):
+            row[field.name] = field.value_from_object(instance)
+    return row
+
+
+def serialize(resume):
+    """Version and section rows of a resume loaded with ``with_sections()``"""
+    sections = ResumeDocument.from_resume(resume).sections
+    return {
+        'version': pdf_cache.resume_fingerprint(resume, sections)[:32],
+        'sections': {name: [_row(instance) for instance in rows] for name, rows in sections.items()},
+    }
+
+
+def _is_id(value):
+    # JSON true/false arrive as bools, which are ints to Python
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _check_shape(changes):
+    if not isinstance(changes, dict):
+        raise ValidationError('Changes must be a JSON object.')
+    for name, operations in changes.items():
+        if name not in RESUME_SECTIONS:
+            raise ValidationError(f'Unknown section "{name}".')
+        if not isinstance(operations, dict) or not operations.keys() <= set(OPERATIONS):
+            raise ValidationError(f'"{name}" must be an object with create, update and delete lists.')
+        for operation in OPERATIONS:
+            items = operations.get(operation) or []
+            valid, kind = (_is_id, 'ids') if operation == 'delete' else (lambda item: isinstance(item, dict), 'objects')
+            if not isinstance(items, list) or not all(valid(item) for item in items):
+                raise ValidationError(f'"{name}.{operation}" must be a list of {kind}.')
+
+
+def _plan_section(resume, name, operations, errors):
+    """Validate one section's changes; returns (new rows, (changed rows, fields), ids to delete)"""
+    model = RESUME_SECTIONS[name]
+    label = ingest.SECTION_LABELS[name]
+    allowed = ingest.section_fields(name)
+    required = next(iter(ingest.SECTION_FORM_FIELDS[name]))
+    # Rows loaded by with_sections(), so updates and deletes need no queries
+    existing = {instance.pk: instance for instance in getattr(resume, name).all()}
+
+    created = []
+    for number, row in enumerate(operations.get('create') or (), start=1):
+        where = f'{label} #{number}'
+        unknown = sorted(row.keys() - allowed)
+        if unknown:
+            errors.append(f'{where}: unknown field "{unknown[0]}".')
+            continue
+        row = ingest.normalise_row(name, row)
+        if not row.get(required):
+            errors.append(f'{where}: {required} is required.')
+            continue
+        instance = model(resume=resume, **row)
+        errors.extend(ingest.validate_row(instance, where))
+        created.append(instance)
+
+    updated, fields = [], set()
+    for row in operations.get('update') or ():
+        instance = existing.get(row.get('id')) if _is_id(row.get('id')) else None
+        where = f'{label} {row.get("id")}'
+        if instance is None:
+            errors.append(f'{where}: no such row on this resume.')
+            continue
+        unknown = sorted(row.keys() - allowed - {'id'})
+        if unknown:
+            errors.append(f'{where}: unknown field "{unknown[0]}".')
+            continue
+        # Only the given fields change, so defaults fill blanks but never absent keys
+        values = {key: value for key, value in ingest.normalise_row(name, row).items()
+                  if key in row and key != 'id'}
+        if required in values and not values[required]:
+            errors.append(f'{where}: {required} is required.')
+            continue
+        before = {f.attname: getattr(instance, f.attname) for f in model._meta.concrete_fields}
+        for key, value in values.items():
+            setattr(instance, key, value)
+        errors.extend(ingest.validate_row(instance, where))
+        changed = [f.name for f in model._meta.concrete_fields
+                   if getattr(instance, f.attname) != before[f.attname]]
+        if changed:
+            updated.append(instance)
+            fields.update(changed)
+
+    deleted = list(dict.fromkeys(operations.get('delete') or ()))
+    for pk in deleted:
+        if pk not in existing:
+            errors.append(f'{label} {pk}: no such row on this resume.')
+    return created, (updated, sorted(fields)), deleted
+
+
+def diff(resume, name, rows, ids=None):
+    """Changes turning the loaded rows of a section into ``rows``
+
+    ``ids`` pairs each row with an existing row id ('' for a new row);
+    without it rows are matched to the existing ones by position. Rows whose
+    required field is blank are dropped, as on the create form. Only the
+    keys present in ``rows`` are compared, so columns the form did not post
+    keep their stored values. Unchanged rows become updates that
+    ``apply_changes`` finds nothing to write for.
+    """
+    existing = [instance.pk for instance in getattr(resume, name).all()]
+    if ids is None:
+        ids = existing[:len(rows)]
+    required = next(iter(ingest.SECTION_FORM_FIELDS[name]))
+    operations = {'create': [], 'update': [], 'delete': []}
+    kept = set()
+    for i, row in enumerate(rows):
+        pk = str(ids[i]) if i < len(ids) else ''
+        blank = not str(row.get(required) or '').strip()
+        if pk.isdigit() and not (blank and required in row):
+            kept.add(int(pk))
+            operations['update'].append({'id': int(pk), **row})
+        elif not blank:
+            operations['create'].append(row)
+    operations['delete'] = [pk for pk in existing if pk not in kept]
+    return operations
+
+
+def apply_changes(resume, changes):
+    """Validate and write ``changes`` for a resume loaded with ``with_sections()``
+
+    Raises ValidationError before writing anything if any change is invalid.
+    Returns the ids created, updated and deleted per section.
+    """
+    _check_shape(changes)
+    errors = []
+    plans = {name: _plan_section(resume, name, operations, errors) for name, operations in changes.items()}
+    if errors:
+        raise ValidationError(errors)
+
+    summary = {'created': {}, 'updated': {}, 'deleted': {}}
+    # Deletes announce every row; rebuild the snapshot once at the end
+    with transaction.atomic(), snapshots.deferred():
+        for name, (created, (updated, fields), deleted) in plans.items():
+            model = RESUME_SECTIONS[name]
+            if created:
+                if connection.features.can_return_rows_from_bulk_insert:
+                    model.objects.bulk_create(created)
+                else:
+                    for instance in created:
+                        instance.save()
+                summary['created'][name] = [instance.pk for instance in created]
+            if updated:
+                model.objects.bulk_update(updated, fields)
+                summary['updated'][name] = [instance.pk for instance in updated]
+            if deleted:
+                model.objects.filter(resume=resume, pk__in=deleted).delete()
+                summary['deleted'][name] = deleted
+    return summary
+
+
+def has_changes(summary):
+    return any(summary.values())
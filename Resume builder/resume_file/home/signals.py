@@ -0,0 +1,34 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal
+
+from .models import Resume, RESUME_SECTIONS
+
+# Sent with ``resume_id`` whenever a resume or one of its section rows is
+# written, plus ``created``/``deleted`` flags describing the row itself.
+# Code that bypasses model signals (bulk writes, queryset updates that
+# change rendered content) must send it explicitly.
+resume_changed = Signal()
+
+
+def _resume_id(sender, instance):
+    return instance.pk if sender is Resume else instance.resume_id
+
+
+def _row_saved(sender, instance, created=False, **kwargs):
+    resume_id = _resume_id(sender, instance)
+    if resume_id is not None:
+        resume_changed.send(sender=sender, resume_id=resume_id, created=created, deleted=False)
+
+
+def _row_deleted(sender, instance, **kwargs):
+    resume_id = _resume_id(sender, instance)
+    if resume_id is not None:
+        resume_changed.send(sender=sender, resume_id=resume_id, created=False, deleted=True)
+
+
+def connect_signals():
+    """Bridge model save/delete signals for resumes and sections to ``resume_changed``"""
+    for model in (Resume, *RESUME_SECTIONS.values()):
+        uid = f'resume_changed:{model._meta.label_lower}'
+        post_save.connect(_row_saved, sender=model, dispatch_uid=uid)
+        post_delete.connect(_row_deleted, sender=model, dispatch_uid=uid)
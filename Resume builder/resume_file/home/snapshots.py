@@ -0,0 +1,175 @@
+"""Denormalized resume documents, rebuilt whenever ``resume_changed`` fires"""
+import contextvars
+import datetime
+import json
+from contextlib import contextmanager
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import pdf_cache
+from .documents import ResumeDocument, cache_sections
+from .models import RESUME_SECTIONS, Resume, ResumeSnapshot
+from .signals import resume_changed
+
+EXCLUDED_FIELDS = ('views_count', 'downloads_count')
+
+# Resumes rebuilt or checked per query
+BATCH_SIZE = 100
+
+_deferred = contextvars.ContextVar('snapshots_deferred', default=None)
+
+
+def _values(instance, exclude=()):
+    values = {}
+    for field in instance._meta.concrete_fields:
+        if field.name not in exclude:
+            value = field.get_prep_value(field.value_from_object(instance))
+            # Full precision; the JSON encoder would cut datetimes to milliseconds
+            values[field.attname] = value.isoformat() if isinstance(value, datetime.datetime) else value
+    return values
+
+
+def build(resume, sections):
+    """Snapshot document and version of a resume and its ``{section: rows}``"""
+    document = {
+        'resume': _values(resume, EXCLUDED_FIELDS),
+        'sections': {name: [_values(row) for row in sections.get(name, ())] for name in RESUME_SECTIONS},
+    }
+    # Kept exactly as it reads back from the JSON column, so documents compare equal
+    document = json.loads(json.dumps(document, cls=DjangoJSONEncoder))
+    return document, pdf_cache.resume_fingerprint(resume, sections)[:32]
+
+
+def _instance(model, values, using):
+    fields = model._meta.concrete_fields
+    return model.from_db(using, [f.attname for f in fields], [
+        f.to_python(values[f.attname]) if f.attname in values else f.get_default() for f in fields
+    ])
+
+
+def load(snapshot):
+    """ResumeDocument built from a snapshot, without touching the section tables"""
+    using = snapshot._state.db
+    resume = _instance(Resume, snapshot.document['resume'], using)
+    sections = {}
+    for name, model in RESUME_SECTIONS.items():
+        rows = [_instance(model, values, using) for values in snapshot.document['sections'].get(name, ())]
+        for row in rows:
+            row.resume = resume
+        sections[name] = tuple(rows)
+    cache_sections(resume, sections)
+    return ResumeDocument(resume=resume, **sections)
+
+
+def _live(resume):
+    document = ResumeDocument.from_resume(resume)
+    return document, pdf_cache.resume_fingerprint(resume, document.sections)[:32]
+
+
+def get_document(resume_id):
+    """``(ResumeDocument, version)`` of a resume; raises Resume.DoesNotExist"""
+    try:
+        return _loaded(ResumeSnapshot.objects.get(pk=resume_id))
+    except ResumeSnapshot.DoesNotExist:
+        return _live(Resume.objects.with_sections().get(pk=resume_id))
+
+
+async def aget_document(resume_id):
+    try:
+        return _loaded(await ResumeSnapshot.objects.aget(pk=resume_id))
+    except ResumeSnapshot.DoesNotExist:
+        return _live(await Resume.objects.with_sections().aget(pk=resume_id))
+
+
+def _loaded(snapshot):
+    return load(snapshot), snapshot.version
+
+
+def _snapshot(resume):
+    document, version = build(resume, ResumeDocument.from_resume(resume).sections)
+    return ResumeSnapshot(resume=resume, document=document, version=version)
+
+
+def store(snapshots, create=True):
+    """Write built snapshots; with ``create=False`` only existing rows are updated"""
+    if create:
+        ResumeSnapshot.objects.using(DEFAULT_DB_ALIAS).bulk_create(
+            snapshots, update_conflicts=True, unique_fields=['resume'],
+            update_fields=['document', 'version', 'built_at'])
+        return
+    for snapshot in snapshots:
+        ResumeSnapshot.objects.using(DEFAULT_DB_ALIAS).filter(pk=snapshot.pk).update(
+            document=snapshot.document, version=snapshot.version, built_at=timezone.now())
+
+
+def rebuild(resume_ids, create=True):
+    """Rebuild the snapshots of ``resume_ids`` from the live tables, skipping deleted resumes"""
+    resume_ids = list(resume_ids)
+    for start in range(0, len(resume_ids), BATCH_SIZE):
+        batch = resume_ids[start:start + BATCH_SIZE]
+        # Writes happen on the primary, so read what was just written there
+        resumes = Resume.objects.using(DEFAULT_DB_ALIAS).with_sections().filter(pk__in=batch)
+        store([_snapshot(resume) for resume in resumes], create)
+
+
+@contextmanager
+def deferred():
+    """Collect the rebuilds requested inside the block and run them in batches at its (outermost) end"""
+    if _deferred.get() is not None:
+        yield
+        return
+    # resume id -> whether a missing snapshot may be created
+    pending = {}
+    token = _deferred.set(pending)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+    rebuild([pk for pk, create in pending.items() if create])
+    rebuild([pk for pk, create in pending.items() if not create], create=False)
+
+
+@receiver(resume_changed, dispatch_uid='snapshots.rebuild')
+def _rebuild_on_change(sender, resume_id, deleted=False, **kwargs):
+    pending = _deferred.get()
+    if deleted and sender is Resume:
+        # The snapshot was deleted with it, after the rows of the cascade
+        # queued their rebuilds
+        if pending is not None:
+            pending.pop(resume_id, None)
+        return
+    if pending is not None:
+        pending[resume_id] = pending.get(resume_id, False) or not deleted
+    else:
+        rebuild([resume_id], create=not deleted)
+
+
+def check(repair=False):
+    """Yield ``(resume_id, problem)`` for every missing or stale snapshot, rebuilding it with ``repair``"""
+    last = 0
+    while True:
+        resumes = list(Resume.objects.using(DEFAULT_DB_ALIAS).filter(pk__gt=last)
+                       .order_by('pk').with_sections()[:BATCH_SIZE])
+        if not resumes:
+            return
+        stored = ResumeSnapshot.objects.using(DEFAULT_DB_ALIAS).in_bulk([r.pk for r in resumes])
+        drifted = []
+        for resume in resumes:
+            fresh = _snapshot(resume)
+            current = stored.get(resume.pk)
+            if current is None:
+                problem = 'missing'
+            elif current.version != fresh.version:
+                problem = 'stale version'
+            elif current.document != fresh.document:
+                problem = 'stale document'
+            else:
+                continue
+            drifted.append(fresh)
+            yield resume.pk, problem
+        if repair and drifted:
+            store(drifted)
+        last = resumes[-1].pk
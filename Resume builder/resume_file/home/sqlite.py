@@ -0,0 +1,164 @@
+"""SQLite connection tuning (``RESUME_SQLITE`` PRAGMAs) and a batching writer thread"""
+import contextvars
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    # Milliseconds a connection waits for a lock before giving up
+    'BUSY_TIMEOUT': 5000,
+    'JOURNAL_MODE': 'wal',
+    'SYNCHRONOUS': 'normal',
+    'MMAP_SIZE': 256 * 1024 * 1024,
+    # Negative values are KiB
+    'CACHE_SIZE': -64 * 1024,
+    'WRITE_QUEUE': True,
+    # Most jobs committed together
+    'MAX_BATCH': 50,
+    # Database files kept on their current journal mode and synchronous setting
+    'EXCLUDE': (),
+}
+
+# Setting -> PRAGMA, in the order they are applied; busy_timeout comes
+# first so switching the journal mode can wait for other connections
+PRAGMAS = {
+    'BUSY_TIMEOUT': 'busy_timeout',
+    'JOURNAL_MODE': 'journal_mode',
+    'SYNCHRONOUS': 'synchronous',
+    'MMAP_SIZE': 'mmap_size',
+    'CACHE_SIZE': 'cache_size',
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'RESUME_SQLITE', {})}
+
+
+def _tunable(connection, config):
+    return config['ENABLED'] and connection.vendor == 'sqlite' and not connection.is_in_memory_db()
+
+
+def _excluded(connection, config):
+    excluded = {os.path.realpath(path) for path in config['EXCLUDE']}
+    return os.path.realpath(connection.settings_dict['NAME']) in excluded
+
+
+def configure(connection):
+    """Apply the PRAGMAs to an open connection"""
+    config = get_config()
+    if not _tunable(connection, config):
+        return
+    # The journal mode is stored in the file; excluded files keep theirs
+    skip = ('JOURNAL_MODE', 'SYNCHRONOUS') if _excluded(connection, config) else ()
+    with connection.cursor() as cursor:
+        for key, pragma in PRAGMAS.items():
+            if config[key] is not None and key not in skip:
+                cursor.execute(f'PRAGMA {pragma} = {config[key]}')
+
+
+@receiver(connection_created, dispatch_uid='sqlite.configure')
+def _connection_created(sender, connection, **kwargs):
+    configure(connection)
+
+
+class WriteQueue:
+    """Runs write jobs on one thread, committing each batch of queued jobs together"""
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+        self.jobs = queue.SimpleQueue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def submit(self, func, args, kwargs):
+        """Queue ``func(*args, **kwargs)`` and wait for it to be committed"""
+        future = Future()
+        with self.lock:
+            # Threads do not survive fork, so a child starts its own writer
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+                self.thread.start()
+            self.jobs.put((future, contextvars.copy_context(), func, args, kwargs))
+        return future.result()
+
+    def stop(self):
+        """Finish the queued jobs and end the writer thread, closing its connection"""
+        with self.lock:
+            thread, self.thread = self.thread, None
+            if thread is not None and thread.is_alive():
+                self.jobs.put(None)
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        try:
+            stopping = False
+            while not stopping:
+                batch = [self.jobs.get()]
+                max_batch = get_config()['MAX_BATCH']
+                while len(batch) < max_batch:
+                    try:
+                        batch.append(self.jobs.get_nowait())
+                    except queue.Empty:
+                        break
+                if None in batch:
+                    stopping = True
+                    batch = [job for job in batch if job is not None]
+                if batch:
+                    self._run_batch(batch)
+        finally:
+            connections.close_all()
+
+    def _run_batch(self, batch):
+        connection = connections[self.using]
+        results = []
+        try:
+            with transaction.atomic(using=self.using):
+                for future, context, func, args, kwargs in batch:
+                    try:
+                        # The caller's context keeps request metrics attributed to it
+                        with transaction.atomic(using=self.using):
+                            results.append((future, context.run(func, *args, **kwargs), None))
+                    except Exception as exc:
+                        results.append((future, None, exc))
+                # Taken out so a failing hook cannot fail jobs that were committed
+                hooks, connection.run_on_commit = connection.run_on_commit, []
+        except Exception as exc:
+            # The commit itself failed, so nothing in the batch was written
+            logger.exception('Could not commit %d queued writes', len(batch))
+            for future, *_ in batch:
+                future.set_exception(exc)
+            return
+        for _, func, _ in hooks:
+            try:
+                func()
+            except Exception:
+                logger.exception('on_commit callback %r failed', func)
+        for future, result, exc in results:
+            if exc is None:
+                future.set_result(result)
+            else:
+                future.set_exception(exc)
+
+
+writer = WriteQueue()
+
+
+def write(func, *args, **kwargs):
+    """Run ``func(*args, **kwargs)`` in a write transaction and return its result"""
+    config = get_config()
+    connection = connections[DEFAULT_DB_ALIAS]
+    if not _tunable(connection, config) or not config['WRITE_QUEUE'] or connection.in_atomic_block:
+        with transaction.atomic():
+            return func(*args, **kwargs)
+    return writer.submit(func, args, kwargs)
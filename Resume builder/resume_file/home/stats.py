@@ -0,0 +1,140 @@
+"""
+Precomputed landing-page statistics.
+
+The resume and user totals and the featured list shown by ``home`` live in
+a Django cache. Totals are adjusted in place when the creation or deletion
+of a resume or user commits; the featured list is dropped whenever a
+resume row change commits and reloaded on the next hit. Every value also
+expires after ``TIMEOUT`` seconds, and ``manage.py refresh_home_stats``
+recomputes all of them, so counter flushes and any missed adjustment are
+reconciled.
+"""
+import asyncio
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Resume
+from .signals import resume_changed
+
+DEFAULTS = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 5 * 60,
+    'FEATURED_COUNT': 6,
+}
+
+TOTAL_RESUMES = 'home-stats:total-resumes'
+TOTAL_USERS = 'home-stats:total-users'
+FEATURED = 'home-stats:featured'
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'RESUME_HOME_STATS', {})}
+
+
+def _cache():
+    return caches[get_config()['CACHE_ALIAS']]
+
+
+def _featured_queryset():
+    return (Resume.objects.filter(is_public=True).order_by('-views_count')
+            .values('id', 'title', 'name', 'views_count')[:get_config()['FEATURED_COUNT']])
+
+
+def _featured():
+    return list(_featured_queryset())
+
+
+async def _afeatured():
+    return [resume async for resume in _featured_queryset()]
+
+
+COMPUTE = {
+    TOTAL_RESUMES: lambda: Resume.objects.count(),
+    TOTAL_USERS: lambda: User.objects.count(),
+    FEATURED: _featured,
+}
+
+ACOMPUTE = {
+    TOTAL_RESUMES: lambda: Resume.objects.acount(),
+    TOTAL_USERS: lambda: User.objects.acount(),
+    FEATURED: _afeatured,
+}
+
+
+def _stats(values):
+    return {
+        'total_resumes': values[TOTAL_RESUMES],
+        'total_users': values[TOTAL_USERS],
+        'featured_resumes': values[FEATURED],
+    }
+
+
+def get_home_stats():
+    """Return ``total_resumes``, ``total_users`` and ``featured_resumes``, computing only what is missing"""
+    cache = _cache()
+    values = cache.get_many(COMPUTE)
+    missing = {key: COMPUTE[key]() for key in COMPUTE if key not in values}
+    if missing:
+        cache.set_many(missing, get_config()['TIMEOUT'])
+        values.update(missing)
+    return _stats(values)
+
+
+async def aget_home_stats():
+    """``get_home_stats`` for async views, computing the missing values concurrently"""
+    cache = _cache()
+    values = await cache.aget_many(ACOMPUTE)
+    keys = [key for key in ACOMPUTE if key not in values]
+    if keys:
+        missing = dict(zip(keys, await asyncio.gather(*(ACOMPUTE[key]() for key in keys))))
+        await cache.aset_many(missing, get_config()['TIMEOUT'])
+        values.update(missing)
+    return _stats(values)
+
+
+def reconcile():
+    """Recompute every statistic from the database"""
+    values = {key: compute() for key, compute in COMPUTE.items()}
+    _cache().set_many(values, get_config()['TIMEOUT'])
+    return values
+
+
+def _incr(key, delta):
+    try:
+        _cache().incr(key, delta)
+    except ValueError:
+        # Not cached; the next read computes it from scratch
+        pass
+
+
+def _adjust(key, delta):
+    # A write rolled back (or a batched write whose savepoint fails) must not
+    # count, and a read before the commit would cache the old totals
+    transaction.on_commit(lambda: _incr(key, delta))
+
+
+@receiver(resume_changed, dispatch_uid='stats.resume_changed')
+def _resume_changed(sender, created=False, deleted=False, **kwargs):
+    if sender is not Resume:
+        return
+    if created:
+        _adjust(TOTAL_RESUMES, 1)
+    elif deleted:
+        _adjust(TOTAL_RESUMES, -1)
+    transaction.on_commit(lambda: _cache().delete(FEATURED))
+
+
+@receiver(post_save, sender=User, dispatch_uid='stats.user_saved')
+def _user_saved(sender, created, **kwargs):
+    if created:
+        _adjust(TOTAL_USERS, 1)
+
+
+@receiver(post_delete, sender=User, dispatch_uid='stats.user_deleted')
+def _user_deleted(sender, **kwargs):
+    _adjust(TOTAL_USERS, -1)
@@ -1,3 +1,1336 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from datetime import date
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from . import counters, html_cache, images, jobs, pdf_cache, search
+from .documents import ResumeDocument
+from .models import *
+
+
+class ResumeTestCase(TestCase):
+    """Runs each test against an empty cache and throwaway media, PDF cache and
+    job directories, flushing buffered counters while its database still exists"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(counters.flush)
+        files = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, files)
+        self.enterContext(override_settings(
+            MEDIA_ROOT=f'{files}/media',
+            RESUME_PDF_CACHE={**settings.RESUME_PDF_CACHE, 'LOCATION': f'{files}/pdf'},
+            RESUME_PDF_JOBS={**settings.RESUME_PDF_JOBS, 'OUTPUT_DIR': f'{files}/jobs'},
+        ))
+        pdf_cache.reset_store()
+        self.addCleanup(pdf_cache.reset_store)
+
+
+class ResumeWithSectionsTests(ResumeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.resume = Resume.objects.create(name='Ada Lovelace', email='ada@example.com')
+        Skill.objects.create(resume=self.resume, name='Python', proficiency='expert')
+        Skill.objects.create(resume=self.resume, name='SQL')
+        Education.objects.create(resume=self.resume, degree='BSc', institution='UCL', year='1835')
+        WorkExperience.objects.create(resume=self.resume, company='Engines', position='Analyst',
+                                      duration='1842', description='Notes', current=True)
+        Certification.objects.create(resume=self.resume, name='Cert', issuer='RS',
+                                     date_obtained=date(1843, 9, 1))
+
+    def test_loads_resume_and_all_sections_in_two_queries(self):
+        with self.assertNumQueries(2):
+            resume = Resume.objects.with_sections().get(pk=self.resume.pk)
+            document = ResumeDocument.from_resume(resume)
+            self.assertEqual([s.name for s in document.skills], ['Python', 'SQL'])
+            self.assertEqual(document.education[0].institution, 'UCL')
+            self.assertIs(document.work_experience[0].current, True)
+            self.assertEqual(document.certifications[0].date_obtained, date(1843, 9, 1))
+            self.assertIsNone(document.certifications[0].expiry_date)
+            self.assertEqual(document.projects, ())
+            self.assertEqual(document.skills[0].resume, resume)
+
+    def test_other_backends_load_each_section_table_separately(self):
+        from unittest import mock
+        from django.db import connection
+
+        with mock.patch.object(connection, 'vendor', 'postgresql'), self.assertNumQueries(9):
+            document = ResumeDocument.from_resume(Resume.objects.with_sections().get(pk=self.resume.pk))
+        self.assertEqual([s.name for s in document.skills], ['Python', 'SQL'])
+        self.assertEqual(document.certifications[0].date_obtained, date(1843, 9, 1))
+
+    def test_union_round_trips_every_section_field(self):
+        from . import documents
+
+        # Text that SQLite could mistake for numbers, NULL or dates, and edge dates
+        values = {
+            'CharField': ['007', '1.50', '1e3', 'NULL', '', ' padded ', 'Ünïcødé', '2024-01-01'],
+            'TextField': ['0', 'line\nbreak', '', "quote ' \\"],
+            'DateField': [date(1, 1, 1), date(1843, 9, 1), date(9999, 12, 31), None],
+            'BooleanField': [True, False],
+        }
+        expected = {}
+        for name, model in RESUME_SECTIONS.items():
+            fields = documents._section_fields(model)
+            for i in range(max(len(choices) for choices in values.values())):
+                row = {}
+                for field in fields:
+                    choices = values[field.get_internal_type()]
+                    value = choices[i % len(choices)]
+                    if value is None and not field.null:
+                        value = date(2000, 2, 29)
+                    row[field.attname] = value[:field.max_length] if isinstance(value, str) and field.max_length else value
+                expected.setdefault(name, []).append(model.objects.create(resume=self.resume, **row).pk)
+
+        loaded = list(documents._load_union({self.resume.pk: self.resume}, 'default'))
+        orm = list(documents._load_per_table({self.resume.pk: self.resume}, 'default'))
+        self.assertEqual(len(loaded), len(orm))
+        for (name, row), (orm_name, orm_row) in zip(loaded, orm):
+            self.assertEqual((name, row.pk), (orm_name, orm_row.pk))
+            for field in documents._section_fields(RESUME_SECTIONS[name]):
+                value, orm_value = getattr(row, field.attname), getattr(orm_row, field.attname)
+                self.assertEqual((type(value), value), (type(orm_value), orm_value), f'{name}.{field.name}')
+        self.assertTrue(documents._union_safe())
+
+    def test_sections_with_other_field_types_are_loaded_per_table(self):
+        from unittest import mock
+        from . import documents
+
+        with mock.patch.object(documents, 'UNION_TYPES', {'CharField', 'TextField'}), self.assertNumQueries(9):
+            document = ResumeDocument.from_resume(Resume.objects.with_sections().get(pk=self.resume.pk))
+        self.assertEqual(document.certifications[0].date_obtained, date(1843, 9, 1))
+
+    @override_settings(RESUME_COUNTERS={'FLUSH_INTERVAL': 3600, 'MAX_BUFFERED': 1000})
+    def test_view_resume_query_count(self):
+        # One primary-key lookup of the snapshot
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/resume/{self.resume.pk}/')
+        self.assertContains(response, 'Python')
+
+    @override_settings(RESUME_COUNTERS={'FLUSH_INTERVAL': 3600, 'MAX_BUFFERED': 1000})
+    def test_view_resume_serves_cached_html_and_revalidates(self):
+        url = f'/resume/{self.resume.pk}/'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertContains(self.client.get(url), 'Python')
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(counters.buffer.pending(self.resume.pk)['views_count'], 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.create(resume=self.resume, name='Rust')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Rust')
+        self.assertNotEqual(response['ETag'], etag)
+
+        # A page rendered from data loaded before a change commits is not served
+        _, generation = html_cache.get_page(self.resume.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.create(resume=self.resume, name='Go')
+        html_cache.set_page(self.resume.pk, generation, 'stale', etag, 0, True)
+        self.assertContains(self.client.get(url), 'Go')
+
+
+class KeysetPaginationTests(ResumeTestCase):
+    def walk(self, paginator, cursor=None, direction='next'):
+        """Ids of every page reached by following ``direction`` cursors"""
+        pages = []
+        while True:
+            page = paginator.page(cursor)
+            pages.append([resume.pk for resume in page])
+            cursor = page.next_cursor if direction == 'next' else page.previous_cursor
+            if cursor is None:
+                return pages, page
+
+    def test_pages_forwards_and_back_over_equal_and_sub_millisecond_keys(self):
+        from datetime import datetime, timedelta, timezone
+        from .pagination import POPULAR, RECENT, KeysetPaginator
+
+        ids = [Resume.objects.create(name=f'Resume {i}', views_count=i // 3).pk for i in range(6)]
+        base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        for i, pk in enumerate(ids):
+            Resume.objects.filter(pk=pk).update(updated_at=base + timedelta(microseconds=100 * i))
+
+        for ordering, expected in ((RECENT, ids[::-1]), (POPULAR, [*ids[3:][::-1], *ids[:3][::-1]])):
+            paginator = KeysetPaginator(Resume.objects.all(), 2, ordering=ordering)
+            pages, last = self.walk(paginator)
+            self.assertEqual(pages, [expected[0:2], expected[2:4], expected[4:6]])
+            # Walking back from the last page gives the same pages in reverse
+            back, first = self.walk(paginator, last.previous_cursor, 'prev')
+            self.assertEqual(back, [expected[2:4], expected[0:2]])
+            self.assertEqual([r.pk for r in paginator.page(first.next_cursor)], expected[2:4])
+
+    def test_dashboard_counts_resumes_beyond_the_first_page(self):
+        from django.contrib.auth.models import User
+
+        user = User.objects.create_user('ada')
+        Resume.objects.bulk_create(Resume(user=user, name=f'Resume {i}') for i in range(13))
+        self.client.force_login(user)
+        # Total and Active Resumes both count every resume, not the 12 on this page
+        self.assertContains(self.client.get('/dashboard/'), '<h4>13</h4>', count=2)
+
+
+@override_settings(RESUME_COUNTERS={'FLUSH_INTERVAL': 3600, 'MAX_BUFFERED': 3})
+class CounterTests(ResumeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.resume = Resume.objects.create(name='Grace Hopper')
+        self.other = Resume.objects.create(name='Alan Turing')
+
+    def test_flush_adds_buffered_increments_without_touching_updated_at(self):
+        updated_at = self.resume.updated_at
+        counters.increment(self.resume.pk, 'views_count')
+        counters.increment(self.other.pk, 'views_count')
+        self.assertEqual(counters.apply_pending([self.resume])[0].views_count, 1)
+        counters.increment(self.resume.pk, 'downloads_count')
+
+        self.resume.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual((self.resume.views_count, self.resume.downloads_count), (1, 1))
+        self.assertEqual(self.other.views_count, 1)
+        self.assertEqual(self.resume.updated_at, updated_at)
+        self.assertEqual(counters.buffer.pending(self.resume.pk), {'views_count': 0, 'downloads_count': 0})
+
+    @override_settings(RESUME_COUNTERS={'FLUSH_INTERVAL': 3600, 'MAX_BUFFERED': 1000})
+    def test_dashboard_shows_stored_and_buffered_downloads(self):
+        from django.contrib.auth.models import User
+
+        user = User.objects.create_user('grace')
+        Resume.objects.filter(pk=self.resume.pk).update(user=user, downloads_count=4)
+        Resume.objects.create(user=user, name='COBOL', downloads_count=2)
+        counters.increment(self.resume.pk, 'downloads_count')
+        counters.increment(self.other.pk, 'downloads_count')
+        self.assertEqual(counters.total(Resume.objects.filter(user=user), 'downloads_count'), 7)
+        self.client.force_login(user)
+        self.assertContains(self.client.get('/dashboard/'), '<h4>7</h4>')
+
+    @override_settings(RESUME_COUNTERS={'FLUSH_INTERVAL': 3600, 'MAX_BUFFERED': 1000})
+    def test_exit_flush_writes_inline_when_the_writer_thread_cannot_start(self):
+        from unittest import mock
+        from . import sqlite
+
+        counters.increment(self.resume.pk, 'views_count')
+        counters.increment(self.resume.pk, 'downloads_count')
+        sqlite.writer.stop()
+        # What starting the writer thread raises during interpreter shutdown
+        shutdown = RuntimeError("can't create new thread at interpreter shutdown")
+        with mock.patch.object(sqlite, 'write', side_effect=shutdown), self.assertNoLogs('home.counters'):
+            counters._flush_at_exit()
+        self.resume.refresh_from_db()
+        self.assertEqual((self.resume.views_count, self.resume.downloads_count), (1, 1))
+
+    @override_settings(RESUME_COUNTERS={'FLUSH_INTERVAL': 0.05, 'MAX_BUFFERED': 1000})
+    def test_a_quiet_buffer_is_flushed_by_its_timer(self):
+        import threading
+        from unittest import mock
+
+        buffer = counters.CounterBuffer()
+        flushed = threading.Event()
+        with mock.patch.object(buffer, 'flush', side_effect=flushed.set):
+            buffer.increment(self.resume.pk, 'views_count')
+            self.assertTrue(flushed.wait(5))
+
+
+@override_settings(RESUME_METRICS={'SERVER_TIMING': True, 'ALLOWED_IPS': None})
+class MetricsTests(ResumeTestCase):
+    def test_records_request_timings_and_exposes_them(self):
+        resume = Resume.objects.create(name='Ada Lovelace', is_public=True)
+        response = self.client.get(f'/resume/{resume.pk}/')
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+        self.assertIn('db;dur=', response['Server-Timing'])
+
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn('resume_requests_total{view="view_resume",status="200"}', body)
+        self.assertIn('resume_sql_queries_bucket{view="view_resume",le="+Inf"}', body)
+        self.assertIn('resume_template_render_seconds_count{view="view_resume"}', body)
+
+    def test_scrapes_need_an_allowed_client_behind_a_trusted_proxy_or_the_token(self):
+        config = {**settings.RESUME_METRICS, 'ALLOWED_IPS': ('127.0.0.1',), 'TOKEN': 's3cret'}
+        remote = {'REMOTE_ADDR': '203.0.113.9'}
+        cases = [
+            ({}, {}, 200),
+            ({}, remote, 403),
+            # Everything a local proxy forwards arrives from 127.0.0.1
+            ({}, {'HTTP_X_FORWARDED_FOR': '203.0.113.9'}, 403),
+            ({'TRUSTED_PROXIES': ('10.0.0.2',)},
+             {'REMOTE_ADDR': '10.0.0.2', 'HTTP_X_FORWARDED_FOR': '127.0.0.1, 203.0.113.9'}, 403),
+            ({'TRUSTED_PROXIES': ('10.0.0.2',)},
+             {'REMOTE_ADDR': '10.0.0.2', 'HTTP_X_FORWARDED_FOR': '203.0.113.9, 127.0.0.1'}, 200),
+            ({}, {**remote, 'HTTP_AUTHORIZATION': 'Bearer s3cret'}, 200),
+            ({}, {**remote, 'HTTP_AUTHORIZATION': 'Bearer guess'}, 403),
+            ({'TOKEN': None}, {**remote, 'HTTP_AUTHORIZATION': 'Bearer '}, 403),
+        ]
+        for overrides, meta, status in cases:
+            with self.subTest(overrides=overrides, meta=meta), \
+                    override_settings(RESUME_METRICS={**config, **overrides}):
+                self.assertEqual(self.client.get('/metrics', **meta).status_code, status)
+
+
+class HomeStatsTests(ResumeTestCase):
+    def test_totals_follow_committed_writes_and_refresh_reconciles_drift(self):
+        from django.contrib.auth.models import User
+        from django.core.management import call_command
+        from django.db import DatabaseError, transaction
+        from . import stats
+
+        ada = Resume.objects.create(name='Ada Lovelace', title='CV', is_public=True, views_count=5)
+        Resume.objects.create(name='Private')
+        with self.assertNumQueries(3):
+            self.assertEqual(stats.get_home_stats(), {
+                'total_resumes': 2,
+                'total_users': 0,
+                'featured_resumes': [{'id': ada.pk, 'title': 'CV', 'name': 'Ada Lovelace', 'views_count': 5}],
+            })
+
+        # Totals are adjusted in place; only the featured list is reloaded
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user('grace')
+            grace = Resume.objects.create(name='Grace Hopper', is_public=True, views_count=9)
+        with self.assertNumQueries(1):
+            values = stats.get_home_stats()
+        self.assertEqual((values['total_resumes'], values['total_users']), (3, 1))
+        self.assertEqual([resume['id'] for resume in values['featured_resumes']], [grace.pk, ada.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(DatabaseError), transaction.atomic():
+                Resume.objects.create(name='Rolled back')
+                raise DatabaseError
+        self.assertEqual(stats.get_home_stats()['total_resumes'], 3)
+
+        # bulk_create sends no signals, so the total drifts until refreshed
+        Resume.objects.bulk_create([Resume(name='Imported')])
+        self.assertEqual(stats.get_home_stats()['total_resumes'], 3)
+        out = io.StringIO()
+        call_command('refresh_home_stats', stdout=out)
+        self.assertEqual(out.getvalue(), '2 featured, 4 resumes, 1 users\n')
+        self.assertContains(self.client.get('/'), 'Grace Hopper')
+
+
+class IngestTests(ResumeTestCase):
+    def inserts(self, queries, table):
+        return sum(q['sql'].startswith(f'INSERT INTO "{table}"') for q in queries)
+
+    def test_create_form_skips_blank_rows_fills_defaults_and_inserts_each_section_once(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from django.utils import timezone
+
+        post = {'name': 'Ada Lovelace', 'email': 'ada@example.com', 'template': 'modern',
+                'skills[]': ['Python', '', 'SQL'], 'skill_proficiencies[]': ['expert', 'advanced', ''],
+                'cert_names[]': ['Notes'], 'cert_issuers[]': ['Babbage'], 'cert_dates[]': ['']}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/create/', post)
+        resume = Resume.objects.get()
+        self.assertRedirects(response, f'/resume/{resume.pk}/', fetch_redirect_response=False)
+        self.assertEqual(self.inserts(queries, 'home_skill'), 1)
+        self.assertEqual(list(resume.skills.values_list('name', 'proficiency')),
+                         [('Python', 'expert'), ('SQL', 'intermediate')])
+        certification = resume.certifications.get()
+        self.assertEqual((certification.date_obtained, certification.expiry_date), (timezone.now().date(), None))
+
+    def test_an_invalid_row_rejects_the_whole_resume(self):
+        from django.contrib.messages import get_messages
+
+        post = {'name': 'Ada Lovelace', 'email': 'ada@example.com', 'skills[]': ['Python'],
+                'cert_names[]': ['Notes', 'Engines'], 'cert_issuers[]': ['Babbage', 'Babbage'],
+                'cert_urls[]': ['', 'not a url']}
+        response = self.client.post('/create/', post)
+        self.assertEqual([str(m) for m in get_messages(response.wsgi_request)],
+                         ['Certification #2: credential_url: Enter a valid URL.'])
+        self.assertFalse(Resume.objects.exists())
+        self.assertFalse(Skill.objects.exists())
+
+    def test_write_resumes_inserts_many_resumes_together_and_announces_each(self):
+        from django.core.exceptions import ValidationError
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from . import ingest
+        from .signals import resume_changed
+
+        announced = []
+        def receiver(sender, resume_id, created, **kwargs):
+            announced.append((resume_id, created))
+        resume_changed.connect(receiver)
+        self.addCleanup(resume_changed.disconnect, receiver)
+
+        items = [ingest.parse_json({'name': name, 'skills': [{'name': 'Python'}, {'name': ' '}]})
+                 for name in ('Ada Lovelace', 'Charles Babbage')]
+        with CaptureQueriesContext(connection) as queries:
+            resumes = ingest.write_resumes(items)
+        self.assertEqual((self.inserts(queries, 'home_resume'), self.inserts(queries, 'home_skill')), (1, 1))
+        self.assertEqual(announced, [(resume.pk, True) for resume in resumes])
+        self.assertEqual(Skill.objects.filter(resume__in=resumes).count(), 2)
+
+        with self.assertRaises(ValidationError):
+            ingest.write_resumes([ingest.parse_json({'name': 'Ada'}), ingest.parse_json({'email': 'nope'})])
+        self.assertEqual(Resume.objects.count(), 2)
+
+
+class ProfilePictureTests(ResumeTestCase):
+    def upload(self):
+        from PIL import Image
+
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera maker'
+        buffer = io.BytesIO()
+        Image.new('RGB', (800, 600), 'red').save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile('me.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def create(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/create/', {'name': 'Ada Lovelace', 'email': 'ada@example.com',
+                                          'template': 'modern', 'profile_picture': self.upload()})
+        return Resume.objects.latest('pk')
+
+    def test_upload_is_stored_once_as_stripped_square_variants(self):
+        from PIL import Image
+
+        first, second = self.create(), self.create()
+        self.assertEqual(first.profile_picture.name, second.profile_picture.name)
+        for variant, edge in images.VARIANTS.items():
+            name = images.variant_name(first.profile_picture.name, variant)
+            with first.profile_picture.storage.open(name) as f:
+                image = Image.open(f)
+                self.assertEqual(image.size, (edge, edge))
+                self.assertFalse(image.getexif())
+
+        first.is_public = True
+        first.save()
+        body = self.client.get(f'/resume/{first.pk}/').content.decode()
+        self.assertIn(first.profile_picture_url('display'), body)
+        self.assertNotIn(first.profile_picture_url('print'), body)
+        self.assertContains(self.client.get('/search/'), first.profile_picture_url('thumb'))
+
+    def test_failed_writes_store_no_picture_files(self):
+        from unittest import mock
+        from django.core.exceptions import ValidationError
+        from django.db import IntegrityError
+        from . import ingest
+
+        def data(**fields):
+            item = ingest.parse_json({'name': 'Ada Lovelace', 'skills': [{'name': 'Python'}], **fields})
+            item.profile_picture = self.upload()
+            return item
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValidationError):
+                ingest.write_resumes([data(), data(email='nope')])
+            with mock.patch.object(Skill.objects, 'bulk_create', side_effect=IntegrityError), \
+                    self.assertRaises(IntegrityError):
+                ingest.write_resumes([data()])
+        self.assertFalse(os.path.exists(f'{settings.MEDIA_ROOT}/{images.UPLOAD_DIR}'))
+        self.assertFalse(Resume.objects.exists())
+
+    def test_edit_stores_the_picture_only_once_it_commits(self):
+        from unittest import mock
+        from django.contrib.auth.models import User
+        from django.core.exceptions import ValidationError
+        from . import sections
+
+        user = User.objects.create_user('ada')
+        resume = Resume.objects.create(user=user, name='Ada Lovelace')
+        self.client.force_login(user)
+        url = f'/resume/{resume.pk}/edit/'
+        with self.captureOnCommitCallbacks(execute=True):
+            with mock.patch.object(sections, 'apply_changes', side_effect=ValidationError('Nope')):
+                self.client.post(url, {'name': 'Ada Lovelace', 'profile_picture': self.upload()})
+        self.assertFalse(os.path.exists(f'{settings.MEDIA_ROOT}/{images.UPLOAD_DIR}'))
+        resume.refresh_from_db()
+        self.assertFalse(resume.profile_picture)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {'name': 'Ada Lovelace', 'profile_picture': self.upload()})
+        resume.refresh_from_db()
+        for variant in images.VARIANTS:
+            self.assertTrue(resume.profile_picture.storage.exists(
+                images.variant_name(resume.profile_picture.name, variant)))
+
+
+class PdfAssetTests(ResumeTestCase):
+    def setUp(self):
+        super().setUp()
+        from . import pdf_assets
+
+        self.assets = pdf_assets
+        pdf_assets.cache.clear()
+        self.addCleanup(pdf_assets.cache.clear)
+        self.media = f'{settings.MEDIA_ROOT}/pics'
+        os.makedirs(self.media)
+
+    def write(self, name, data):
+        with open(f'{self.media}/{name}', 'wb') as f:
+            f.write(data)
+        return f'{self.media}/{name}'
+
+    def test_link_callback_only_returns_local_files(self):
+        from django.contrib.staticfiles import finders
+
+        path = self.write('me.jpg', b'jpeg')
+        remote = 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css'
+        self.assertEqual(self.assets.link_callback(remote), finders.find('home/pdf/font-awesome.css'))
+        self.assertEqual(self.assets.link_callback('/media/pics/me.jpg?v=1'), path)
+        self.assertEqual(self.assets.link_callback('data:,x'), 'data:,x')
+
+        for uri in ('https://example.com/tracker.png', '/media/../../settings.py', '/media/pics/missing.jpg'):
+            with self.assertLogs('home.pdf_assets', 'WARNING'):
+                self.assertEqual(self.assets.link_callback(uri), self.assets.EMPTY)
+        # CSS values xhtml2pdf could not evaluate are dropped quietly
+        with self.assertNoLogs('home.pdf_assets'):
+            self.assertEqual(self.assets.link_callback('linear-gradient(#fff, #000)'), self.assets.EMPTY)
+
+    def test_renders_reuse_parsed_stylesheets_and_read_only_asset_roots(self):
+        from unittest import mock
+        from xhtml2pdf import pisa
+        from .utils import render_pdf_bytes
+
+        parse = mock.Mock(wraps=self.assets._parse_external)
+        with mock.patch.object(self.assets, '_parse_external', parse):
+            for _ in range(2):
+                resume = Resume.objects.create(name='Ada Lovelace', template='modern')
+                self.assertTrue(render_pdf_bytes('resume_templates/modern.html', {'resume': resume}).startswith(b'%PDF'))
+        self.assertEqual(parse.call_count, 1)
+        # Renders outside cached_stylesheets() parse as usual
+        with mock.patch.object(self.assets, '_parse_external', parse):
+            pisa.pisaDocument('<link rel="stylesheet" href="/static/home/pdf/font-awesome.css">', io.BytesIO(),
+                              link_callback=self.assets.link_callback)
+        self.assertEqual(parse.call_count, 2)
+
+        # Local reads outside the asset roots are refused even if a callback allows them
+        from PIL import Image
+
+        secret = tempfile.NamedTemporaryFile(suffix='.png')
+        self.addCleanup(secret.close)
+        Image.new('RGB', (4, 4)).save(secret, 'PNG')
+        secret.flush()
+        with self.assertLogs('xhtml2pdf', 'WARNING') as logs:
+            pisa.pisaDocument(f'<img src="{secret.name}">', io.BytesIO(), link_callback=lambda uri, rel: uri,
+                              resource_policy=self.assets.resource_policy())
+        self.assertIn('Blocked by the resource policy', '\n'.join(logs.output))
+
+    def test_cache_keeps_recently_used_stylesheets_within_its_size_and_reparses_changed_ones(self):
+        paths = [self.write(name, b'p { color: red; }') for name in ('a.css', 'b.css', 'c.css')]
+        cache = self.assets.AssetCache()
+        # Each entry counts its 17 bytes of source, so two fit
+        with override_settings(RESUME_PDF_ASSETS={'CACHE_MAX_BYTES': 40}):
+            for path in (paths[0], paths[1], paths[0], paths[2]):
+                cache.stylesheet(path, lambda: path)
+            self.assertEqual(list(cache.entries), [paths[0], paths[2]])
+            self.assertEqual(cache.size, 34)
+            self.assertEqual(cache.stylesheet(paths[0], lambda: 'reparsed'), paths[0])
+
+            self.write('a.css', b'p { color: blue; }')
+            os.utime(paths[0], ns=(0, 0))
+            self.assertEqual(cache.stylesheet(paths[0], lambda: 'reparsed'), 'reparsed')
+            self.assertEqual(cache.size, 35)
+
+            # Rules that register fonts or pages on the render are parsed every time
+            font = self.write('font.css', b'@font-face { font-family: x; src: url(x.ttf); }')
+            self.assertEqual(cache.stylesheet(font, lambda: 'parsed'), 'parsed')
+            self.assertNotIn(font, cache.entries)
+
+
+@override_settings(RESUME_PDF_EXPORT={'CONCURRENCY': 0})
+class ExportTests(ResumeTestCase):
+    def test_dashboard_export_streams_a_zip_of_the_users_pdfs(self):
+        import zipfile
+        from django.contrib.auth.models import User
+
+        user = User.objects.create_user('ada', password='secret')
+        mine = [Resume.objects.create(user=user, name=name) for name in ('Ada Lovelace', '')]
+        Resume.objects.create(name='Someone Else')
+        self.client.force_login(user)
+
+        response = self.client.post('/dashboard/export/')
+        self.assertTrue(response.streaming)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(sorted(archive.namelist()),
+                         [f'ada-lovelace-{mine[0].pk}.pdf', f'resume-{mine[1].pk}.pdf'])
+        self.assertTrue(archive.read(f'resume-{mine[1].pk}.pdf').startswith(b'%PDF'))
+
+    async def test_asgi_export_streams_through_an_async_iterator(self):
+        import zipfile
+        from asgiref.sync import sync_to_async
+        from django.contrib.auth.models import User
+        from . import exports
+
+        user = await User.objects.acreate(username='ada')
+        resume = await Resume.objects.acreate(user=user, name='Ada Lovelace')
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.post('/dashboard/export/')
+        self.assertTrue(response.is_async)
+        self.assertEqual(exports._active_exports, 1)
+        data = b''.join([chunk async for chunk in response.streaming_content])
+        await sync_to_async(response.close)()
+        self.assertEqual(zipfile.ZipFile(io.BytesIO(data)).namelist(), [f'ada-lovelace-{resume.pk}.pdf'])
+        self.assertEqual(exports._active_exports, 0)
+
+
+class PdfDeliveryTests(ResumeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.resume = Resume.objects.create(name='Ada Lovelace')
+        self.url = f'/resume/{self.resume.pk}/download/'
+
+    def test_streams_with_length_and_serves_byte_ranges(self):
+        response = self.client.get(self.url)
+        body = b''.join(response.streaming_content)
+        self.assertTrue(body.startswith(b'%PDF'))
+        self.assertEqual(int(response['Content-Length']), len(body))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), body[-10:])
+        self.assertEqual(response['Content-Range'], f'bytes {len(body) - 10}-{len(body) - 1}/{len(body)}')
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(body)}-')
+        self.assertEqual(response.status_code, 416)
+
+    async def test_asgi_responses_stream_the_file_through_an_async_iterator(self):
+        async def body(response):
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        # A render, then the cached file
+        for _ in range(2):
+            response = await self.async_client.get(self.url)
+            self.assertTrue(response.is_async)
+            data = await body(response)
+            self.assertTrue(data.startswith(b'%PDF'))
+            self.assertEqual(int(response['Content-Length']), len(data))
+            self.assertEqual(response['Content-Disposition'], 'attachment; filename="resume.pdf"')
+        response = await self.async_client.get(self.url, headers={'Range': 'bytes=4-9'})
+        self.assertEqual((response.status_code, response['Content-Length']), (206, '6'))
+        self.assertEqual(await body(response), data[4:10])
+
+    def test_cached_file_is_handed_to_the_web_server(self):
+        self.client.get(self.url)
+        with override_settings(RESUME_PDF_DELIVERY={'SENDFILE': 'x-sendfile'}):
+            response = self.client.get(self.url)
+        self.assertEqual(response.content, b'')
+        self.assertTrue(response['X-Sendfile'].startswith(pdf_cache.get_config()['LOCATION']))
+
+    def test_a_render_of_old_data_finishing_after_an_edit_is_not_served(self):
+        before = ResumeDocument.from_resume(Resume.objects.with_sections().get(pk=self.resume.pk))
+        Skill.objects.create(resume=self.resume, name='Rust')
+        pdf_cache.set_pdf(self.resume.pk, pdf_cache.resume_fingerprint(before.resume, before.sections),
+                          b'%PDF stale')
+        body = b''.join(self.client.get(self.url).streaming_content)
+        self.assertTrue(body.startswith(b'%PDF'))
+        self.assertNotEqual(body, b'%PDF stale')
+
+    def test_fields_changed_without_bumping_updated_at_change_the_fingerprint(self):
+        from . import snapshots
+
+        def fingerprint():
+            document, version = snapshots.get_document(self.resume.pk)
+            return pdf_cache.resume_fingerprint(document.resume, document.sections)
+
+        before = fingerprint()
+        pdf_cache.set_pdf(self.resume.pk, before, b'%PDF stale')
+        Resume.objects.filter(pk=self.resume.pk).update(views_count=5, downloads_count=2)
+        snapshots.rebuild([self.resume.pk])
+        self.assertEqual(fingerprint(), before)
+
+        # Queryset updates and admin bulk actions leave updated_at alone
+        Resume.objects.filter(pk=self.resume.pk).update(name='Grace Hopper')
+        snapshots.rebuild([self.resume.pk])
+        self.assertNotEqual(fingerprint(), before)
+        self.assertNotEqual(b''.join(self.client.get(self.url).streaming_content), b'%PDF stale')
+
+    def test_disk_store_only_rescans_when_over_its_size(self):
+        from unittest import mock
+
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        store = pdf_cache.DiskStore(location, max_size=10)
+        store.set('aa', b'12345')
+        with mock.patch.object(store, '_scan', wraps=store._scan) as scan:
+            store.set('bb', b'12345')
+            store.delete('bb')
+            store.set('bb', b'12345')
+            scan.assert_not_called()
+            store.set('cc', b'123')
+            scan.assert_called_once()
+        self.assertLessEqual(sum(store.get(key) is not None and len(store.get(key)) for key in ('aa', 'bb', 'cc')), 10)
+
+
+class _InlineProcess:
+    """Stands in for a PDF worker process, rendering its job when started"""
+
+    def __init__(self, target, args, daemon):
+        self.target, self.args = target, args
+        self.exitcode = None
+
+    def start(self):
+        self.target(*self.args)
+        self.exitcode = 0
+
+    def is_alive(self):
+        return False
+
+    def join(self):
+        pass
+
+
+class _HungProcess(_InlineProcess):
+    def start(self):
+        pass
+
+    def is_alive(self):
+        return self.exitcode is None
+
+    def terminate(self):
+        self.exitcode = -15
+
+
+class PdfJobTests(ResumeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.enterContext(override_settings(RESUME_PDF_JOBS={**settings.RESUME_PDF_JOBS, 'ASYNC_DOWNLOADS': True}))
+        self.resume = Resume.objects.create(name='Ada Lovelace')
+        self.url = f'/resume/{self.resume.pk}/download/'
+
+    def run_workers(self, process, *args):
+        from types import SimpleNamespace
+        from unittest import mock
+        from django.core.management import call_command
+
+        with mock.patch('home.jobs.multiprocessing.get_context', return_value=SimpleNamespace(Process=process)):
+            call_command('run_pdf_workers', '--once', '--poll-interval', '0', *args, stdout=io.StringIO())
+
+    def test_run_pdf_workers_renders_the_job_for_the_session_that_started_it(self):
+        from django.contrib.auth.models import User
+        from django.test import Client
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 202)
+        job_url = response['Location']
+        self.assertEqual(self.client.get(self.url)['Location'], job_url)
+        self.assertEqual(self.client.get(job_url).json()['job']['status'], 'pending')
+
+        self.run_workers(_InlineProcess)
+        response = self.client.get(job_url)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        self.assertEqual(PdfRenderJob.objects.get().status, 'done')
+
+        # Knowing the URL is not enough; the owner and staff may still fetch it
+        self.assertEqual(Client().get(job_url).status_code, 404)
+        staff = Client()
+        staff.force_login(User.objects.create_user('admin', is_staff=True))
+        self.assertEqual(staff.get(job_url).status_code, 200)
+
+    def test_timed_out_jobs_fail(self):
+        job = jobs.enqueue(self.resume)
+        self.run_workers(_HungProcess, '--timeout', '0')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('failed', 'Timed out after 0.0 seconds'))
+
+    def test_concurrent_enqueues_share_one_job(self):
+        from unittest import mock
+        from django.db import IntegrityError, transaction
+        from django.db.models import QuerySet
+
+        job = jobs.enqueue(self.resume)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            PdfRenderJob.objects.create(resume=self.resume)
+
+        # The lookup races with a request that creates the job right after it
+        first = QuerySet.first
+        missed = iter([True])
+        with mock.patch.object(QuerySet, 'first', lambda queryset: None if next(missed, False) else first(queryset)):
+            self.assertEqual(jobs.enqueue(self.resume), job)
+        self.assertEqual(PdfRenderJob.objects.count(), 1)
+
+    def test_async_parameter_needs_the_opt_in(self):
+        with override_settings(RESUME_PDF_JOBS={**settings.RESUME_PDF_JOBS, 'ASYNC_DOWNLOADS': False}):
+            self.assertEqual(self.client.get(self.url, {'async': '1'}).status_code, 200)
+        # Changes the fingerprint, so the next download misses the PDF cache
+        Skill.objects.create(resume=self.resume, name='Rust')
+        with override_settings(RESUME_PDF_JOBS={**settings.RESUME_PDF_JOBS, 'ASYNC_DOWNLOADS': False,
+                                                'ASYNC_OPT_IN': True}):
+            self.assertEqual(self.client.get(self.url, {'async': '1'}).status_code, 202)
+
+
+class SectionChangesApiTests(ResumeTestCase):
+    def test_applies_a_batch_and_rejects_stale_versions(self):
+        import json
+        from django.contrib.auth.models import User
+
+        user = User.objects.create_user('ada', password='secret')
+        resume = Resume.objects.create(user=user, name='Ada Lovelace')
+        python = Skill.objects.create(resume=resume, name='Python', proficiency='expert')
+        sql = Skill.objects.create(resume=resume, name='SQL')
+        self.client.force_login(user)
+        url = f'/api/resume/{resume.pk}/sections/'
+        version = self.client.get(f'/resume/{resume.pk}/')['ETag']
+
+        changes = {
+            'skills': {'update': [{'id': python.pk, 'proficiency': 'advanced'}], 'delete': [sql.pk]},
+            'education': {'create': [{'degree': 'BSc', 'institution': 'UCL', 'year': '1835'}]},
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, json.dumps({'changes': changes}), content_type='application/json',
+                                        HTTP_IF_MATCH=version)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['updated'], {'skills': [python.pk]})
+        self.assertEqual([s['proficiency'] for s in data['sections']['skills']], ['advanced'])
+        self.assertEqual(data['sections']['education'][0]['id'], data['created']['education'][0])
+        self.assertEqual(response['ETag'], self.client.get(f'/resume/{resume.pk}/')['ETag'])
+
+        # The old version is stale now; nothing is written
+        invalid = {'skills': {'create': [{'name': 'Go'}]}}
+        response = self.client.post(url, json.dumps({'changes': invalid, 'version': version.strip('"')}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(response.json()['version'], data['version'])
+        response = self.client.post(url, json.dumps({'changes': {'skills': {'create': [{'name': ''}]}}}),
+                                    content_type='application/json', HTTP_IF_MATCH=data['version'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(resume.skills.values_list('name', flat=True)), ['Python'])
+
+    def test_apply_changes_rebuilds_the_snapshot_once(self):
+        from unittest import mock
+        from . import sections, snapshots
+
+        resume = Resume.objects.create(name='Ada Lovelace')
+        skills = [Skill.objects.create(resume=resume, name=name) for name in ('A', 'B', 'C')]
+        resume = Resume.objects.with_sections().get(pk=resume.pk)
+        with mock.patch('home.snapshots.rebuild', wraps=snapshots.rebuild) as rebuild:
+            sections.apply_changes(resume, {'skills': {'delete': [s.pk for s in skills], 'create': [{'name': 'D'}]}})
+        self.assertEqual([pk for call in rebuild.call_args_list for pk in call.args[0]], [resume.pk])
+        document, _ = snapshots.get_document(resume.pk)
+        self.assertEqual([s.name for s in document.skills], ['D'])
+
+    def test_edit_form_keeps_columns_it_did_not_post_and_ids_must_be_numbers(self):
+        from django.contrib.auth.models import User
+        from django.core.exceptions import ValidationError
+        from . import sections
+
+        user = User.objects.create_user('ada', password='secret')
+        resume = Resume.objects.create(user=user, name='Ada Lovelace')
+        cert = Certification.objects.create(resume=resume, name='Notes', issuer='RS', date_obtained=date(1843, 9, 1))
+        self.client.force_login(user)
+        self.client.post(f'/resume/{resume.pk}/edit/', {
+            'name': 'Ada Lovelace', 'certifications_ids[]': [cert.pk], 'cert_names[]': ['Notes on the Engine'],
+        })
+        cert.refresh_from_db()
+        self.assertEqual((cert.name, cert.date_obtained), ('Notes on the Engine', date(1843, 9, 1)))
+
+        resume = Resume.objects.with_sections().get(pk=resume.pk)
+        for changes in ({'certifications': {'delete': [True]}},
+                        {'certifications': {'update': [{'id': True, 'name': 'X'}]}}):
+            with self.assertRaises(ValidationError):
+                sections.apply_changes(resume, changes)
+
+    def test_edit_form_writes_only_changed_rows(self):
+        from django.contrib.auth.models import User
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        user = User.objects.create_user('ada', password='secret')
+        resume = Resume.objects.create(user=user, name='Ada Lovelace', title='CV')
+        python = Skill.objects.create(resume=resume, name='Python', proficiency='expert')
+        sql = Skill.objects.create(resume=resume, name='SQL')
+        Skill.objects.create(resume=resume, name='COBOL')
+        education = Education.objects.create(resume=resume, degree='BSc', institution='UCL', year='1835')
+        self.client.force_login(user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f'/resume/{resume.pk}/edit/', {
+                'name': 'Ada Lovelace', 'title': 'CV',
+                'skills_ids[]': [python.pk, sql.pk, ''],
+                'skills[]': ['Python', 'SQL', 'Go'],
+                'skill_proficiencies[]': ['expert', 'advanced', ''],
+            })
+        self.assertEqual(response.status_code, 302)
+        writes = [q['sql'] for q in queries.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+        self.assertEqual(len([w for w in writes if w.startswith('UPDATE "home_skill"')]), 1)
+        self.assertIn('SET "updated_at"', [w for w in writes if w.startswith('UPDATE "home_resume"')][0])
+        self.assertNotIn('"name"', [w for w in writes if w.startswith('UPDATE "home_resume"')][0])
+        skills = list(resume.skills.order_by('pk').values_list('pk', 'name', 'proficiency'))
+        self.assertEqual(skills[:2], [(python.pk, 'Python', 'expert'), (sql.pk, 'SQL', 'advanced')])
+        self.assertEqual(skills[2][1:], ('Go', 'intermediate'))
+        self.assertEqual(len(skills), 3)
+        # Sections the form did not post are untouched
+        self.assertTrue(Education.objects.filter(pk=education.pk).exists())
+
+
+@override_settings(ROOT_URLCONF='resume_file.asgi_urls')
+class AsyncViewTests(ResumeTestCase):
+    def test_asgi_routes_the_read_views_to_their_async_versions(self):
+        from asgiref.sync import iscoroutinefunction
+        from django.urls import resolve
+
+        paths = ('/', '/dashboard/', '/search/', '/resume/1/', '/resume/1/download/')
+        self.assertTrue(all(iscoroutinefunction(resolve(path).func) for path in paths))
+        self.assertFalse(iscoroutinefunction(resolve('/resume/1/edit/').func))
+        self.assertFalse(any(iscoroutinefunction(resolve(path, 'resume_file.urls').func) for path in paths))
+
+    async def test_read_views_serve_through_the_asgi_handler(self):
+        resume = await Resume.objects.acreate(name='Ada Lovelace', is_public=True)
+        await Skill.objects.acreate(resume=resume, name='Python')
+
+        response = await self.async_client.get(f'/resume/{resume.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Ada Lovelace')
+        response = await self.async_client.get('/search/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_count'], 1)
+        self.assertEqual([r.pk for r in response.context['resumes']], [resume.pk])
+        response = await self.async_client.get('/')
+        self.assertEqual(response.context['total_resumes'], 1)
+        self.assertEqual((await self.async_client.get('/resume/0/')).status_code, 404)
+
+    async def test_asgi_handler_sends_pdf_downloads_block_by_block(self):
+        import asyncio
+        import warnings
+        from unittest import mock
+        from django.core import signals
+        from django.core.handlers.asgi import ASGIHandler
+        from django.db import close_old_connections
+        from django.http import FileResponse
+
+        # As the test client does, keep the test transaction's connection open
+        for signal in (signals.request_started, signals.request_finished):
+            signal.disconnect(close_old_connections)
+            self.addCleanup(signal.connect, close_old_connections)
+        resume = await Resume.objects.acreate(name='Ada Lovelace')
+        scope = {'type': 'http', 'method': 'GET', 'path': f'/resume/{resume.pk}/download/',
+                 'query_string': b'', 'headers': [(b'host', b'testserver')]}
+        requests = [{'type': 'http.request'}]
+        messages = []
+
+        async def receive():
+            return requests.pop() if requests else await asyncio.Future()
+
+        async def send(message):
+            messages.append(message)
+
+        with warnings.catch_warnings(), mock.patch.object(FileResponse, 'block_size', 1024):
+            # Django warns when it has to buffer a synchronous streaming body
+            warnings.simplefilter('error')
+            await ASGIHandler()(scope, receive, send)
+        self.assertEqual(messages[0]['status'], 200)
+        bodies = [message.get('body', b'') for message in messages[1:]]
+        self.assertTrue(b''.join(bodies).startswith(b'%PDF'))
+        self.assertEqual(len(bodies), -(-len(b''.join(bodies)) // 1024) + 1)
+
+
+class SearchTests(ResumeTestCase):
+    def setUp(self):
+        super().setUp()
+        search.reset_backend()
+        self.addCleanup(search.reset_backend)
+        self.backend = search.get_backend()
+        if not isinstance(self.backend, search.SQLiteFTSBackend):
+            self.skipTest('SQLite was built without FTS5')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ada = Resume.objects.create(name='Ada Lovelace')
+            self.grace = Resume.objects.create(name='Grace Hopper', about='Read the notes of Ada')
+            Skill.objects.create(resume=self.grace, name='COBOL')
+
+    def search(self, query, columns=None):
+        return list(self.backend.search(Resume.objects.all(), query, columns))
+
+    def test_matches_word_prefixes_ranked_by_column_weight(self):
+        self.assertEqual(self.search('ada'), [self.ada, self.grace])
+        self.assertEqual(self.search('cob'), [self.grace])
+        self.assertEqual(self.search('ada', columns=['name']), [self.ada])
+        self.assertEqual(self.search('ada hopper'), [self.grace])
+        self.assertEqual(self.search('!!'), [])
+        self.assertEqual(list(search.SimpleSearchBackend().search(Resume.objects.all(), 'cobol')), [self.grace])
+
+    def test_fallback_is_kept_until_migrations_run(self):
+        from unittest import mock
+        from django.core.management import call_command
+
+        search.reset_backend()
+        with mock.patch.object(search, 'fts_available', return_value=False) as probe:
+            self.assertIsInstance(search.get_backend(), search.SimpleSearchBackend)
+            self.assertIs(search.get_backend(), search.get_backend())
+        self.assertEqual(probe.call_count, 1)
+        self.assertIsInstance(search.get_backend(), search.SimpleSearchBackend)
+        call_command('migrate', 'home', verbosity=0)
+        self.assertIsInstance(search.get_backend(), search.SQLiteFTSBackend)
+
+    def test_both_backends_search_the_same_columns(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Project.objects.create(resume=self.ada, title='Engine', technologies='Punched cards')
+            Certification.objects.create(resume=self.grace, name='Admiral', issuer='Navy', date_obtained=date(1985, 1, 1))
+        simple = search.SimpleSearchBackend()
+        for query, expected in (('engine', [self.ada]), ('punched', [self.ada]), ('navy', [self.grace])):
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query), expected)
+                self.assertEqual(list(simple.search(Resume.objects.all(), query)), expected)
+
+    def test_index_follows_committed_changes_once_per_transaction(self):
+        from unittest import mock
+        from django.db import DatabaseError, transaction
+
+        with mock.patch.object(self.backend, 'index', wraps=self.backend.index) as index:
+            with self.captureOnCommitCallbacks(execute=True):
+                Skill.objects.create(resume=self.ada, name='Rust')
+                Skill.objects.create(resume=self.ada, name='Erlang')
+        index.assert_called_once_with([self.ada.pk])
+        self.assertEqual(self.search('erlang'), [self.ada])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(DatabaseError), transaction.atomic():
+                Skill.objects.create(resume=self.grace, name='Haskell')
+                raise DatabaseError
+            Skill.objects.create(resume=self.ada, name='Go')
+        self.assertEqual(self.search('haskell'), [])
+        self.assertEqual(self.search('go'), [self.ada])
+
+
+class SQLiteTuningTests(ResumeTestCase):
+    @override_settings(RESUME_SQLITE={})
+    def test_file_connections_get_wal_and_pragmas(self):
+        from django.db import connection
+        from django.db.backends.sqlite3.base import DatabaseWrapper
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        wrapper = DatabaseWrapper({**connection.settings_dict, 'NAME': f'{directory}/db.sqlite3'}, alias='tuning')
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            values = {}
+            for pragma in ('journal_mode', 'busy_timeout', 'synchronous', 'cache_size'):
+                cursor.execute(f'PRAGMA {pragma}')
+                values[pragma] = cursor.fetchone()[0]
+        self.assertEqual(values, {'journal_mode': 'wal', 'busy_timeout': 5000, 'synchronous': 1,
+                                  'cache_size': -64 * 1024})
+
+
+    def test_write_queue_batches_jobs_on_a_file_database(self):
+        import threading
+        import time
+        from unittest import mock
+        from django.db import IntegrityError, connection, connections
+        from . import sqlite
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        connections.settings['writes'] = {**connection.settings_dict, 'NAME': f'{directory}/db.sqlite3'}
+        self.addCleanup(connections.settings.pop, 'writes')
+        self.enterContext(mock.patch.object(type(self), 'databases', {*self.databases, 'writes'}))
+        self.addCleanup(connections['writes'].close)
+        with connections['writes'].cursor() as cursor:
+            cursor.execute('CREATE TABLE entry (value integer UNIQUE)')
+
+        queue = sqlite.WriteQueue(using='writes')
+        self.addCleanup(queue.stop)
+        batches = []
+        run_batch = queue._run_batch
+        queue._run_batch = lambda batch: (batches.append(len(batch)), run_batch(batch))
+        started, release = threading.Event(), threading.Event()
+        results = []
+
+        def insert(value, hold=False):
+            if hold:
+                started.set()
+                release.wait(5)
+            with connections['writes'].cursor() as cursor:
+                cursor.execute('INSERT INTO entry VALUES (%s)', [value])
+            return threading.current_thread().name
+
+        def submit(*args):
+            try:
+                results.append(queue.submit(insert, args, {}))
+            except Exception as exc:
+                results.append(exc)
+
+        # The first job holds the writer while the others queue up behind it;
+        # 3 is inserted twice and only that job's savepoint is rolled back
+        threads = [threading.Thread(target=submit, args=(0, True))]
+        threads[0].start()
+        started.wait(5)
+        threads += [threading.Thread(target=submit, args=(value,)) for value in (1, 2, 3, 3, 4)]
+        for thread in threads[1:]:
+            thread.start()
+        while queue.jobs.qsize() < 5:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(batches, [1, 5])
+        self.assertEqual(sum(isinstance(result, IntegrityError) for result in results), 1)
+        self.assertEqual(results.count('sqlite-writer'), 5)
+        with connections['writes'].cursor() as cursor:
+            cursor.execute('SELECT value FROM entry ORDER BY value')
+            self.assertEqual([row[0] for row in cursor.fetchall()], [0, 1, 2, 3, 4])
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+
+    def test_a_failing_commit_hook_does_not_fail_committed_jobs(self):
+        from unittest import mock
+        from django.db import connection, connections, transaction
+        from . import sqlite
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        connections.settings['hooks'] = {**connection.settings_dict, 'NAME': f'{directory}/db.sqlite3'}
+        self.addCleanup(connections.settings.pop, 'hooks')
+        self.enterContext(mock.patch.object(type(self), 'databases', {*self.databases, 'hooks'}))
+        self.addCleanup(connections['hooks'].close)
+        with connections['hooks'].cursor() as cursor:
+            cursor.execute('CREATE TABLE entry (value integer)')
+
+        queue = sqlite.WriteQueue(using='hooks')
+        self.addCleanup(queue.stop)
+        ran = []
+
+        def insert(value):
+            with connections['hooks'].cursor() as cursor:
+                cursor.execute('INSERT INTO entry VALUES (%s)', [value])
+            transaction.on_commit(lambda: 1 / 0, using='hooks')
+            transaction.on_commit(lambda: ran.append(value), using='hooks')
+            return value
+
+        with self.assertLogs('home.sqlite', 'ERROR'):
+            self.assertEqual(queue.submit(insert, (1,), {}), 1)
+        self.assertEqual(ran, [1])
+        with connections['hooks'].cursor() as cursor:
+            cursor.execute('SELECT value FROM entry')
+            self.assertEqual(cursor.fetchall(), [(1,)])
+
+    def test_excluded_files_keep_their_journal_mode(self):
+        from unittest import mock
+        from django.db import connection, connections
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = f'{directory}/db.sqlite3'
+        connections.settings['excluded'] = {**connection.settings_dict, 'NAME': path}
+        self.addCleanup(connections.settings.pop, 'excluded')
+        self.enterContext(mock.patch.object(type(self), 'databases', {*self.databases, 'excluded'}))
+        self.addCleanup(connections['excluded'].close)
+        self.enterContext(override_settings(RESUME_SQLITE={**settings.RESUME_SQLITE, 'EXCLUDE': [path]}))
+        with connections['excluded'].cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'delete')
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], settings.RESUME_SQLITE['BUSY_TIMEOUT'])
+        self.assertFalse(os.path.exists(f'{path}-wal'))
+
+
+class ReplicaRoutingTests(ResumeTestCase):
+    @override_settings(RESUME_DATABASE_ROUTING={'REPLICAS': ['missing'], 'RETRY_SECONDS': 30})
+    def test_routes_resume_reads_and_pins_writers_to_the_primary(self):
+        from django.contrib.auth.models import User
+        from django.test import RequestFactory
+        from . import routing
+
+        router = routing.ReplicaRouter()
+        with routing.reading_from('replica'):
+            self.assertEqual(router.db_for_read(Resume), 'replica')
+            self.assertEqual(router.db_for_read(Skill), 'replica')
+            self.assertIsNone(router.db_for_read(User))
+        self.assertEqual(router.db_for_write(Resume), 'default')
+
+        # An unreachable replica is skipped, and then not probed again for a while
+        self.addCleanup(routing._down.clear)
+        with self.assertLogs('home.routing', 'WARNING'):
+            self.assertEqual(routing.read_alias(RequestFactory().get('/')), 'default')
+        self.assertIn('missing', routing._down)
+
+        response = self.client.post('/logout/')
+        self.assertEqual(response.cookies['resume_primary_pin']['max-age'], 15)
+        self.assertNotIn('resume_primary_pin', self.client.get('/login/').cookies)
+
+    def test_pages_read_from_a_replica_are_not_cached(self):
+        from unittest import mock
+
+        resume = Resume.objects.create(name='Ada Lovelace')
+        with mock.patch('home.views.reading_replica', return_value=True):
+            self.assertContains(self.client.get(f'/resume/{resume.pk}/'), 'Ada Lovelace')
+        self.assertIsNone(html_cache.get_page(resume.pk)[0])
+        self.client.get(f'/resume/{resume.pk}/')
+        self.assertIsNotNone(html_cache.get_page(resume.pk)[0])
+
+
+class JsonResumeImportExportTests(ResumeTestCase):
+    def test_export_imports_back_and_failed_lines_are_set_aside(self):
+        import json
+        from django.core.management import call_command
+
+        resume = Resume.objects.create(title='CV', template='classic', name='Ada Lovelace', email='ada@example.com',
+                                       github='https://github.com/ada', is_public=True)
+        Skill.objects.create(resume=resume, name='Python', proficiency='expert')
+        WorkExperience.objects.create(resume=resume, company='Analytical Engines', position='Engineer',
+                                      duration='1842 - Present', start_date=date(1842, 1, 1), current=True)
+        Certification.objects.create(resume=resume, name='Notes', issuer='Babbage', date_obtained=date(1843, 9, 1))
+
+        out = io.StringIO()
+        call_command('export_resumes', stdout=out, stderr=io.StringIO())
+        exported = out.getvalue()
+        document = json.loads(exported)
+        self.assertEqual(document['basics']['profiles'], [{'network': 'GitHub', 'url': 'https://github.com/ada'}])
+        self.assertEqual(document['work'][0]['startDate'], '1842-01-01')
+
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir)
+        source, failed, checkpoint = (f'{workdir}/{name}' for name in ('in.jsonl', 'failed.jsonl', 'checkpoint'))
+        with open(source, 'w') as f:
+            # A wrongly typed record fails alone, not with the chunk it shares
+            f.write(exported + '{"basics": {"email": "not an email"}}\n{"meta": "x"}\n' + exported)
+        options = {'workers': 0, 'chunk_size': 2, 'failed': failed, 'checkpoint': checkpoint,
+                   'stdout': io.StringIO(), 'stderr': io.StringIO()}
+        call_command('import_resumes', source, **options)
+
+        imported = Resume.objects.exclude(pk=resume.pk).with_sections()
+        self.assertEqual(len(imported), 2)
+        copy = imported[0]
+        self.assertEqual((copy.title, copy.template, copy.name, copy.github, copy.is_public),
+                         ('CV', 'classic', 'Ada Lovelace', 'https://github.com/ada', True))
+        self.assertEqual([(s.name, s.proficiency) for s in copy.skills.all()], [('Python', 'expert')])
+        job = copy.work_experience.get()
+        self.assertEqual((job.company, job.start_date, job.current), ('Analytical Engines', date(1842, 1, 1), True))
+        self.assertEqual(copy.certifications.get().date_obtained, date(1843, 9, 1))
+        with open(failed) as f:
+            self.assertEqual(f.read(), '{"basics": {"email": "not an email"}}\n{"meta": "x"}\n')
+
+        # Every line is in the checkpoint, so running again imports nothing
+        call_command('import_resumes', source, **options)
+        self.assertEqual(Resume.objects.count(), 3)
+
+
+class SnapshotTests(ResumeTestCase):
+    def test_snapshots_follow_writes_and_drift_is_repaired(self):
+        from unittest import mock
+        from django.contrib.auth.models import User
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        from . import sections, snapshots
+
+        resume = Resume.objects.create(name='Ada Lovelace', template='classic')
+        Skill.objects.create(resume=resume, name='Python', proficiency='expert')
+        WorkExperience.objects.create(resume=resume, company='Engines', position='Analyst', duration='1842',
+                                      description='Notes', start_date=date(1842, 1, 1))
+
+        live = Resume.objects.with_sections().get(pk=resume.pk)
+        with self.assertNumQueries(1):
+            document, version = snapshots.get_document(resume.pk)
+        self.assertEqual(version, sections.version(live))
+        # Loaded rows fingerprint the same as the live ones
+        self.assertEqual(sections.version(document.resume), version)
+        self.assertEqual(document.resume.template, 'classic')
+        self.assertEqual([(s.name, s.proficiency) for s in document.resume.skills.all()], [('Python', 'expert')])
+        self.assertEqual(document.work_experience[0].start_date, date(1842, 1, 1))
+
+        Skill.objects.filter(resume=resume).delete()
+        self.assertEqual(snapshots.get_document(resume.pk)[0].skills, ())
+
+        # Writes that skip resume_changed drift until repaired
+        Resume.objects.filter(pk=resume.pk).update(name='Augusta Ada King')
+        ResumeSnapshot.objects.filter(pk=Resume.objects.create(name='Other').pk).delete()
+        with self.assertRaises(CommandError):
+            call_command('check_snapshots', stdout=io.StringIO())
+        out = io.StringIO()
+        call_command('check_snapshots', '--repair', stdout=out)
+        # The changed field is part of the fingerprint, so the version is stale too
+        self.assertIn(f'Resume {resume.pk}: stale version snapshot', out.getvalue())
+        self.assertIn('missing snapshot', out.getvalue())
+        self.assertEqual(snapshots.get_document(resume.pk)[0].resume.name, 'Augusta Ada King')
+        call_command('check_snapshots', stdout=io.StringIO())
+
+        # Deleting a resume cascades to its sections without recreating the snapshot,
+        # or rebuilding it once per deleted row
+        Skill.objects.create(resume=resume, name='SQL')
+        user = User.objects.create_user('ada')
+        Resume.objects.filter(pk=resume.pk).update(user=user)
+        self.client.force_login(user)
+        with mock.patch.object(snapshots, 'rebuild', wraps=snapshots.rebuild) as rebuild:
+            self.client.post(f'/resume/{resume.pk}/delete/')
+        self.assertFalse(Resume.objects.filter(pk=resume.pk).exists())
+        self.assertFalse(ResumeSnapshot.objects.filter(pk=resume.pk).exists())
+        self.assertEqual([call.args[0] for call in rebuild.call_args_list], [[], []])
+
+
+class AdminChangelistTests(ResumeTestCase):
+    def test_section_changelist_is_n_plus_one_free_searchable_and_estimated(self):
+        from unittest import mock
+        from django.contrib.auth.models import User
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from . import pagination
+
+        self.client.force_login(User.objects.create_superuser('admin', password='secret'))
+
+        def changelist(query=''):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(f'/admin/home/skill/{query}')
+            self.assertEqual(response.status_code, 200)
+            return response, len(queries)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ada = Resume.objects.create(name='Ada Lovelace')
+            Skill.objects.create(resume=ada, name='Python')
+        response, queries = changelist()
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(10):
+                Skill.objects.create(resume=Resume.objects.create(name=f'Grace {i}'), name='Go')
+        response, more_queries = changelist()
+        self.assertEqual(more_queries, queries)
+        self.assertContains(response, '11 skills')
+
+        # Searches match the row's own columns, or its resume's name in the full-text index
+        response, _ = changelist('?q=lovelace')
+        self.assertContains(response, 'Ada Lovelace')
+        self.assertNotContains(response, 'Grace 1')
+        response, _ = changelist('?q=go')
+        self.assertContains(response, '10 skills')
+        self.assertNotContains(response, 'Ada Lovelace')
+
+        # Past the threshold, unfiltered lists show the analyzed row count
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        Skill.objects.create(resume=ada, name='SQL')
+        with mock.patch.object(pagination, 'ESTIMATE_THRESHOLD', 5):
+            self.assertContains(changelist()[0], '11 skills')
+            self.assertContains(changelist('?proficiency__exact=intermediate')[0], '12 skills')
+
+        # Other skills of a resume with a matching skill stay out
+        Skill.objects.create(resume=ada, name='Haskell')
+        response, _ = changelist('?q=python')
+        self.assertContains(response, '1 skill')
+        self.assertNotContains(response, 'Haskell')
+
+    def test_section_search_matches_own_columns(self):
+        from django.contrib.auth.models import User
+
+        self.client.force_login(User.objects.create_superuser('admin', password='secret'))
+        ada = Resume.objects.create(name='Ada Lovelace')
+        grace = Resume.objects.create(name='Grace Hopper')
+        Education.objects.create(resume=ada, degree='Mathematics', institution='University of London', year='1840')
+        Education.objects.create(resume=grace, degree='Mathematics', institution='Yale', year='1934')
+        WorkExperience.objects.create(resume=ada, position='Analyst', company='Analytical Engines', duration='1842')
+        WorkExperience.objects.create(resume=grace, position='Programmer', company='Eckert-Mauchly', duration='1949')
+
+        response = self.client.get('/admin/home/education/?q=yale')
+        self.assertContains(response, '1 education')
+        self.assertContains(response, 'Yale')
+        self.assertNotContains(response, 'University of London')
+
+        response = self.client.get('/admin/home/workexperience/?q=eckert')
+        self.assertContains(response, '1 work experience')
+        self.assertContains(response, 'Eckert-Mauchly')
+        self.assertNotContains(response, 'Analytical Engines')
+
+        # Prefix searches, answered from indexes rather than a table scan
+        self.assertContains(self.client.get('/admin/home/education/?q=ale'), '0 educations')
+        from django.contrib.admin.sites import site
+        model_admin = site._registry[WorkExperience]
+        rows, _ = model_admin.get_search_results(None, WorkExperience.objects.all(), 'eckert mauchly')
+        plan = rows.explain()
+        self.assertIn('workexperience_company_nocase_idx', plan)
+        self.assertNotIn('SCAN home_workexperience', plan)
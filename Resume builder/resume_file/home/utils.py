@@ -1,14 +1,75 @@
 from django.template.loader import render_to_string
 from django.http import HttpResponse
 from xhtml2pdf import pisa
-import io
+import tempfile
 
-def render_to_pdf(template_src, context_dict={}):
+from . import delivery, metrics, pdf_assets
+
+def render_pdf_file(template_src, context_dict={}):
+    """Render a template to a rewound temporary file, or None if xhtml2pdf reports errors
+
+    The PDF stays in memory up to ``SPOOL_MAX_MEMORY`` bytes and spills to
+    disk beyond that.
+    """
     html_string = render_to_string(template_src, context_dict)
-    result = io.BytesIO()
-    pdf = pisa.pisaDocument(io.BytesIO(html_string.encode('UTF-8')), result)
-    if not pdf.err:
-        response = HttpResponse(result.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename="resume.pdf"'
-        return response
+    result = tempfile.SpooledTemporaryFile(max_size=delivery.get_config()['SPOOL_MAX_MEMORY'])
+    with metrics.timer('pdf_render_seconds'), pdf_assets.cached_stylesheets():
+        pdf = pisa.pisaDocument(
+            html_string, result, encoding='utf-8',
+            link_callback=pdf_assets.link_callback,
+            resource_policy=pdf_assets.resource_policy(),
+        )
+    if pdf.err:
+        result.close()
+        return None
+    metrics.observe('pdf_size_bytes', result.tell())
+    result.seek(0)
+    return result
+
+def render_pdf_bytes(template_src, context_dict={}):
+    """Render a template to PDF bytes, or None if xhtml2pdf reports errors"""
+    result = render_pdf_file(template_src, context_dict)
+    if result is None:
+        return None
+    with result:
+        return result.read()
+
+def pdf_response(data, filename='resume.pdf'):
+    response = HttpResponse(data, content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def render_to_pdf(template_src, context_dict={}):
+    data = render_pdf_bytes(template_src, context_dict)
+    if data is not None:
+        return pdf_response(data)
     return HttpResponse('We had some errors while generating the PDF')
+
+def open_resume_pdf(document):
+    """Return the PDF for a ResumeDocument as an open binary file, serving from the PDF cache when possible"""
+    from . import pdf_cache
+
+    resume = document.resume
+    fingerprint = pdf_cache.resume_fingerprint(resume, document.sections)
+    cached = pdf_cache.open_pdf(resume.pk, fingerprint)
+    if cached is not None:
+        return cached
+    result = render_pdf_file(document.template_name, document.context(picture='print'))
+    if result is None:
+        return None
+    pdf_cache.set_pdf(resume.pk, fingerprint, result)
+    # Prefer the cached copy, which the web server can send by path
+    stored = pdf_cache.open_pdf(resume.pk, fingerprint)
+    if stored is not None:
+        result.close()
+        return stored
+    result.seek(0)
+    return result
+
+def render_resume_pdf(document):
+    """Return PDF bytes for a ResumeDocument, serving from the PDF cache when possible"""
+    result = open_resume_pdf(document)
+    if result is None:
+        return None
+    with result:
+        return result.read()
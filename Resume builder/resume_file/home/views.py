@@ -1,16 +1,25 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.db import transaction
+from django.http import Http404, HttpResponse, JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib import messages
-from django.db.models import Q
-from django.core.paginator import Paginator
-from django.utils import timezone
+from django.core.exceptions import ValidationError
 from .models import *
-from .utils import render_to_pdf
+from .utils import open_resume_pdf
+from .documents import ResumeDocument
+from .pagination import KeysetPaginator, POPULAR, RECENT, cached_count
+from .routing import reading_replica, replica_reads
+from . import counters, delivery, exports, html_cache, images, ingest, jobs, pdf_cache, search, sections, snapshots, stats
+from functools import partial
 import json
 import re
+import time
 
 # Authentication Views
 def register_view(request):
@@ -48,23 +57,23 @@ def logout_view(request):
     return redirect('home')
 
 # Main Views
+# These are the views WSGI serves; under ASGI, resume_file.asgi_urls routes
+# the read-heavy ones to their async versions in home.async_views.
+@replica_reads
 def home(request):
     """Landing page with featured resumes and app overview"""
-    featured_resumes = Resume.objects.filter(is_public=True).order_by('-views_count')[:6]
-    context = {
-        'featured_resumes': featured_resumes,
-        'total_resumes': Resume.objects.count(),
-        'total_users': User.objects.count(),
-    }
-    return render(request, 'home.html', context)
+    return render(request, 'home.html', stats.get_home_stats())
 
 @login_required
 def dashboard(request):
     """User dashboard showing their resumes"""
-    user_resumes = Resume.objects.filter(user=request.user).order_by('-updated_at')
+    user_resumes = Resume.objects.filter(user=request.user)
+    page = KeysetPaginator(user_resumes, 12, ordering=RECENT).page(request.GET.get('cursor'))
+    page.object_list = counters.apply_pending(page.object_list)
     context = {
-        'resumes': user_resumes,
-        'total_resumes': user_resumes.count(),
+        'resumes': page,
+        'total_resumes': cached_count(user_resumes),
+        'total_downloads': counters.total(user_resumes, 'downloads_count'),
     }
     return render(request, 'dashboard.html', context)
 
@@ -76,7 +85,6 @@ def create_resume(request):
         email = request.POST.get('email', '').strip()
         
         # Name validation
-        import re
         name_pattern = re.compile(r'^[A-Za-z\s]{3,}$')
         if not name_pattern.match(name):
             messages.error(request, 'Name must be at least 3 letters long and contain only letters and spaces.')
@@ -88,285 +96,225 @@ def create_resume(request):
             messages.error(request, 'Please enter a valid email address.')
             return render(request, 'create_resume.html')
         
-        # Create new resume
-        resume = Resume.objects.create(
+        # Validate every section up front, then write them all in one transaction
+        data = ingest.parse_form(
+            request.POST, request.FILES,
             user=request.user if request.user.is_authenticated else None,
-            title=request.POST.get('title', 'My Resume'),
-            template=request.POST.get('template', 'modern'),
-            name=request.POST.get('name', ''),
-            about=request.POST.get('about', ''),
-            age=request.POST.get('age', ''),
-            email=request.POST.get('email', ''),
-            phone=request.POST.get('phone', ''),
-            address=request.POST.get('address', ''),
-            linkedin=request.POST.get('linkedin', ''),
-            github=request.POST.get('github', ''),
-            portfolio=request.POST.get('portfolio', ''),
-            twitter=request.POST.get('twitter', ''),
         )
-        
-        # Handle profile picture upload
-        if 'profile_picture' in request.FILES:
-            resume.profile_picture = request.FILES['profile_picture']
-            resume.save()
-        
-        # Add skills
-        skills = request.POST.getlist('skills[]')
-        skill_proficiencies = request.POST.getlist('skill_proficiencies[]')
-        
-        for i in range(len(skills)):
-            if skills[i].strip():
-                Skill.objects.create(
-                    resume=resume,
-                    name=skills[i].strip(),
-                    proficiency=skill_proficiencies[i] if i < len(skill_proficiencies) else 'intermediate'
-                )
-        
-        # Add education
-        degrees = request.POST.getlist('degrees[]')
-        institutions = request.POST.getlist('institutions[]')
-        years = request.POST.getlist('years[]')
-        gpas = request.POST.getlist('gpas[]')
-        
-        for i in range(len(degrees)):
-            if degrees[i].strip():
-                Education.objects.create(
-                    resume=resume,
-                    degree=degrees[i].strip(),
-                    institution=institutions[i].strip() if i < len(institutions) else '',
-                    year=years[i].strip() if i < len(years) else '',
-                    gpa=gpas[i].strip() if i < len(gpas) else '',
-                )
-        
-        # Add languages
-        languages = request.POST.getlist('languages[]')
-        proficiencies = request.POST.getlist('proficiencies[]')
-        
-        for i in range(len(languages)):
-            if languages[i].strip():
-                Language.objects.create(
-                    resume=resume,
-                    name=languages[i].strip(),
-                    proficiency=proficiencies[i] if i < len(proficiencies) else 'intermediate'
-                )
-        
-        # Add projects
-        project_titles = request.POST.getlist('project_titles[]')
-        project_durations = request.POST.getlist('project_durations[]')
-        project_descriptions = request.POST.getlist('project_descriptions[]')
-        project_technologies = request.POST.getlist('project_technologies[]')
-        
-        for i in range(len(project_titles)):
-            if project_titles[i].strip():
-                Project.objects.create(
-                    resume=resume,
-                    title=project_titles[i].strip(),
-                    duration=project_durations[i].strip() if i < len(project_durations) else '',
-                    description=project_descriptions[i].strip() if i < len(project_descriptions) else '',
-                    technologies=project_technologies[i].strip() if i < len(project_technologies) else '',
-                )
-        
-        # Add work experience
-        companies = request.POST.getlist('companies[]')
-        positions = request.POST.getlist('positions[]')
-        work_durations = request.POST.getlist('work_durations[]')
-        work_locations = request.POST.getlist('work_locations[]')
-        work_descriptions = request.POST.getlist('work_descriptions[]')
-        
-        for i in range(len(companies)):
-            if companies[i].strip():
-                WorkExperience.objects.create(
-                    resume=resume,
-                    company=companies[i].strip(),
-                    position=positions[i].strip() if i < len(positions) else '',
-                    duration=work_durations[i].strip() if i < len(work_durations) else '',
-                    description=work_descriptions[i].strip() if i < len(work_descriptions) else '',
-                )
-        
-        # Add certifications
-        cert_names = request.POST.getlist('cert_names[]')
-        cert_issuers = request.POST.getlist('cert_issuers[]')
-        cert_dates = request.POST.getlist('cert_dates[]')
-        cert_expiry_dates = request.POST.getlist('cert_expiry_dates[]')
-        cert_ids = request.POST.getlist('cert_ids[]')
-        cert_urls = request.POST.getlist('cert_urls[]')
-        
-        for i in range(len(cert_names)):
-            if cert_names[i].strip():
-                try:
-                    date_obtained = timezone.datetime.strptime(cert_dates[i], '%Y-%m-%d').date() if cert_dates[i] else timezone.now().date()
-                    expiry_date = timezone.datetime.strptime(cert_expiry_dates[i], '%Y-%m-%d').date() if cert_expiry_dates[i] else None
-                    
-                    Certification.objects.create(
-                        resume=resume,
-                        name=cert_names[i].strip(),
-                        issuer=cert_issuers[i].strip() if i < len(cert_issuers) else '',
-                        date_obtained=date_obtained,
-                        expiry_date=expiry_date,
-                        credential_id=cert_ids[i].strip() if i < len(cert_ids) else '',
-                        credential_url=cert_urls[i].strip() if i < len(cert_urls) else '',
-                    )
-                except:
-                    pass
-        
-        # Add achievements
-        achievement_titles = request.POST.getlist('achievement_titles[]')
-        achievement_descriptions = request.POST.getlist('achievement_descriptions[]')
-        achievement_years = request.POST.getlist('achievement_years[]')
-        
-        for i in range(len(achievement_titles)):
-            if achievement_titles[i].strip():
-                Achievement.objects.create(
-                    resume=resume,
-                    title=achievement_titles[i].strip(),
-                    description=achievement_descriptions[i].strip() if i < len(achievement_descriptions) else '',
-                    date=None,  # We'll use year instead of date for simplicity
-                )
-        
-        # Add references
-        ref_names = request.POST.getlist('ref_names[]')
-        ref_positions = request.POST.getlist('ref_positions[]')
-        ref_companies = request.POST.getlist('ref_companies[]')
-        ref_emails = request.POST.getlist('ref_emails[]')
-        ref_phones = request.POST.getlist('ref_phones[]')
-        ref_relationships = request.POST.getlist('ref_relationships[]')
-        
-        for i in range(len(ref_names)):
-            if ref_names[i].strip():
-                Reference.objects.create(
-                    resume=resume,
-                    name=ref_names[i].strip(),
-                    position=ref_positions[i].strip() if i < len(ref_positions) else '',
-                    company=ref_companies[i].strip() if i < len(ref_companies) else '',
-                    email=ref_emails[i].strip() if i < len(ref_emails) else '',
-                    phone=ref_phones[i].strip() if i < len(ref_phones) else '',
-                    relationship=ref_relationships[i].strip() if i < len(ref_relationships) else '',
-                )
+        try:
+            resume = ingest.write_resume(data)
+        except ValidationError as exc:
+            for error in exc.messages:
+                messages.error(request, error)
+            return render(request, 'create_resume.html')
         
         messages.success(request, 'Resume created successfully!')
         return redirect('view_resume', resume_id=resume.id)
     
     return render(request, 'create_resume.html')
 
+def _get_document_or_404(resume_id):
+    try:
+        return snapshots.get_document(resume_id)
+    except Resume.DoesNotExist:
+        raise Http404('No Resume matches the given query.')
+
+def _page(request, document, version):
+    """A freshly rendered ``view_resume`` page, in the form html_cache stores"""
+    return {
+        'body': render_to_string(document.template_name, document.context(), request),
+        'etag': quote_etag(version),
+        'last_modified': time.time(),
+        'is_public': document.resume.is_public,
+    }
+
+def _page_response(request, page):
+    response = HttpResponse(page['body'])
+    response['ETag'] = page['etag']
+    response['Last-Modified'] = http_date(page['last_modified'])
+    # Only public resumes may be stored by shared caches
+    patch_cache_control(response, public=page['is_public'], private=not page['is_public'],
+                        no_cache=True)
+    return get_conditional_response(
+        request, etag=page['etag'], last_modified=int(page['last_modified']), response=response,
+    )
+
+@replica_reads
 def view_resume(request, resume_id):
     """View a specific resume"""
-    resume = get_object_or_404(Resume, id=resume_id)
-    
-    # Increment view count
-    resume.views_count += 1
-    resume.save()
-    
-    context = {
-        'resume': resume,
-        'skills': resume.skills.all(),
-        'education': resume.education.all(),
-        'languages': resume.languages.all(),
-        'projects': resume.projects.all(),
-        'work_experience': resume.work_experience.all(),
-        'certifications': resume.certifications.all(),
-        'achievements': resume.achievements.all(),
-        'references': resume.references.all(),
-    }
+    page, generation = html_cache.get_page(resume_id)
+    if page is None:
+        page = _page(request, *_get_document_or_404(resume_id))
+        # A replica may lag behind the primary; only pages read from the primary are shared
+        if not reading_replica():
+            html_cache.set_page(resume_id, generation, **page)
     
-    template_name = f'resume_templates/{resume.template}.html'
-    return render(request, template_name, context)
+    # Increment view count (revalidated views count too)
+    counters.increment(resume_id, 'views_count')
+    return _page_response(request, page)
 
 @login_required
 def edit_resume(request, resume_id):
     """Edit an existing resume"""
-    resume = get_object_or_404(Resume, id=resume_id, user=request.user)
+    resume = get_object_or_404(Resume.objects.with_sections(), id=resume_id, user=request.user)
     
     if request.method == 'POST':
-        # Update resume basic info
-        resume.title = request.POST.get('title', resume.title)
-        resume.template = request.POST.get('template', resume.template)
-        resume.name = request.POST.get('name', resume.name)
-        resume.about = request.POST.get('about', resume.about)
-        resume.age = request.POST.get('age', resume.age)
-        resume.email = request.POST.get('email', resume.email)
-        resume.phone = request.POST.get('phone', resume.phone)
-        resume.address = request.POST.get('address', resume.address)
-        resume.linkedin = request.POST.get('linkedin', resume.linkedin)
-        resume.github = request.POST.get('github', resume.github)
-        resume.portfolio = request.POST.get('portfolio', resume.portfolio)
-        resume.twitter = request.POST.get('twitter', resume.twitter)
+        # Update resume basic info, tracking which fields actually change
+        changed = []
+        for name in ingest.RESUME_FIELDS:
+            if name not in request.POST:
+                continue
+            field = Resume._meta.get_field(name)
+            value = field.to_python(request.POST[name].strip())
+            if value != getattr(resume, field.attname):
+                setattr(resume, field.attname, value)
+                changed.append(name)
         
+        picture = None
         if 'profile_picture' in request.FILES:
-            resume.profile_picture = request.FILES['profile_picture']
+            try:
+                picture = images.process(request.FILES['profile_picture'])
+            except ValidationError as exc:
+                for error in exc.messages:
+                    messages.error(request, error)
+                return redirect('edit_resume', resume_id=resume.id)
+            resume.profile_picture = picture.name
+            changed.append('profile_picture')
         
-        resume.save()
+        # Diff each submitted section against its current rows; sections the
+        # form did not post are left alone
+        changes = {}
+        for name, form_fields in ingest.SECTION_FORM_FIELDS.items():
+            id_field = f'{name}_ids[]'
+            if id_field not in request.POST and not any(f in request.POST for f in form_fields.values()):
+                continue
+            ids = request.POST.getlist(id_field) if id_field in request.POST else None
+            changes[name] = sections.diff(resume, name, ingest.form_rows(request.POST, name, posted_only=True), ids)
         
-        # Handle related data updates (simplified for brevity)
-        # In a full implementation, you'd handle each section separately
+        try:
+            with transaction.atomic(), snapshots.deferred():
+                if picture is not None:
+                    # Written only once the edit commits, so a failed edit leaves no files behind
+                    transaction.on_commit(partial(images.store, picture))
+                summary = sections.apply_changes(resume, changes)
+                if changed or sections.has_changes(summary):
+                    # One UPDATE of the changed columns; post_save announces the section writes too
+                    resume.save(update_fields=[*changed, 'updated_at'])
+        except ValidationError as exc:
+            for error in exc.messages:
+                messages.error(request, error)
+            return redirect('edit_resume', resume_id=resume.id)
         
         messages.success(request, 'Resume updated successfully!')
         return redirect('view_resume', resume_id=resume.id)
     
-    context = {
-        'resume': resume,
-        'skills': resume.skills.all(),
-        'education': resume.education.all(),
-        'languages': resume.languages.all(),
-        'projects': resume.projects.all(),
-        'work_experience': resume.work_experience.all(),
-        'certifications': resume.certifications.all(),
-        'achievements': resume.achievements.all(),
-        'references': resume.references.all(),
-    }
-    
-    return render(request, 'edit_resume.html', context)
+    document = ResumeDocument.from_resume(resume)
+    return render(request, 'edit_resume.html', document.context())
 
 @login_required
 def delete_resume(request, resume_id):
     """Delete a resume"""
     resume = get_object_or_404(Resume, id=resume_id, user=request.user)
-    resume.delete()
+    with transaction.atomic(), snapshots.deferred():
+        resume.delete()
     messages.success(request, 'Resume deleted successfully!')
     return redirect('dashboard')
 
+def _renders_async(request):
+    """Whether a download is queued for the run_pdf_workers processes"""
+    config = jobs.get_config()
+    return config['ASYNC_DOWNLOADS'] or (config['ASYNC_OPT_IN'] and request.GET.get('async') == '1')
+
+@replica_reads
 def download_pdf(request, resume_id):
     """Download resume as PDF"""
-    resume = get_object_or_404(Resume, id=resume_id)
+    document, version = _get_document_or_404(resume_id)
+    resume = document.resume
     
     # Increment download count
-    resume.downloads_count += 1
-    resume.save()
+    counters.increment(resume.pk, 'downloads_count')
     
-    context = {
-        'resume': resume,
-        'skills': resume.skills.all(),
-        'education': resume.education.all(),
-        'languages': resume.languages.all(),
-        'projects': resume.projects.all(),
-        'work_experience': resume.work_experience.all(),
-        'certifications': resume.certifications.all(),
-        'achievements': resume.achievements.all(),
-        'references': resume.references.all(),
-    }
+    fingerprint = pdf_cache.resume_fingerprint(resume, document.sections)
+    cached = pdf_cache.open_pdf(resume.pk, fingerprint)
+    if cached is not None:
+        return delivery.file_response(request, cached)
+    
+    if _renders_async(request):
+        try:
+            job = jobs.enqueue(resume)
+        except jobs.QueueFull as exc:
+            return JsonResponse({'success': False, 'error': str(exc)}, status=503)
+        jobs.remember(request.session, job)
+        return pdf_job_response(request, job)
+    
+    # Each WSGI request has a thread of its own to render on
+    pdf = open_resume_pdf(document)
+    if pdf is None:
+        return HttpResponse('We had some errors while generating the PDF')
+    return delivery.file_response(request, pdf)
+
+@login_required
+def export_resumes(request):
+    """Download the user's resumes (or the selected ``resume_ids``) as a ZIP of PDFs"""
+    if request.method != 'POST':
+        return redirect('dashboard')
+    resumes = Resume.objects.filter(user=request.user)
+    ids = [pk for pk in request.POST.getlist('resume_ids') if pk.isdigit()]
+    if ids:
+        resumes = resumes.filter(pk__in=ids)
+    return exports.zip_response(request, resumes, 'my-resumes.zip')
+
+def pdf_job_response(request, job):
+    url = reverse('pdf_job', args=[job.pk])
+    response = JsonResponse({
+        'success': True,
+        'job': {
+            'id': str(job.pk),
+            'status': job.status,
+            'url': request.build_absolute_uri(url),
+        }
+    }, status=202)
+    response['Location'] = url
+    return response
+
+def pdf_job(request, job_id):
+    """Poll a background PDF job, returning the file once it is rendered"""
+    job = get_object_or_404(PdfRenderJob.objects.select_related('resume'), id=job_id)
+    if not jobs.can_poll(job, request.session, request.user):
+        raise Http404('No PdfRenderJob matches the given query.')
+    
+    if job.status == 'done':
+        pdf = jobs.open_output(job)
+        if pdf is not None:
+            return delivery.file_response(request, pdf)
+        # Output was pruned; render it again
+        job = jobs.enqueue(job.resume)
+        jobs.remember(request.session, job)
+    elif job.status == 'failed':
+        return JsonResponse({'success': False, 'error': job.error}, status=500)
     
-    template_name = f'resume_templates/{resume.template}.html'
-    return render_to_pdf(template_name, context)
+    return pdf_job_response(request, job)
+
+def _search(query):
+    """Public resumes matching ``query``, and the ordering to page them by"""
+    resumes = Resume.objects.filter(is_public=True)
+    if query:
+        resumes = search.get_backend().search(resumes, query)
+    ordering = ('search_rank', 'id') if 'search_rank' in resumes.query.annotations else POPULAR
+    return resumes, ordering
 
+@replica_reads
 def search_resumes(request):
     """Search public resumes"""
     query = request.GET.get('q', '')
-    resumes = Resume.objects.filter(is_public=True)
-    
-    if query:
-        resumes = resumes.filter(
-            Q(name__icontains=query) |
-            Q(title__icontains=query) |
-            Q(about__icontains=query) |
-            Q(skills__name__icontains=query)
-        ).distinct()
-    
-    paginator = Paginator(resumes, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    resumes, ordering = _search(query)
+    page_obj = KeysetPaginator(resumes, 12, ordering=ordering).page(request.GET.get('cursor'))
+    page_obj.object_list = counters.apply_pending(page_obj.object_list)
     
     context = {
         'resumes': page_obj,
         'query': query,
+        'total_count': cached_count(resumes),
     }
     return render(request, 'search_resumes.html', context)
 
@@ -412,6 +360,48 @@ def remove_skill_ajax(request):
     
     return JsonResponse({'success': False, 'error': 'Invalid request'})
 
+def _sections_response(resume, status=200, **extra):
+    state = sections.serialize(resume)
+    response = JsonResponse({'success': status == 200, **extra, **state}, status=status)
+    response['ETag'] = quote_etag(state['version'])
+    return response
+
+def update_sections_api(request, resume_id):
+    """Apply a batch of section creates, updates and deletes (see home.sections)
+
+    The request must name the version it was based on, in ``If-Match`` or a
+    ``version`` key; a stale version gets 412 with the current state.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'POST required'}, status=405)
+    if not request.user.is_authenticated:
+        return JsonResponse({'success': False, 'error': 'Authentication required'}, status=401)
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
+        return JsonResponse({'success': False, 'error': 'Expected a JSON object'}, status=400)
+    expected = request.headers.get('If-Match', '').strip().strip('"') or payload.get('version')
+    if not expected:
+        return JsonResponse({'success': False, 'error': 'Send the resume version in If-Match'}, status=428)
+    
+    with transaction.atomic(), snapshots.deferred():
+        resume = get_object_or_404(Resume.objects.select_for_update().with_sections(),
+                                   id=resume_id, user=request.user)
+        if expected != sections.version(resume):
+            return _sections_response(resume, status=412, error='The resume was changed elsewhere')
+        try:
+            summary = sections.apply_changes(resume, payload.get('changes') or {})
+        except ValidationError as exc:
+            return JsonResponse({'success': False, 'errors': exc.messages}, status=400)
+        if sections.has_changes(summary):
+            # Bumps the version and announces the bulk writes
+            resume.save(update_fields=['updated_at'])
+    
+    document, version = snapshots.get_document(resume.pk)
+    return _sections_response(document.resume, **summary)
+
 # Legacy view for backward compatibility
 def gen_resume(request):
     """Legacy resume generation view"""
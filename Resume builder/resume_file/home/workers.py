@@ -0,0 +1,32 @@
+"""
+Process pools for export renders and bulk imports.
+
+Workers are spawned, not forked: a forked copy of a server process inherits
+its threads' locks and its open connections and sockets mid-use.
+"""
+import concurrent.futures
+import multiprocessing
+import signal
+
+
+def setup_worker(ignore_interrupts=False):
+    """Pool initializer that sets Django up in a spawned worker
+
+    Lives here, away from any module importing models, since the initializer
+    is unpickled before Django is set up.
+    """
+    if ignore_interrupts:
+        # Ctrl-C reaches the whole process group; a worker finishes its task
+        # and leaves it to the parent to stop handing out more
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def process_pool(max_workers, ignore_interrupts=False):
+    """``ProcessPoolExecutor`` of spawned workers set up by ``setup_worker``"""
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+        initializer=setup_worker, initargs=(ignore_interrupts,))
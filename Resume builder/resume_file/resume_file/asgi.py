@@ -12,5 +12,10 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'resume_file.settings')
+# Each request's queries run on a thread of its own, so persistent
+# connections would pile up unused; close them at the end of the request
+os.environ.setdefault('RESUME_CONN_MAX_AGE', '0')
+# Route the read-heavy views to their async versions (resume_file.asgi_urls)
+os.environ.setdefault('RESUME_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
@@ -0,0 +1,24 @@
+"""
+URL configuration under ASGI (see asgi.py).
+
+The same routes as ``resume_file.urls``, with the read-heavy views served
+by their async versions from ``home.async_views``.
+"""
+from django.urls import URLPattern
+
+from home import async_views, views
+from .urls import urlpatterns as sync_urlpatterns
+
+ASYNC_VIEWS = {
+    views.home: async_views.home,
+    views.dashboard: async_views.dashboard,
+    views.view_resume: async_views.view_resume,
+    views.download_pdf: async_views.download_pdf,
+    views.search_resumes: async_views.search_resumes,
+}
+
+urlpatterns = [
+    URLPattern(p.pattern, ASYNC_VIEWS[p.callback], p.default_args, p.name)
+    if isinstance(p, URLPattern) and p.callback in ASYNC_VIEWS else p
+    for p in sync_urlpatterns
+]
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,6 +43,8 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    'home.metrics.MetricsMiddleware',
+    'home.routing.PrimaryPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -51,11 +54,12 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'resume_file.urls'
+# asgi.py sets RESUME_ASYNC_VIEWS=1 to serve the read-heavy views' async versions
+ROOT_URLCONF = 'resume_file.asgi_urls' if os.environ.get('RESUME_ASYNC_VIEWS') == '1' else 'resume_file.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'home.metrics.InstrumentedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -78,9 +82,19 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock up front, so writers wait instead of failing
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # Persistent connections; asgi.py sets RESUME_CONN_MAX_AGE=0
+        'CONN_MAX_AGE': int(os.environ.get('RESUME_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Resume reads of the read-only views can go to replicas (see home.routing)
+DATABASE_ROUTERS = ['home.routing.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -129,3 +143,113 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Rendered PDF cache: a size-bounded directory (disk) or a Django cache (cache)
+RESUME_PDF_CACHE = {
+    'ENABLED': True,
+    'BACKEND': 'disk',
+    'LOCATION': BASE_DIR / 'cache' / 'pdf',
+    'MAX_SIZE': 256 * 1024 * 1024,
+    'CACHE_ALIAS': 'default',
+}
+
+# Background PDF rendering; only enable async downloads while `manage.py run_pdf_workers` runs
+RESUME_PDF_JOBS = {
+    'ASYNC_DOWNLOADS': False,
+    'ASYNC_OPT_IN': False,
+    'CONCURRENCY': 2,
+    'TIMEOUT': 60,
+    'MAX_PENDING': 1000,
+    'OUTPUT_DIR': BASE_DIR / 'cache' / 'jobs',
+}
+
+# View/download counters, buffered per process (see home.counters)
+RESUME_COUNTERS = {
+    'FLUSH_INTERVAL': 5,
+    'MAX_BUFFERED': 1000,
+}
+
+# Search backend; defaults to the SQLite FTS5 index when present (see home.search)
+# RESUME_SEARCH_BACKEND = 'home.search.SQLiteFTSBackend'
+
+# Rendered resume pages served by view_resume; use a cache shared by all processes
+RESUME_HTML_CACHE = {
+    'ENABLED': True,
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 60 * 60,
+}
+
+# Landing-page totals and featured list (see `manage.py refresh_home_stats`)
+RESUME_HOME_STATS = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 5 * 60,
+    'FEATURED_COUNT': 6,
+}
+
+# Prometheus timings at /metrics for ALLOWED_IPS or a Bearer TOKEN (see home.metrics)
+RESUME_METRICS = {
+    'ENABLED': True,
+    'SERVER_TIMING': DEBUG,
+    'ALLOWED_IPS': ('127.0.0.1', '::1'),
+    'TRUSTED_PROXIES': (),
+    'TOKEN': None,
+}
+
+# Local resolution and caching of PDF assets (see home.pdf_assets)
+RESUME_PDF_ASSETS = {
+    'CACHE_MAX_BYTES': 32 * 1024 * 1024,
+}
+
+# Bulk PDF export: worker processes per export and concurrent exports per process
+RESUME_PDF_EXPORT = {
+    'CONCURRENCY': 2,
+    'MAX_EXPORTS': 2,
+}
+
+# How PDFs are sent: spooling, Range support and X-Sendfile/X-Accel-Redirect
+RESUME_PDF_DELIVERY = {
+    'SENDFILE': None,
+    'ACCEL_LOCATIONS': {},
+    'SPOOL_MAX_MEMORY': 1024 * 1024,
+}
+
+# Thread pool for PDF renders started by the async views under ASGI
+RESUME_PDF_RENDER_POOL = {
+    'WORKERS': 2,
+    'MAX_PENDING': 8,
+}
+
+# SQLite PRAGMAs and writer thread; the checked-in db.sqlite3 keeps its journal mode
+RESUME_SQLITE = {
+    'ENABLED': True,
+    'BUSY_TIMEOUT': 5000,
+    'JOURNAL_MODE': 'wal',
+    'SYNCHRONOUS': 'normal',
+    'MMAP_SIZE': 256 * 1024 * 1024,
+    'CACHE_SIZE': -64 * 1024,
+    'WRITE_QUEUE': True,
+    'MAX_BATCH': 50,
+    'EXCLUDE': [BASE_DIR / 'db.sqlite3'],
+}
+
+# Read replicas for the read-only views (see home.routing), for example
+#
+#     DATABASES['replica'] = {
+#         'ENGINE': 'django.db.backends.sqlite3',
+#         'NAME': 'file:/srv/resume/replica.sqlite3?mode=ro',
+#         'OPTIONS': {'uri': True},
+#         'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+#         'CONN_HEALTH_CHECKS': True,
+#         'TEST': {'MIRROR': 'default'},
+#     }
+RESUME_DATABASE_ROUTING = {
+    'REPLICAS': [],
+    'STICKY_SECONDS': 15,
+    'RETRY_SECONDS': 30,
+}
+
+# manage.py import_resumes: records per chunk and worker processes
+RESUME_BULK_IMPORT = {
+    'CHUNK_SIZE': 500,
+    'WORKERS': 2,
+}
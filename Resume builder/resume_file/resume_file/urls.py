@@ -20,6 +20,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from home.views import *
 from home.views import download_pdf
+from home.metrics import metrics_view
 
 urlpatterns = [
     # Authentication
@@ -30,6 +31,7 @@ urlpatterns = [
     # Main pages
     path('', home, name='home'),
     path('dashboard/', dashboard, name='dashboard'),
+    path('dashboard/export/', export_resumes, name='export_resumes'),
     path('search/', search_resumes, name='search_resumes'),
     
     # Resume management
@@ -38,15 +40,20 @@ urlpatterns = [
     path('resume/<int:resume_id>/edit/', edit_resume, name='edit_resume'),
     path('resume/<int:resume_id>/delete/', delete_resume, name='delete_resume'),
     path('resume/<int:resume_id>/download/', download_pdf, name='download_pdf'),
+    path('pdf-jobs/<uuid:job_id>/', pdf_job, name='pdf_job'),
     
     # API endpoints
     path('api/add-skill/', add_skill_ajax, name='add_skill_ajax'),
     path('api/remove-skill/', remove_skill_ajax, name='remove_skill_ajax'),
+    path('api/resume/<int:resume_id>/sections/', update_sections_api, name='update_sections_api'),
     
     # Legacy routes (for backward compatibility)
     path('resume/', gen_resume, name='resume'),
     path('download_pdf/', download_pdf, name='download_pdf'),
     
+    # Monitoring
+    path('metrics', metrics_view, name='metrics'),
+
     # Admin
     path('admin/', admin.site.urls),
 ]